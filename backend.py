@@ -0,0 +1,386 @@
+"""
+Float64 backend for Vector and Matrix, with an exact fallback.
+
+FloatVector and FloatMatrix offer the same API as Vector and Matrix,
+but hold float64 values: NumPy arrays when NumPy is installed, and
+python float lists otherwise. Use Vector.as_float / Matrix.as_float
+to switch, and .exact() to come back.
+
+The hybrid_* functions compute in float64 and then return an exact
+result: entries are rationalized, checked with exact arithmetic, and
+recomputed exactly if the check fails.
+"""
+import random
+from fractions import Fraction
+from math import cos, pi, sin, sqrt
+from numbers import Number
+from operator import mul
+
+import matrix
+import modular
+import rfrac
+import vector
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RF = rfrac.RationalFrac
+
+# Integers below this bound are exact in float64:
+_FLOAT_EXACT = 1 << 53
+
+
+def _float(value) -> float:
+    return float(value) if not isinstance(value, float) else value
+
+
+def rationalize(value: float, max_denom: int = None) -> RF:
+    """
+    Returns a RationalFrac for a float. With max_denom, returns the
+    closest fraction whose denominator is at most max_denom, else
+    the exact binary value of the float.
+    """
+    frac = Fraction(value)
+    if max_denom is not None:
+        frac = frac.limit_denominator(max_denom)
+    return RF.from_ratio(frac.numerator, frac.denominator)
+
+
+class FloatVector:
+    """
+    A vector of float64 values.
+    -- data:    numpy.ndarray, or [float, ] without NumPy.
+    """
+
+    def __init__(self, v):
+        """ Accepts a FloatVector, a Vector, or any list of numbers. """
+        if isinstance(v, FloatVector):
+            v = v.data
+        values = list(map(float, v)) if np is None else \
+            np.asarray(v if isinstance(v, np.ndarray) else
+                       list(map(float, v)), dtype=np.float64)
+        self.data = values
+
+    def exact(self, max_denom: int = None):
+        """ Returns this as a Vector. See rationalize(). """
+        return vector.Vector([rationalize(float(x), max_denom)
+                              for x in self.data])
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i: int) -> float:
+        return float(self.data[i])
+
+    def __setitem__(self, i: int, value):
+        self.data[i] = _float(value)
+
+    def __iter__(self):
+        return (float(x) for x in self.data)
+
+    def __str__(self):
+        return '[%s]' % ', '.join('%g' % x for x in self)
+
+    def __eq__(self, other):
+        if isinstance(other, FloatVector):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def _check(self, other):
+        if len(self) != len(other):
+            raise matrix.MatrixSizeError('vector lengths incompatible.')
+
+    def __add__(self, other):
+        if isinstance(other, (FloatVector, vector.Vector, list, tuple)):
+            other = FloatVector(other)
+            self._check(other)
+            if np is not None:
+                return FloatVector(self.data + other.data)
+            return FloatVector(list(map(float.__add__, self.data, other.data)))
+        else:
+            return NotImplemented
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __neg__(self):
+        if np is not None:
+            return FloatVector(-self.data)
+        return FloatVector([-x for x in self.data])
+
+    def __sub__(self, other):
+        if isinstance(other, (FloatVector, vector.Vector, list, tuple)):
+            return self.__add__(FloatVector(other).__neg__())
+        else:
+            return NotImplemented
+
+    def __mul__(self, other):
+        """ Scalar multiplication. """
+        if isinstance(other, (RF, Number)):
+            other = _float(other)
+            if np is not None:
+                return FloatVector(self.data * other)
+            return FloatVector([x * other for x in self.data])
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def dot(self, other) -> float:
+        """ Returns the dot product. """
+        other = FloatVector(other)
+        self._check(other)
+        if np is not None:
+            return float(self.data @ other.data)
+        return sum(map(mul, self.data, other.data))
+
+    def norm(self) -> float:
+        """ Returns the 'length' of the vector. """
+        return sqrt(self.dot(self))
+
+    def rot(self, o: float, axis: str = ''):
+        """
+        Returns a rotated view of a vector in space.
+        The rotation is counterclockwise by o,
+        about the specified axis when relevant.
+        """
+        return FloatMatrix.rot_matrix(o % (2 * pi), len(self), axis) @ self
+
+
+class FloatMatrix:
+    """
+    A matrix of float64 values.
+    -- data:    numpy.ndarray, or [[float, ], ] without NumPy.
+    """
+
+    def __init__(self, rows):
+        """ Accepts a FloatMatrix, a Matrix or MatrixView, or nested lists. """
+        if isinstance(rows, FloatMatrix):
+            rows = rows.data
+        elif isinstance(rows, (matrix.Matrix, matrix.MatrixView)):
+            rows = list(rows.rows())
+        if np is not None:
+            self.data = np.asarray(
+                rows if isinstance(rows, np.ndarray) else
+                [list(map(float, row)) for row in rows], dtype=np.float64)
+        else:
+            self.data = [list(map(float, row)) for row in rows]
+
+    @property
+    def nrows(self) -> int:
+        return len(self.data)
+
+    @property
+    def ncols(self) -> int:
+        return len(self.data[0])
+
+    def exact(self, max_denom: int = None):
+        """ Returns this as a Matrix. See rationalize(). """
+        return matrix.Matrix([[rationalize(float(x), max_denom) for x in row]
+                              for row in self.data])
+
+    def rows(self):
+        return iter(self.data)
+
+    def __getitem__(self, r: int):
+        return self.data[r]
+
+    def __str__(self):
+        return '\n'.join('[%s]' % ', '.join('%g' % x for x in row)
+                         for row in self.data)
+
+    def is_square(self):
+        return self.nrows == self.ncols
+
+    def transpose(self):
+        if np is not None:
+            return FloatMatrix(self.data.T)
+        return FloatMatrix([list(col) for col in zip(*self.data)])
+
+    @property
+    def T(self):
+        return self.transpose()
+
+    def __add__(self, other):
+        if isinstance(other, FloatMatrix):
+            if not (self.nrows == other.nrows and self.ncols == other.ncols):
+                raise matrix.MatrixSizeError('dimensions not equal')
+            if np is not None:
+                return FloatMatrix(self.data + other.data)
+            return FloatMatrix([list(map(float.__add__, a, b))
+                                for a, b in zip(self.data, other.data)])
+        else:
+            return NotImplemented
+
+    def __mul__(self, other):
+        """ Scalar multiplication. """
+        if isinstance(other, (RF, Number)):
+            other = _float(other)
+            if np is not None:
+                return FloatMatrix(self.data * other)
+            return FloatMatrix([[x * other for x in row]
+                                for row in self.data])
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __matmul__(self, other):
+        """ Returns a FloatMatrix or FloatVector product. """
+        if isinstance(other, FloatMatrix):
+            if self.ncols != other.nrows:
+                raise matrix.MatrixSizeError('op1 #cols != op2 #rows')
+            if np is not None:
+                return FloatMatrix(self.data @ other.data)
+            cols = list(zip(*other.data))
+            return FloatMatrix([[sum(map(mul, row, col)) for col in cols]
+                                for row in self.data])
+        elif isinstance(other, (FloatVector, vector.Vector)):
+            other = FloatVector(other)
+            if self.ncols != len(other):
+                raise matrix.MatrixSizeError('op1 #cols != op2 length')
+            if np is not None:
+                return FloatVector(self.data @ other.data)
+            return FloatVector([sum(map(mul, row, other.data))
+                                for row in self.data])
+        else:
+            return NotImplemented
+
+    def det(self) -> float:
+        """ Returns the determinant, by partial-pivoting elimination. """
+        if not self.is_square():
+            raise matrix.MatrixSizeError(
+                'cannot take determinant: matrix not square.')
+        if np is not None:
+            return float(np.linalg.det(self.data))
+        rows = [list(row) for row in self.data]
+        det = 1.0
+        for c in range(len(rows)):
+            pivot = max(range(c, len(rows)), key=lambda r: abs(rows[r][c]))
+            if rows[pivot][c] == 0:
+                return 0.0
+            if pivot != c:
+                rows[c], rows[pivot] = rows[pivot], rows[c]
+                det = -det
+            det *= rows[c][c]
+            for r in range(c + 1, len(rows)):
+                factor = rows[r][c] / rows[c][c]
+                rows[r] = [x - factor * y for x, y in zip(rows[r], rows[c])]
+        return det
+
+    def solve(self, solution):
+        """ Returns the FloatVector x such that self @ x is solution. """
+        b = FloatVector(solution)
+        if np is not None:
+            return FloatVector(np.linalg.solve(self.data, b.data))
+        n = self.nrows
+        aug = [list(row) + [x] for row, x in zip(self.data, b.data)]
+        for c in range(n):
+            pivot = max(range(c, n), key=lambda r: abs(aug[r][c]))
+            if aug[pivot][c] == 0:
+                raise ArithmeticError('matrix is singular.')
+            aug[c], aug[pivot] = aug[pivot], aug[c]
+            for r in range(n):
+                if r != c:
+                    factor = aug[r][c] / aug[c][c]
+                    aug[r] = [x - factor * y for x, y in zip(aug[r], aug[c])]
+        return FloatVector([aug[i][n] / aug[i][i] for i in range(n)])
+
+    @staticmethod
+    def rot_matrix(theta: float, size: int, axis: str = ''):
+        """ Returns a float rotation matrix. See Vector.rot_matrix. """
+        c, s = cos(theta), sin(theta)
+        rm = {
+            (2, ''): [[c, -s], [s, c]],
+            (3, 'x'): [[1, 0, 0], [0, c, -s], [0, s, c]],
+            (3, 'y'): [[c, 0, s], [0, 1, 0], [-s, 0, c]],
+            (3, 'z'): [[c, -s, 0], [s, c, 0], [0, 0, 1]],
+        }
+        return FloatMatrix(rm[size, axis])
+
+
+# Hybrid float64 / exact operations:
+def _freivalds(lhs: [[int, ], ], rhs: [[int, ], ], prod: [[int, ], ],
+               rounds: int = 2) -> bool:
+    """
+    Checks lhs @ rhs == prod for integer matrices in O(n^2) per round
+    by comparing lhs @ (rhs @ r) with prod @ r for random vectors r.
+    A wrong product passes one round with probability below 2^-20.
+    """
+    for _ in range(rounds):
+        r = [random.randrange(1 << 20) for _ in range(len(rhs[0]))]
+        rhs_r = [sum(map(mul, row, r)) for row in rhs]
+        if any(sum(map(mul, a, rhs_r)) != sum(map(mul, c, r))
+               for a, c in zip(lhs, prod)):
+            return False
+    return True
+
+
+def hybrid_matmul(lhs, rhs):
+    """
+    Returns the exact Matrix product lhs @ rhs. It is computed in
+    float64, then each entry is rounded to the nearest fraction over
+    its known denominator (the lcm of its row of lhs times that of
+    its column of rhs), and the result is checked with Freivalds'
+    algorithm. Falls back to the exact engine if the check fails, or
+    if the integer products may exceed 2^53, where float64 cannot
+    hold them exactly (or at all).
+    """
+    if lhs.ncols != rhs.nrows:
+        raise matrix.MatrixSizeError('op1 #cols != op2 #rows')
+    a, row_denoms = modular.clear_denominators(lhs.rows())
+    b_t, col_denoms = modular.clear_denominators(zip(*rhs.rows()))
+    a_max = max((abs(x) for row in a for x in row), default=0)
+    b_max = max((abs(x) for row in b_t for x in row), default=0)
+    if a_max * b_max * lhs.ncols >= _FLOAT_EXACT:
+        return lhs @ rhs
+    b = [list(row) for row in zip(*b_t)]
+    approx = FloatMatrix(a) @ FloatMatrix(b)
+    prod = [[round(x) for x in row] for row in approx.rows()]
+    if not _freivalds(a, b, prod):
+        return lhs @ rhs
+    return matrix.Matrix([
+        [RF.from_ratio(numer, rd * cd)
+         for numer, cd in zip(row, col_denoms)]
+        for row, rd in zip(prod, row_denoms)
+    ])
+
+
+def hybrid_solve(mtx, solution, max_denom: int = 1 << 20):
+    """
+    Returns the exact solution of mtx @ x = solution. It is solved in
+    float64 and rationalized with denominators up to max_denom, then
+    checked exactly. Falls back to Matrix.solve if the check fails.
+    """
+    approx = FloatMatrix(mtx).solve(FloatVector(solution))
+    x = [Fraction(float(v)).limit_denominator(max_denom) for v in approx]
+    rows = [[Fraction(*e.as_ratio()) for e in row] for row in mtx.rows()]
+    exact = [Fraction(*(e if isinstance(e, RF) else RF(e)).as_ratio())
+             for e in solution]
+    if all(sum(map(mul, row, x)) == b for row, b in zip(rows, exact)):
+        return vector.Vector([RF.from_ratio(v.numerator, v.denominator)
+                              for v in x])
+    return mtx.solve(solution)
+
+
+def backend_tests():
+    print('\n==========================================')
+    print('backend.py @ backend_tests: //////////////\n')
+    print('numpy:', 'yes' if np is not None else 'no (python floats)')
+    v = FloatVector([1, 0])
+    print('rot 90 degrees:', v.rot(pi / 2), 'and expected = [0, 1]')
+    print('norm:', FloatVector([3, 4]).norm(), 'and expected = 5')
+    m = matrix.Matrix([[1, RF(1, 2)], [RF(2, 3), 3]])
+    print('hybrid m @ m =\n', hybrid_matmul(m, m))
+    print('hybrid solve:', hybrid_solve(m, [2, 7]),
+          'and expected = [15/16, 17/8]')
+    print('\nbackend.py @ end of backend_tests ////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    backend_tests()
@@ -0,0 +1,233 @@
+"""
+Struct-of-arrays storage for many vectors of the same length.
+
+A VectorBatch holds N vectors of length d as d columns, one per
+coordinate, so that an update to every vector (say, every position in
+a frame) is a few whole-column operations instead of N Vector objects
+worth of python calls. Columns are either exact IntVectors (integer
+numerators over one denominator per column) or float64 FloatVectors.
+"""
+from numbers import Number
+from operator import mul
+
+import backend
+import intvec
+import matrix
+import mfrac
+import rfrac
+import vector
+
+RF = rfrac.RationalFrac
+
+
+def _hadamard(a, b):
+    """ Returns the entry-wise product of two columns of the same kind. """
+    if isinstance(a, intvec.IntVector):
+        return intvec.IntVector(list(map(mul, a.numers, b.numers)),
+                                a.denom * b.denom)
+    if backend.np is not None:
+        return backend.FloatVector(a.data * b.data)
+    return backend.FloatVector(list(map(mul, a.data, b.data)))
+
+
+class VectorBatch:
+    """
+    N vectors of length d, stored as d columns of length N.
+    -- columns: [intvec.IntVector, ] or [backend.FloatVector, ]
+    """
+
+    def __init__(self, columns: list):
+        """
+        columns is stored by reference, and must all be
+        IntVectors or all be FloatVectors of equal length.
+        Use from_vectors to build a batch from vectors.
+        """
+        self.columns = columns
+
+    @staticmethod
+    def from_vectors(vectors, exact: bool = True):
+        """
+        Returns a batch of a list of equal length vectors or lists,
+        with exact storage, or float64 storage if exact is False.
+        """
+        cols = [list(col) for col in zip(*vectors)]
+        if exact:
+            return VectorBatch([intvec.IntVector.from_vector(col)
+                                for col in cols])
+        return VectorBatch([backend.FloatVector(col) for col in cols])
+
+    def to_vectors(self) -> list:
+        """ Returns the vectors as a list of Vectors (or FloatVectors). """
+        if not self.exact:
+            return [backend.FloatVector(list(row))
+                    for row in zip(*self.columns)]
+        return [vector.Vector(list(row)) for row in zip(*self.columns)]
+
+    @property
+    def exact(self) -> bool:
+        return not self.columns or \
+            isinstance(self.columns[0], intvec.IntVector)
+
+    def as_float(self):
+        """ Returns a copy with float64 storage. """
+        return VectorBatch([backend.FloatVector(list(col))
+                            for col in self.columns])
+
+    def as_exact(self, max_denom: int = None):
+        """ Returns a copy with exact storage. See backend.rationalize. """
+        return VectorBatch([intvec.IntVector.from_vector(
+            col.exact(max_denom) if isinstance(col, backend.FloatVector)
+            else col) for col in self.columns])
+
+    @property
+    def dim(self) -> int:
+        return len(self.columns)
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, i: int):
+        """ Returns the i-th vector, as a Vector (or FloatVector). """
+        if not self.exact:
+            return backend.FloatVector([col[i] for col in self.columns])
+        return vector.Vector([col[i] for col in self.columns])
+
+    def __str__(self):
+        return '\n'.join(str(v) for v in self.to_vectors())
+
+    def __eq__(self, other):
+        if isinstance(other, VectorBatch):
+            return self.columns == other.columns
+        return NotImplemented
+
+    """
+    Vectorized operations:
+    """
+    def _operand(self, other) -> list:
+        """
+        Private. Returns the columns of a batch, or of one vector
+        repeated to the length of this batch, in this batch's kind.
+        """
+        if isinstance(other, VectorBatch):
+            if self.dim != other.dim or len(self) != len(other):
+                raise matrix.MatrixSizeError('batch sizes incompatible.')
+            if self.exact == other.exact:
+                return other.columns
+            return (other.as_exact() if self.exact else
+                    other.as_float()).columns
+        if len(other) != self.dim:
+            raise matrix.MatrixSizeError('vector lengths incompatible.')
+        return VectorBatch.from_vectors([other] * len(self),
+                                        self.exact).columns
+
+    def __add__(self, other):
+        """ Adds a batch, or the same vector to every vector. """
+        if isinstance(other, (VectorBatch, vector.Vector, list, tuple)):
+            return VectorBatch([a + b for a, b in
+                                zip(self.columns, self._operand(other))])
+        else:
+            return NotImplemented
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __neg__(self):
+        return VectorBatch([-col for col in self.columns])
+
+    def __sub__(self, other):
+        if isinstance(other, (VectorBatch, vector.Vector, list, tuple)):
+            return VectorBatch([a - b for a, b in
+                                zip(self.columns, self._operand(other))])
+        else:
+            return NotImplemented
+
+    def __mul__(self, other):
+        """ Scalar multiplication. """
+        if isinstance(other, (RF, Number)):
+            return VectorBatch([col * other for col in self.columns])
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def dot(self, other):
+        """
+        Returns the N dot products of the vectors of this batch and
+        of other (a batch, or one vector dotted with all of them)
+        as an IntVector (or a FloatVector).
+        """
+        total = None
+        for a, b in zip(self.columns, self._operand(other)):
+            prod = _hadamard(a, b)
+            total = prod if total is None else total + prod
+        return total
+
+    def norm_squared(self):
+        """ Returns the N squared norms. See dot(). """
+        return self.dot(self)
+
+    def norm(self) -> list:
+        """
+        Returns the N norms: a list of exact MonoFrac
+        norms, or a FloatVector of float64 norms.
+        """
+        squares = self.norm_squared()
+        if not self.exact:
+            if backend.np is not None:
+                return backend.FloatVector(backend.np.sqrt(squares.data))
+            return backend.FloatVector([x ** 0.5 for x in squares.data])
+        return [mfrac.MonoFrac(x) ** RF(1, 2) for x in squares]
+
+    def __rmatmul__(self, other):
+        """
+        Returns other @ v for every vector v, as a batch. other is a
+        Matrix, a MatrixView or a backend.FloatMatrix. Each new column
+        is a linear combination of the old ones.
+        """
+        if isinstance(other, (matrix.Matrix, matrix.MatrixView,
+                              backend.FloatMatrix)):
+            if other.ncols != self.dim:
+                raise matrix.MatrixSizeError('op1 #cols != op2 length')
+            columns = []
+            for row in other.rows():
+                col = None
+                for coeff, c in zip(row, self.columns):
+                    if coeff != 0:
+                        term = c * coeff
+                        col = term if col is None else col + term
+                columns.append(col if col is not None else self.columns[0] * 0)
+            return VectorBatch(columns)
+        else:
+            return NotImplemented
+
+    def rot(self, o, axis='', exact=False):
+        """
+        Returns every vector rotated as in Vector.rot, with one
+        rotation matrix (exact rotations need exact storage).
+        """
+        if not self.exact:
+            return backend.FloatMatrix.rot_matrix(
+                vector.Vector._norm_angle(o), self.dim, axis) @ self
+        return vector.Vector.rot_matrix(
+            vector.Vector._norm_angle(o), self.dim, axis, exact) @ self
+
+
+def batch_tests():
+    print('\n==========================================')
+    print('batch.py @ batch_tests: //////////////////\n')
+    pos = VectorBatch.from_vectors([[0, 0], [1, RF(1, 2)], [3, 4]])
+    vel = VectorBatch.from_vectors([[1, 1], [RF(1, 3), 0], [-1, 2]])
+    print('pos + vel * 3 =\n', pos + vel * 3)
+    print('pos - [1, 1] =\n', pos - [1, 1])
+    print('pos . vel =', pos.dot(vel), 'and expected = [0, 1/3, 5]')
+    print('norms =', *pos.norm())
+    print('rotated exactly =\n', pos.rot(1.0, exact=True))
+    fpos = pos.as_float()
+    print('float rotated =\n', fpos.rot(1.0))
+    print('\nbatch.py @ end of batch_tests ////////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    batch_tests()
@@ -0,0 +1,225 @@
+"""
+Timing scripts. Run as: python benchmark.py [name ...]
+"""
+import random
+import sys
+from time import perf_counter
+
+import densepoly
+import horner
+import matmul
+import matrix
+import modular
+import physics
+import polynomial
+import rfrac
+import vector
+
+
+def _timed(func, *args, repeat: int = 3) -> float:
+    """ Returns the best wall-clock time of several calls. """
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        func(*args)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def _int_matrix(n: int, m: int, bits: int = 16) -> [[int, ], ]:
+    bound = 1 << bits
+    return [[random.randrange(-bound, bound) for _ in range(m)]
+            for _ in range(n)]
+
+
+def matmul_crossover(sizes=(32, 64, 128, 256),
+                     thresholds=(32, 64, 128)):
+    """
+    Times the blocked integer kernel against Strassen-Winograd
+    recursion stopping at each threshold. The crossover point is
+    the smallest size where some threshold beats blocked.
+    """
+    print('\nmatmul crossover (seconds):')
+    print('%6s %10s' % ('n', 'blocked') +
+          ''.join('%10s' % f'sw<{t}' for t in thresholds))
+    for n in sizes:
+        a, b = _int_matrix(n, n), _int_matrix(n, n)
+        line = '%6d %10.4f' % (n, _timed(
+            matmul.blocked_matmul, a, matmul._transpose(b)))
+        for t in thresholds:
+            line += '%10.4f' % _timed(matmul.strassen_matmul, a, b, t)
+        print(line)
+
+
+def _rational_matrix(n: int) -> matrix.Matrix:
+    denoms = (1, 2, 3, 4, 5, 6, 8, 10)
+    return matrix.Matrix([
+        [rfrac.RationalFrac(random.randrange(-99, 100), random.choice(denoms))
+         for _ in range(n)] for _ in range(n)])
+
+
+def parallel_scaling(sizes=(200, ), workers=(1, 2, 4, 8)):
+    """
+    Times process-pool matmul, det and rref against the number of
+    workers, and prints the parallel efficiency t1 / (w * tw). It is
+    only meaningful on a machine with at least max(workers) cores.
+    """
+    print('\nparallel scaling (seconds, efficiency):')
+    for n in sizes:
+        a, b = _rational_matrix(n), _rational_matrix(n)
+        for name, func in (('matmul', lambda w: a.matmul(b, workers=w)),
+                           ('det', lambda w: a.det(workers=w)),
+                           ('rref', lambda w: a.rref(workers=w))):
+            line = '%6s n=%-5d' % (name, n)
+            base = None
+            for w in workers:
+                t = _timed(func, w, repeat=1)
+                base = base or t
+                line += '  w=%d: %8.3f (%3.0f%%)' % (w, t, 100 * base / w / t)
+            print(line)
+
+
+def physics_steps(sizes=(100, 300), steps=200):
+    """
+    Times World.step on bodies scattered in a ring,
+    in float and exact mode, in steps per second.
+    """
+    print('\nphysics (steps per second):')
+    for n in sizes:
+        bodies = [physics.Body(
+            [random.randrange(-40, 41), random.randrange(-40, 41)],
+            [rfrac.RationalFrac(random.randrange(-20, 21), 4),
+             rfrac.RationalFrac(random.randrange(-20, 21), 4)],
+            radius=rfrac.RationalFrac(1, 2)) for _ in range(n)]
+        line = '%6d bodies' % n
+        for exact, count in ((False, steps), (True, steps // 10)):
+            world = physics.World(bodies, ring_radius=60, exact=exact)
+            t = _timed(world.run, count, repeat=1)
+            line += '  %s: %8.0f' % ('exact' if exact else 'float', count / t)
+        print(line)
+
+
+def dense_poly(degrees=(10, 100, 1000, 10000, 100000), bits: int = 16):
+    """
+    Times the integer polynomial product kernels on operands of each
+    degree with coefficients of the given bits, skipping the quadratic
+    ones where they would take too long, and divmod of a polynomial of
+    twice the degree by x^n + (a short tail), which takes the Newton
+    iteration path. See the thresholds in densepoly.py. Karatsuba
+    only beats Kronecker substitution on large coefficients, as in
+    dense_poly((16, 64, 256), 2048): see KARATSUBA_MIN_BITS.
+    """
+    kernels = ((densepoly.schoolbook_mul, 1000),
+               (densepoly.karatsuba_mul, 10000),
+               (densepoly.kronecker_mul, None))
+    print('\ndense polynomials (seconds):')
+    print('%7s %10s %10s %10s %10s' % ('degree', 'schoolbook', 'karatsuba',
+                                       'kronecker', 'divmod'))
+    for n in degrees:
+        a = [random.randrange(-1 << bits, 1 << bits) for _ in range(n + 1)]
+        b = [random.randrange(-1 << bits, 1 << bits) for _ in range(n + 1)]
+        line = '%7d' % n
+        for kernel, limit in kernels:
+            if limit is None or n <= limit:
+                line += ' %10.4f' % _timed(kernel, a, b)
+            else:
+                line += ' %10s' % '-'
+        num = densepoly.DensePoly(densepoly.kronecker_mul(a, b))
+        den = densepoly.DensePoly(
+            [random.randrange(-9, 10) for _ in range(8)] + [0] * (n - 8) + [1])
+        line += ' %10.4f' % _timed(divmod, num, den, repeat=1)
+        print(line)
+
+
+def eval_plan(points=1000, degree=10):
+    """
+    Times evaluating (x + 2y + 1)^degree at random rational points
+    with Polynomial.eval, with a compiled horner.EvalPlan point by
+    point, and with one EvalPlan.eval_batch call, exact and float.
+    """
+    x = polynomial.Polynomial.var('x', 'x y')
+    y = polynomial.Polynomial.var('y', 'x y')
+    poly = (x + 2 * y + 1) ** degree
+    plan = horner.EvalPlan(poly)
+    pts = [tuple(rfrac.RationalFrac(random.randrange(-9, 10),
+                                    random.randrange(1, 10)) for _ in 'xy')
+           for _ in range(points)]
+    floats = [(float(a), float(b)) for a, b in pts]
+    print('\nevaluation plans (seconds for %d points):' % points)
+    print('%12s %10.4f' % ('Polynomial', _timed(
+        lambda: [poly.eval(*p) for p in pts], repeat=1)))
+    print('%12s %10.4f' % ('EvalPlan', _timed(
+        lambda: [plan.eval(*p) for p in pts], repeat=1)))
+    print('%12s %10.4f' % ('eval_batch', _timed(plan.eval_batch, pts)))
+    print('%12s %10.4f' % ('float batch', _timed(plan.eval_batch, floats)))
+
+
+def matrix_power(sizes=(10, 20, 40, 80), exp=10 ** 18, modulus=998244353):
+    """
+    Times pow(A, exp, modulus) by repeated squaring against the
+    reduction modulo the characteristic polynomial. The crossover
+    is where matmul.int_matpow switches between the two.
+    """
+    print('\nmatrix powers mod %d, exponent %d (seconds):' % (modulus, exp))
+    print('%6s %10s %10s' % ('n', 'squaring', 'charpoly'))
+    for n in sizes:
+        a = [[random.randrange(modulus) for _ in range(n)] for _ in range(n)]
+        print('%6d %10.4f %10.4f' % (
+            n, _timed(matmul.square_pow, a, exp, modulus, repeat=1),
+            _timed(matmul.charpoly_pow, a, exp, modulus, repeat=1)))
+
+
+def determinant(sizes=(8, 12, 16, 20), densities=(0.15, 0.3, 1)):
+    """
+    Times modular.subset_det and modular.bareiss_det on integer
+    matrices with the given fraction of nonzero entries, next to
+    subset_det_cost / n^3, which Matrix.det compares with
+    matrix.SUBSET_DET_WEIGHT to choose between them.
+    """
+    print('\ndeterminants (seconds):')
+    print('%6s %8s %10s %10s %10s' % ('n', 'density', 'cost/n^3',
+                                      'subset', 'bareiss'))
+    for n in sizes:
+        for density in densities:
+            a = [[random.randint(1, 9) if random.random() < density else 0
+                  for _ in range(n)] for _ in range(n)]
+            cost = modular.subset_det_cost(a) / n ** 3
+            subset = (_timed(modular.subset_det, a, repeat=1)
+                      if cost < 100 else float('nan'))
+            print('%6d %8.2f %10.2f %10.4f %10.4f' % (
+                n, density, cost, subset,
+                _timed(modular.bareiss_det, a)))
+
+
+def lazy_chain(sizes=(20, 40, 80)):
+    """
+    Times A @ B @ C @ v and A @ B + 2 * (A @ B) + C evaluated eagerly,
+    left to right, against lazy evaluation (see lazy.py).
+    """
+    print('\nlazy expressions (seconds):')
+    print('%6s %22s %10s %10s' % ('n', 'expression', 'eager', 'lazy'))
+    for n in sizes:
+        a, b, c = (_rational_matrix(n) for _ in range(3))
+        v = vector.Vector([random.randint(-9, 9) for _ in range(n)])
+        for name, eager, lazy in (
+                ('A @ B @ C @ v', lambda: a @ b @ c @ v,
+                 lambda: (a.lazy() @ b @ c @ v).evaluate()),
+                ('A @ B + 2 (A @ B) + C', lambda: a @ b + a @ b * 2 + c,
+                 lambda: (a.lazy() @ b + a.lazy() @ b * 2 + c).evaluate())):
+            print('%6d %22s %10.4f %10.4f' % (
+                n, name, _timed(eager, repeat=1), _timed(lazy, repeat=1)))
+
+
+if __name__ == '__main__':
+    benchmarks = {
+        'dense_poly': dense_poly,
+        'determinant': determinant,
+        'eval_plan': eval_plan,
+        'lazy_chain': lazy_chain,
+        'matmul_crossover': matmul_crossover,
+        'matrix_power': matrix_power,
+        'parallel_scaling': parallel_scaling,
+        'physics_steps': physics_steps,
+    }
+    for name in sys.argv[1:] or benchmarks:
+        benchmarks[name]()
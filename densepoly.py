@@ -0,0 +1,578 @@
+"""
+Dense univariate polynomials with rational coefficients.
+
+A DensePoly is a list of integer coefficient numerators, lowest degree
+first, over one shared positive denominator (as in intvec.py). This
+suits polynomials with few zero coefficients, such as characteristic
+and interpolation polynomials, better than polynomial.Polynomial.
+
+Products of integer coefficient lists pick, by size, schoolbook
+multiplication, Karatsuba recursion, or Kronecker substitution, which
+packs each operand into one python int (see polynomial.kronecker_pack)
+so that CPython's own big-int multiplication does the work. Division
+with remainder tries Newton iteration on the reversed divisor once the
+quotient is long enough, which is fast as long as the inverse series
+of the divisor keeps small coefficients (as for x^n - 1), and falls
+back to schoolbook pseudo-division otherwise.
+"""
+from fractions import Fraction
+from math import gcd
+from numbers import Number
+
+import polynomial
+import rfrac
+
+RF = rfrac.RationalFrac
+
+# Integer products use schoolbook multiplication below
+# KRONECKER_THRESHOLD terms, and Kronecker substitution from there,
+# unless the coefficients have at least KARATSUBA_MIN_BITS bits: then
+# Karatsuba is faster from KARATSUBA_THRESHOLD terms, which is also
+# where its recursion stops. See benchmark.dense_poly() to tune them:
+KARATSUBA_THRESHOLD = 8
+KARATSUBA_MIN_BITS = 1024
+KRONECKER_THRESHOLD = 20
+# Division tries Newton iteration once the quotient has at least
+# NEWTON_THRESHOLD terms, and gives up on it for schoolbook division
+# if the inverse series grows by more than NEWTON_MAX_BITS bits:
+NEWTON_THRESHOLD = 64
+NEWTON_MAX_BITS = 64
+
+
+def _ratio(value) -> (int, int):
+    """ Returns a number as a (numerator, denominator) pair. """
+    if isinstance(value, int):
+        return value, 1
+    if isinstance(value, Fraction):
+        return value.numerator, value.denominator
+    return (value if isinstance(value, RF) else RF(value)).as_ratio()
+
+
+"""
+Integer coefficient list kernels (lowest degree first):
+"""
+def _add(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    return [x + y for x, y in zip(a, b)] + a[len(b):]
+
+
+def _sub(a, b):
+    return _add(a, [-y for y in b])
+
+
+def schoolbook_mul(a: [int, ], b: [int, ]) -> [int, ]:
+    """ Returns the product of two coefficient lists, term by term. """
+    if not a or not b:
+        return []
+    prod = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                prod[i + j] += x * y
+    return prod
+
+
+def karatsuba_mul(a: [int, ], b: [int, ]) -> [int, ]:
+    """
+    Returns the product of two coefficient lists, by splitting each
+    in halves and using three half-size products instead of four.
+    """
+    if min(len(a), len(b)) < KARATSUBA_THRESHOLD:
+        return schoolbook_mul(a, b)
+    half = max(len(a), len(b)) // 2
+    a0, a1 = a[:half], a[half:]
+    b0, b1 = b[:half], b[half:]
+    low = karatsuba_mul(a0, b0)
+    high = karatsuba_mul(a1, b1) if a1 and b1 else []
+    mid = _sub(_sub(karatsuba_mul(_add(a0, a1), _add(b0, b1)), low), high)
+    prod = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(low):
+        prod[i] += x
+    for i, x in enumerate(mid):
+        prod[i + half] += x
+    for i, x in enumerate(high):
+        prod[i + 2 * half] += x
+    return prod
+
+
+def kronecker_mul(a: [int, ], b: [int, ]) -> [int, ]:
+    """
+    Returns the product of two coefficient lists by
+    evaluating both at a power of two and multiplying once.
+    """
+    if not a or not b:
+        return []
+    slots = len(a) + len(b) - 1
+    bits = (max(map(abs, a)).bit_length() + max(map(abs, b)).bit_length() +
+            min(len(a), len(b)).bit_length() + 1)
+    width = -(-bits // 8) * 8
+    prod = (polynomial.kronecker_pack(enumerate(a), slots, width) *
+            polynomial.kronecker_pack(enumerate(b), slots, width))
+    coeffs = [0] * slots
+    for k, c in polynomial.kronecker_unpack(prod, slots, width):
+        coeffs[k] = c
+    return coeffs
+
+
+def int_poly_mul(a: [int, ], b: [int, ]) -> [int, ]:
+    """ Returns the product of two coefficient lists, choosing a kernel. """
+    n = min(len(a), len(b))
+    if n >= KARATSUBA_THRESHOLD:
+        bits = min(max(map(abs, a)), max(map(abs, b))).bit_length()
+        if bits >= KARATSUBA_MIN_BITS:
+            return karatsuba_mul(a, b)
+    if n < KRONECKER_THRESHOLD:
+        return schoolbook_mul(a, b)
+    return kronecker_mul(a, b)
+
+
+def _strip(a: [int, ]) -> [int, ]:
+    while a and not a[-1]:
+        a.pop()
+    return a
+
+
+def _series_inverse(v: [int, ], n: int, max_bits: int) -> [int, ]:
+    """
+    Private. Returns the first n coefficients of 1 / v as a power
+    series, where v[0] is 1 so that they are all integers. Each
+    Newton step g <- g * (2 - v * g) doubles the number of correct
+    coefficients. Returns None as soon as a coefficient has more
+    than max_bits bits.
+    """
+    g, k = [1], 1
+    while k < n:
+        k = min(2 * k, n)
+        e = int_poly_mul(v[:k], g)[:k]
+        e = [-x for x in e]
+        e[0] += 2
+        g = int_poly_mul(g, e)[:k]
+        if max(abs(c) for c in g).bit_length() > max_bits:
+            return None
+    return g
+
+
+def _divmod_newton(a: [int, ], b: [int, ]) -> ([int, ], int) or None:
+    """
+    Private. For integer coefficient lists a and b, where the lead
+    coefficient of b is l, returns (Q, l^(m+1)) where the quotient of
+    a by b is Q / l^(m+1), and m = deg(a) - deg(b).
+
+    With x = l * t, the reversed divisor is l * V(t) for an integer
+    series V with V(0) = 1, so 1 / V has integer coefficients w_k,
+    and 1 / rev(b) has coefficients w_k / l^(k+1).
+
+    Unless V has roots on the unit circle only (as for x^n - 1), the
+    w_k grow by a few bits each, which soon makes this slower than
+    _divmod_schoolbook. Returns None once they outgrow the inputs'
+    coefficients by NEWTON_MAX_BITS bits.
+    """
+    m = len(a) - len(b)
+    lead = b[-1]
+    rev_b = b[::-1][:m + 1]
+    # V(t) = rev(b)(l * t) / l, so v[i] = rev_b[i] * l^(i-1):
+    power, v = 1, [1]
+    for c in rev_b[1:]:
+        v.append(c * power)
+        power *= lead
+    max_bits = max(abs(c) for c in a + b).bit_length() + NEWTON_MAX_BITS
+    w = _series_inverse(v, m + 1, max_bits)
+    if w is None:
+        return None
+    power, scaled = 1, []
+    for c in a[::-1][:m + 1]:
+        scaled.append(c * power)
+        power *= lead
+    p = int_poly_mul(scaled, w)[:m + 1]
+    # The reversed quotient has coefficients p[k] / l^(k+1):
+    denom = lead ** (m + 1)
+    quot = [c * lead ** (m - k) for k, c in enumerate(p)]
+    return quot[::-1], denom
+
+
+def _divmod_schoolbook(a: [int, ], b: [int, ]) -> ([int, ], int):
+    """
+    Private. Same as _divmod_newton, by pseudo-division: the remainder
+    is scaled by the lead coefficient of b before each step.
+    """
+    m = len(a) - len(b)
+    lead, rem = b[-1], list(a)
+    quot = [0] * (m + 1)
+    for k in range(m, -1, -1):
+        c = rem[k + len(b) - 1]
+        if lead != 1:
+            rem = [r * lead for r in rem[:k + len(b)]]
+        quot[k] = c
+        for i, y in enumerate(b):
+            rem[k + i] -= c * y
+    # quot[k] is scaled by the k later steps:
+    power = 1
+    for k in range(m + 1):
+        quot[k] *= power
+        power *= lead
+    return quot, lead ** (m + 1)
+
+
+def _sign_at(coeffs: [int, ], p: int, q: int) -> int:
+    """
+    Private. Returns the sign of the integer polynomial at p / q,
+    for q > 0, from sum(c_i * p^i * q^(n-i)) as in DensePoly.eval.
+    """
+    value, q_power = 0, 1
+    for c in reversed(coeffs):
+        value = value * p + c * q_power
+        q_power *= q
+    return (value > 0) - (value < 0)
+
+
+def _variations(sequence: [[int, ], ], x: Fraction) -> int:
+    """ Private. Counts the sign changes of a Sturm sequence at x. """
+    signs = [_sign_at(c, x.numerator, x.denominator) for c in sequence]
+    signs = [s for s in signs if s]
+    return sum(a != b for a, b in zip(signs, signs[1:]))
+
+
+class DensePoly:
+    """
+    A univariate polynomial stored as integer numerators of its
+    coefficients, lowest degree first, over a shared denominator.
+    The representation is kept reduced: no trailing zeros, denom > 0,
+    and no factor common to denom and all of the numerators.
+    -- coeffs:  [int, ]
+    -- denom:   int
+    """
+
+    def __init__(self, coeffs=(), denom: int = 1):
+        """
+        coeffs is an iterable of numbers that can make a RationalFrac,
+        lowest degree first. It is copied, never modified.
+        """
+        coeffs = list(coeffs)
+        if all(type(c) is int for c in coeffs):
+            self.coeffs = coeffs
+        else:
+            ratios = [_ratio(c) for c in coeffs]
+            lcm = 1
+            for _, d in ratios:
+                lcm = lcm * d // gcd(lcm, d)
+            self.coeffs = [n * (lcm // d) for n, d in ratios]
+            denom *= lcm
+        self.denom = denom
+        self._reduce()
+
+    def _reduce(self):
+        """ Private. The single gcd reduction done after each operation. """
+        _strip(self.coeffs)
+        if self.denom < 0:
+            self.coeffs = [-c for c in self.coeffs]
+            self.denom = -self.denom
+        g = gcd(self.denom, *self.coeffs)
+        if g > 1:
+            self.coeffs = [c // g for c in self.coeffs]
+            self.denom //= g
+        elif not self.coeffs:
+            self.denom = 1
+
+    @staticmethod
+    def from_polynomial(poly):
+        """ Returns a univariate polynomial.Polynomial as a DensePoly. """
+        if len(poly.variables) != 1:
+            raise ValueError('polynomial is not univariate.')
+        coeffs = [0] * (poly.degree() + 1)
+        for (e, ), c in poly.terms.items():
+            coeffs[e] = c
+        return DensePoly(coeffs, poly.denom)
+
+    def to_polynomial(self, var: str = 'x'):
+        """ Returns this as a polynomial.Polynomial in var. """
+        return polynomial.Polynomial._make(
+            {(e, ): c for e, c in enumerate(self.coeffs) if c},
+            self.denom, (var, ))
+
+    """
+    Public-use, representation/observer methods:
+    """
+    def degree(self) -> int:
+        """ Returns the degree. The zero polynomial has degree -1. """
+        return len(self.coeffs) - 1
+
+    def __len__(self):
+        return len(self.coeffs)
+
+    def __bool__(self):
+        return bool(self.coeffs)
+
+    def __getitem__(self, i: int) -> RF:
+        """ Returns the coefficient of x^i. """
+        c = self.coeffs[i] if 0 <= i < len(self.coeffs) else 0
+        return RF.from_ratio(c, self.denom)
+
+    def lead(self) -> RF:
+        """ Returns the leading coefficient. """
+        return self[len(self.coeffs) - 1]
+
+    def __eq__(self, other):
+        if isinstance(other, (RF, Number)):
+            other = DensePoly([other])
+        if isinstance(other, DensePoly):
+            return self.denom == other.denom and self.coeffs == other.coeffs
+        return NotImplemented
+
+    def __str__(self):
+        return str(self.to_polynomial())
+
+    def __repr__(self):
+        return f'DensePoly({self})'
+
+    """
+    Arithmetic:
+    """
+    def _operand(self, other):
+        if isinstance(other, DensePoly):
+            return other
+        if isinstance(other, (RF, Number)):
+            return DensePoly([other])
+        return None
+
+    def __add__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        g = gcd(self.denom, other.denom)
+        s, o = other.denom // g, self.denom // g
+        return DensePoly(_add([c * s for c in self.coeffs],
+                              [c * o for c in other.coeffs]),
+                         self.denom * s)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __neg__(self):
+        return DensePoly([-c for c in self.coeffs], self.denom)
+
+    def __sub__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return self.__add__(other.__neg__())
+
+    def __rsub__(self, other):
+        return self.__neg__().__add__(other)
+
+    def __mul__(self, other):
+        if isinstance(other, (RF, Number)):
+            numer, denom = _ratio(other)
+            return DensePoly([c * numer for c in self.coeffs],
+                             self.denom * denom)
+        elif isinstance(other, DensePoly):
+            return DensePoly(int_poly_mul(self.coeffs, other.coeffs),
+                             self.denom * other.denom)
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __pow__(self, exp: int, modulo=None):
+        if not isinstance(exp, int) or exp < 0:
+            return NotImplemented
+        result, base = DensePoly([1]), self
+        while exp:
+            if exp & 1:
+                result = result * base
+            exp >>= 1
+            if exp:
+                base = base * base
+        return result
+
+    def __divmod__(self, other):
+        """
+        Returns (quotient, remainder) of division by a nonzero
+        polynomial, where deg(remainder) < deg(other).
+        """
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        if not other:
+            raise ZeroDivisionError('polynomial division by zero.')
+        a, b = self.coeffs, other.coeffs
+        if len(a) < len(b):
+            return DensePoly(), self
+        m = len(a) - len(b)
+        result = None
+        if m + 1 >= NEWTON_THRESHOLD and len(b) > 1:
+            result = _divmod_newton(a, b)
+        quot, scale = result or _divmod_schoolbook(a, b)
+        # self = (a / da), other = (b / db), and a / b = quot / scale:
+        q = DensePoly([c * other.denom for c in quot], scale * self.denom)
+        r = self - q * other
+        return q, r
+
+    def __floordiv__(self, other):
+        return self.__divmod__(other)[0]
+
+    def __mod__(self, other):
+        return self.__divmod__(other)[1]
+
+    def derivative(self):
+        return DensePoly([i * c for i, c in enumerate(self.coeffs)][1:],
+                         self.denom)
+
+    def eval(self, x) -> RF:
+        """
+        Returns the exact value at x. For x = p / q, Horner's
+        scheme runs on integers, as sum(c_i * p^i * q^(n-i)).
+        """
+        p, q = _ratio(x)
+        if not self.coeffs:
+            return RF(0)
+        value, q_power = 0, 1
+        for c in reversed(self.coeffs):
+            value = value * p + c * q_power
+            q_power *= q
+        return RF.from_ratio(value, q_power // q * self.denom)
+
+    __call__ = eval
+
+    """
+    Greatest common divisors and real roots:
+    """
+    def monic(self):
+        """ Returns this divided by its leading coefficient. """
+        if not self.coeffs:
+            return self
+        return DensePoly(list(self.coeffs), self.coeffs[-1])
+
+    def primitive(self):
+        """
+        Returns the integer polynomial with coprime coefficients that
+        is a positive multiple of this one: it has the same roots and
+        the same signs everywhere.
+        """
+        g = gcd(*self.coeffs)
+        return DensePoly([c // g for c in self.coeffs]) if g else self
+
+    def gcd(self, other):
+        """ Returns the monic greatest common divisor, by Euclid. """
+        a, b = self.primitive(), other.primitive()
+        while b:
+            a, b = b, (a % b).primitive()
+        return a.monic()
+
+    def squarefree(self):
+        """ Returns the monic product of the distinct factors. """
+        return (self // self.gcd(self.derivative())).monic()
+
+    def sturm_sequence(self) -> [[int, ], ]:
+        """
+        Returns the Sturm sequence p, p', -rem(p, p'), ... of the
+        square-free part p of this polynomial, as primitive integer
+        coefficient lists (positive multiples of the exact terms).
+        """
+        p = self.squarefree().primitive()
+        sequence = [p, p.derivative().primitive()]
+        while sequence[-1].degree() > 0:
+            sequence.append((-(sequence[-2] % sequence[-1])).primitive())
+        return [q.coeffs for q in sequence if q]
+
+    def root_bound(self) -> int:
+        """ Returns an int B such that every root has |root| < B. """
+        lead = abs(self.coeffs[-1])
+        return 2 + max(map(abs, self.coeffs[:-1]), default=0) // lead
+
+    def count_real_roots(self, lo=None, hi=None) -> int:
+        """
+        Returns the number of distinct real roots in (lo, hi], by
+        Sturm's theorem. lo and hi default to -B and B (root_bound).
+        """
+        if self.degree() < 1:
+            return 0
+        sequence = self.sturm_sequence()
+        bound = self.root_bound()
+        lo = Fraction(*_ratio(lo)) if lo is not None else Fraction(-bound)
+        hi = Fraction(*_ratio(hi)) if hi is not None else Fraction(bound)
+        return _variations(sequence, lo) - _variations(sequence, hi)
+
+    def real_root_intervals(self, max_width=None) -> [(RF, RF), ]:
+        """
+        Returns one interval (lo, hi) with rational endpoints for each
+        distinct real root, in increasing order: the root is the only
+        one in the open interval (lo, hi), or equals lo == hi when it
+        was hit exactly. Intervals are found by bisection with Sturm
+        sequences, and then narrowed until hi - lo <= max_width.
+        """
+        if self.degree() < 1:
+            return []
+        sequence = self.sturm_sequence()
+        square_free = sequence[0]
+        bound = self.root_bound()
+        found = []
+        stack = [(Fraction(-bound), Fraction(bound))]
+        while stack:
+            lo, hi = stack.pop()
+            count = _variations(sequence, lo) - _variations(sequence, hi)
+            if count > 1:
+                mid = (lo + hi) / 2
+                stack.extend([(mid, hi), (lo, mid)])
+            elif count == 1:
+                found.append(self._narrow(square_free, lo, hi, max_width))
+        found.sort(key=lambda pair: pair[0])
+        return [(RF.from_ratio(lo.numerator, lo.denominator),
+                 RF.from_ratio(hi.numerator, hi.denominator))
+                for lo, hi in found]
+
+    @staticmethod
+    def _narrow(coeffs: [int, ], lo: Fraction, hi: Fraction,
+                max_width) -> (Fraction, Fraction):
+        """
+        Private. Returns the interval of the one root in (lo, hi]
+        of a square-free integer polynomial, bisected by signs.
+        """
+        sign_hi = _sign_at(coeffs, hi.numerator, hi.denominator)
+        if not sign_hi:
+            return hi, hi
+        width = Fraction(*_ratio(max_width)) if max_width is not None \
+            else hi - lo
+        while hi - lo > width:
+            mid = (lo + hi) / 2
+            sign = _sign_at(coeffs, mid.numerator, mid.denominator)
+            if not sign:
+                return mid, mid
+            elif sign == sign_hi:
+                hi = mid
+            else:
+                lo = mid
+        return lo, hi
+
+
+def densepoly_tests():
+    print('\n==========================================')
+    print('densepoly.py @ densepoly_tests: //////////\n')
+    p = DensePoly([1, RF(1, 2), 3])
+    q = DensePoly([-1, 1])
+    print('p =', p, 'and q =', q)
+    print('from a generator:', DensePoly(c for c in [1, 2, 3]),
+          'and expected = 3*x^2 + 2*x + 1')
+    print('p * q =', p * q)
+    print('divmod(p, q) =', *divmod(p, q),
+          'and expected = 3*x + 7/2, 9/2')
+    print('p(2/3) =', p(RF(2, 3)), 'and expected = 8/3')
+    big = DensePoly(list(range(1, 301)))
+    print('kernels agree:',
+          schoolbook_mul(big.coeffs, big.coeffs) ==
+          karatsuba_mul(big.coeffs, big.coeffs) ==
+          kronecker_mul(big.coeffs, big.coeffs))
+    for divisor in (DensePoly([-1] + [0] * 79 + [1]),
+                    DensePoly([RF(1, 3)] * 80 + [7])):
+        quot, rem = divmod(big * big, divisor)
+        print('division by degree 80:', quot * divisor + rem == big * big)
+    cubic = DensePoly([-2, 0, 1]) * DensePoly([-1, 1]) ** 2
+    print('real roots of', cubic, 'in:', *cubic.real_root_intervals(
+        RF(1, 100)), 'around -/+ 2^(1/2) and 1')
+    print('\ndensepoly.py @ end of densepoly_tests ////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    densepoly_tests()
@@ -0,0 +1,400 @@
+"""
+Compiled evaluation plans for polynomials.
+
+An EvalPlan compiles one Polynomial, or a list or a table of them
+(say, the entries of a rotation matrix in c = cos(o) and s = sin(o)),
+into a straight-line program of integer additions and multiplications
+over numbered registers. Evaluating the plan then runs that program,
+without walking the dicts of terms again.
+
+Each polynomial is compiled by a recursive Horner scheme: it is split
+by the powers of its first variable, each part is compiled over the
+remaining variables, and the parts are combined as
+    q_0 + x^(e_1 - e_0) * (q_1 + x^(e_2 - e_1) * (q_2 + ...)) * x^e_0.
+Powers of each variable come from one shared power table, built by
+repeated squaring. Every operation is keyed by its opcode and operands
+as it is created, so that equal subexpressions, within a polynomial or
+across all of them, are computed once (common subexpression
+elimination).
+
+Exact values x_v = n_v / d_v are evaluated on integers only, as in
+DensePoly.eval: a register that holds a polynomial of degree D_v in
+x_v holds its value times prod(d_v^D_v), and sums first scale the
+operand of lower degree by powers of d_v. Float64 values skip the
+scaling. A batch of points runs the same program once on columns of
+values, one per variable, instead of once per point.
+"""
+from fractions import Fraction
+from numbers import Number
+from operator import add, mul
+
+import backend
+import batch
+import polynomial
+import rfrac
+
+RF = rfrac.RationalFrac
+
+# Opcodes. SCALE and DMUL are multiplications by powers of the
+# denominators of exact inputs, which float64 evaluation skips:
+MUL, ADD, SCALE, DMUL = range(4)
+
+
+def _ratio(value) -> (int, int):
+    """ Returns a number as a (numerator, denominator) pair. """
+    if isinstance(value, int):
+        return value, 1
+    if isinstance(value, Fraction):
+        return value.numerator, value.denominator
+    return (value if isinstance(value, RF) else RF(value)).as_ratio()
+
+
+def _add_columns(a: list, b: list) -> list:
+    return list(map(add, a, b))
+
+
+def _mul_columns(a: list, b: list) -> list:
+    return list(map(mul, a, b))
+
+
+class EvalPlan:
+    """
+    A compiled straight-line program evaluating several
+    polynomials at once. Registers 0 to n-1 hold the numerators
+    of the n variables, and n to 2n-1 their denominators.
+    -- variables:   (str, )
+    -- consts:      [(int, int), ]              (register, value)
+    -- ops:         [(int, int, int, int), ]    (register, opcode, a, b)
+    -- outputs:     [(int, int, (int, )), ]     (register, denom, degrees)
+                                                register is None for 0.
+    -- shape:       None, int, or (int, int)    Of the compiled input.
+    """
+
+    def __init__(self, polys, variables=None):
+        """
+        polys is a Polynomial, a list of them, or a list of
+        equal length lists of them; numbers are constants. The
+        variables default to those of polys, in order of appearance.
+        """
+        if isinstance(polys, list) and polys and isinstance(polys[0], list):
+            self.shape = (len(polys), len(polys[0]))
+            flat = [p for row in polys for p in row]
+        elif isinstance(polys, list):
+            self.shape = len(polys)
+            flat = list(polys)
+        else:
+            self.shape = None
+            flat = [polys]
+        flat = [p if isinstance(p, polynomial.Polynomial) else
+                polynomial.Polynomial(p, ()) for p in flat]
+        if variables is None:
+            names = []
+            for p in flat:
+                names.extend(v for v in p.variables if v not in names)
+            variables = names
+        self.variables = polynomial._variables(variables)
+
+        n = len(self.variables)
+        self.consts, self.ops, self.outputs = [], [], []
+        self._nodes, self._values = {}, {}
+        self._degrees = [tuple(int(i == v) for i in range(n))
+                         for v in range(n)] * 2
+        for p in flat:
+            missing = set(p.variables) - set(self.variables)
+            if missing:
+                raise ValueError(f'variables {missing} are not bound.')
+            index = [p.variables.index(v) if v in p.variables else None
+                     for v in self.variables]
+            terms = {tuple(m[k] if k is not None else 0 for k in index): c
+                     for m, c in p.terms.items()}
+            reg = self._horner(terms, 0)
+            self.outputs.append(
+                (reg, p.denom, self._degrees[reg] if reg is not None
+                 else (0, ) * n))
+        self._size = len(self._degrees)
+        del self._nodes, self._values, self._degrees
+        self._float_ops, self._float_outputs = self._without_scaling()
+
+    """
+    Compilation:
+    """
+    def _new(self, degrees: (int, )) -> int:
+        """ Private. Returns a new register. """
+        self._degrees.append(degrees)
+        return len(self._degrees) - 1
+
+    def _const(self, value: int) -> int:
+        key = ('c', value)
+        if key not in self._nodes:
+            reg = self._new((0, ) * len(self.variables))
+            self.consts.append((reg, value))
+            self._values[reg] = value
+            self._nodes[key] = reg
+        return self._nodes[key]
+
+    def _op(self, opcode: int, a: int, b: int) -> int:
+        """
+        Private. Returns the register of an operation,
+        reusing it if it was already compiled.
+        """
+        key = (opcode, min(a, b), max(a, b)) if opcode != SCALE \
+            else (opcode, a, b)
+        if key not in self._nodes:
+            if opcode == ADD:
+                degrees = self._degrees[a]
+            else:
+                degrees = tuple(map(add, self._degrees[a], self._degrees[b]))
+            reg = self._new(degrees)
+            self.ops.append((reg, opcode, a, b))
+            self._nodes[key] = reg
+        return self._nodes[key]
+
+    def _mul(self, a: int, b: int) -> int:
+        ca, cb = self._values.get(a), self._values.get(b)
+        if ca is not None and cb is not None:
+            return self._const(ca * cb)
+        if ca == 1:
+            return b
+        if cb == 1:
+            return a
+        return self._op(MUL, a, b)
+
+    def _add(self, a: int, b: int) -> int:
+        """
+        Private. Scales the operand of lower degree in
+        each variable by powers of its denominator.
+        """
+        ca, cb = self._values.get(a), self._values.get(b)
+        if ca is not None and cb is not None:
+            return self._const(ca + cb)
+        da, db = self._degrees[a], self._degrees[b]
+        top = tuple(map(max, da, db))
+        if da != top:
+            a = self._op(SCALE, a, self._denoms(map(int.__sub__, top, da)))
+        if db != top:
+            b = self._op(SCALE, b, self._denoms(map(int.__sub__, top, db)))
+        return self._op(ADD, a, b)
+
+    def _power(self, reg: int, k: int, opcode: int = MUL) -> int:
+        """
+        Private. Returns reg^k through the shared power table of reg,
+        by repeated squaring.
+        """
+        if k == 1:
+            return reg
+        half = self._power(reg, k // 2, opcode)
+        square = self._op(opcode, half, half)
+        return self._op(opcode, square, reg) if k % 2 else square
+
+    def _denoms(self, exps) -> int:
+        """ Private. Returns the product of the d_v^exps[v]. """
+        n, result = len(self.variables), None
+        for v, e in enumerate(exps):
+            if e:
+                term = self._power(n + v, e, DMUL)
+                result = term if result is None else \
+                    self._op(DMUL, result, term)
+        return result
+
+    def _horner(self, terms: dict, v: int):
+        """
+        Private. Compiles the terms, whose monomials are exponent
+        tuples in variables v onward, by Horner's scheme in v.
+        Returns the register of the result, or None for 0.
+        """
+        if not terms:
+            return None
+        if v == len(self.variables):
+            return self._const(sum(terms.values()))
+        parts = {}
+        for m, c in terms.items():
+            parts.setdefault(m[v], {})[m] = c
+        exps = sorted(parts)
+        acc = self._horner(parts[exps[-1]], v + 1)
+        for j in range(len(exps) - 2, -1, -1):
+            acc = self._mul(acc, self._power(v, exps[j + 1] - exps[j]))
+            acc = self._add(acc, self._horner(parts[exps[j]], v + 1))
+        if exps[0]:
+            acc = self._mul(acc, self._power(v, exps[0]))
+        return acc
+
+    def _without_scaling(self) -> ([(int, int, int, int), ], list):
+        """
+        Private. Returns the ops and outputs of the float64 program:
+        SCALE results are renamed to their operand, and DMULs dropped.
+        """
+        alias = list(range(self._size))
+        ops = []
+        for reg, opcode, a, b in self.ops:
+            if opcode == SCALE:
+                alias[reg] = alias[a]
+            elif opcode != DMUL:
+                ops.append((reg, opcode, alias[a], alias[b]))
+        outputs = [(alias[reg] if reg is not None else None, denom)
+                   for reg, denom, _ in self.outputs]
+        return ops, outputs
+
+    def __len__(self):
+        """ Returns the number of arithmetic operations of one evaluation. """
+        return len(self.ops)
+
+    """
+    Evaluation:
+    """
+    def _run(self, inputs: list, exact: bool, const, add_op, mul_op) -> list:
+        """
+        Private. Runs the program on inputs, the 2n first registers,
+        and returns the register file. const converts a constant.
+        """
+        regs = inputs + [None] * (self._size - len(inputs))
+        for reg, value in self.consts:
+            regs[reg] = const(value)
+        for reg, opcode, a, b in self.ops if exact else self._float_ops:
+            if opcode == ADD:
+                regs[reg] = add_op(regs[a], regs[b])
+            else:
+                regs[reg] = mul_op(regs[a], regs[b])
+        return regs
+
+    def _shaped(self, flat: list):
+        """ Private. Arranges outputs in the shape of the compiled input. """
+        if self.shape is None:
+            return flat[0]
+        if isinstance(self.shape, int):
+            return flat
+        rows, cols = self.shape
+        return [flat[i * cols:(i + 1) * cols] for i in range(rows)]
+
+    def _point(self, values, named: dict) -> list:
+        if named:
+            values = [named[v] for v in self.variables]
+        elif len(values) == 1 and isinstance(values[0], dict):
+            values = [values[0][v] for v in self.variables]
+        if len(values) != len(self.variables):
+            raise ValueError(f'expected values of {self.variables}.')
+        return list(values)
+
+    def eval(self, *values, **named):
+        """
+        Returns the values of the polynomials at a point, given
+        positionally in the order of variables, as a dict, or by
+        name. Values are RationalFrac objects, or floats when any
+        coordinate of the point is a float.
+        """
+        point = self._point(values, named)
+        if any(isinstance(x, float) for x in point):
+            regs = self._run(list(map(float, point)) + [1.0] * len(point),
+                             False, float, add, mul)
+            return self._shaped([regs[r] / denom if r is not None else 0.0
+                                 for r, denom in self._float_outputs])
+        ratios = [_ratio(x) for x in point]
+        regs = self._run([n for n, _ in ratios] + [d for _, d in ratios],
+                         True, int, add, mul)
+        flat = []
+        for r, denom, degrees in self.outputs:
+            if r is None:
+                flat.append(RF(0))
+                continue
+            for (_, d), e in zip(ratios, degrees):
+                denom *= d ** e
+            flat.append(RF.from_ratio(regs[r], denom))
+        return self._shaped(flat)
+
+    __call__ = eval
+
+    def eval_batch(self, points) -> list:
+        """
+        Returns the values of the polynomials at every point of
+        points, a list of points (as in eval), or a batch.VectorBatch
+        whose coordinates are the variables in order. The program
+        runs once, on columns of values.
+        """
+        if isinstance(points, batch.VectorBatch):
+            if points.dim != len(self.variables):
+                raise ValueError(f'expected values of {self.variables}.')
+            count, exact = len(points), points.exact
+            if exact:
+                numers = [list(col.numers) for col in points.columns]
+                denoms = [[col.denom] * count for col in points.columns]
+            else:
+                columns = [col.data for col in points.columns]
+        else:
+            rows = [self._point((p, ) if isinstance(p, (dict, RF, Number))
+                                else tuple(p), {}) for p in points]
+            count = len(rows)
+            exact = not any(isinstance(x, float) for p in rows for x in p)
+            if exact:
+                ratios = [[_ratio(x) for x in col] for col in zip(*rows)]
+                numers = [[n for n, _ in col] for col in ratios]
+                denoms = [[d for _, d in col] for col in ratios]
+            else:
+                columns = [backend.FloatVector(col).data
+                           for col in zip(*rows)]
+        if not count:
+            return []
+
+        if not exact:
+            if backend.np is not None:
+                columns = [backend.np.asarray(c, dtype=backend.np.float64)
+                           for c in columns]
+                regs = self._run(columns + [1.0] * len(columns), False,
+                                 lambda c: backend.np.full(count, float(c)),
+                                 add, mul)
+            else:
+                regs = self._run([list(c) for c in columns] +
+                                 [[1.0] * count] * len(columns), False,
+                                 lambda c: [float(c)] * count,
+                                 _add_columns, _mul_columns)
+            flat = [[float(x) / denom for x in regs[r]] if r is not None
+                    else [0.0] * count for r, denom in self._float_outputs]
+            return [self._shaped([col[i] for col in flat])
+                    for i in range(count)]
+
+        regs = self._run(numers + denoms, True, lambda c: [c] * count,
+                         _add_columns, _mul_columns)
+        flat = []
+        for r, denom, degrees in self.outputs:
+            if r is None:
+                flat.append([RF(0)] * count)
+                continue
+            dens = [denom] * count
+            for col, e in zip(denoms, degrees):
+                if e:
+                    dens = [x * d ** e for x, d in zip(dens, col)]
+            flat.append([RF.from_ratio(n, d) for n, d in zip(regs[r], dens)])
+        return [self._shaped([col[i] for col in flat]) for i in range(count)]
+
+
+def horner_tests():
+    print('\n==========================================')
+    print('horner.py @ horner_tests: ////////////////\n')
+    x, y = polynomial.Polynomial.var('x', 'x y'), \
+        polynomial.Polynomial.var('y', 'x y')
+    p = x ** 4 + RF(1, 2) * x * y - 3 * y ** 2 + 1
+    plan = EvalPlan(p)
+    print('p =', p, 'compiled to', len(plan), 'operations')
+    print('p(2, 1) =', plan(2, 1), 'and expected =', p(2, 1))
+    print('p(1/2, 2/3) =', plan(RF(1, 2), RF(2, 3)),
+          'and expected =', p(RF(1, 2), RF(2, 3)))
+    print('p(0.5, 2.0) =', plan(0.5, 2.0))
+    c, s = polynomial.Polynomial.var('c', 'c s'), \
+        polynomial.Polynomial.var('s', 'c s')
+    rot = [[c, -s], [s, c]]
+    twice = [[c * c - s * s, -2 * c * s], [2 * c * s, c * c - s * s]]
+    plan = EvalPlan(twice)
+    print('rotation by 2o as a plan of', len(plan), 'operations')
+    print('at c = 3/5, s = 4/5:', plan(c=RF(3, 5), s=RF(4, 5)),
+          'and expected = [[-7/25, -24/25], [24/25, -7/25]]')
+    points = [(RF(3, 5), RF(4, 5)), (0, 1), (RF(5, 13), RF(12, 13))]
+    print('batch:', EvalPlan(rot).eval_batch(points)[2],
+          'and expected = [[5/13, -12/13], [12/13, 5/13]]')
+    print('float batch agrees:', all(
+        abs(a - float(b)) < 1e-12 for pt in
+        zip(plan.eval_batch([(0.6, 0.8)])[0], plan(RF(3, 5), RF(4, 5)))
+        for a, b in zip(*pt)))
+    print('\nhorner.py @ end of horner_tests //////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    horner_tests()
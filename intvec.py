@@ -0,0 +1,262 @@
+"""
+Integer-plus-shared-denominator storage for Vector and Matrix.
+
+An IntVector is a list of python int numerators over one positive
+denominator, and an IntMatrix is a list of IntVector rows. Arithmetic
+runs on the integers only, with one gcd reduction per result instead
+of one per entry, and no prime factorization until entries are read
+back as RationalFrac.
+"""
+from fractions import Fraction
+from math import gcd
+from numbers import Number
+from operator import mul
+
+import matmul
+import matrix
+import rfrac
+import vector
+
+RF = rfrac.RationalFrac
+
+
+def _ratio(value) -> (int, int):
+    """ Returns a number as a (numerator, denominator) pair. """
+    if isinstance(value, int):
+        return value, 1
+    if isinstance(value, Fraction):
+        return value.numerator, value.denominator
+    return (value if isinstance(value, RF) else RF(value)).as_ratio()
+
+
+class IntVector:
+    """
+    A vector stored as integer numerators over a shared denominator.
+    The representation is kept reduced: denom > 0, and denom shares
+    no factor with all of the numerators at once.
+    -- numers:  [int, ]
+    -- denom:   int
+    """
+
+    def __init__(self, numers: [int, ], denom: int = 1):
+        """
+        numers is stored by reference.
+        Use from_vector to convert from other entry types.
+        """
+        self.numers = numers
+        self.denom = denom
+        self._reduce()
+
+    def _reduce(self):
+        """ Private. The single gcd reduction done after each operation. """
+        if self.denom < 0:
+            self.numers = [-n for n in self.numers]
+            self.denom = -self.denom
+        g = gcd(self.denom, *self.numers)
+        if g > 1:
+            self.numers = [n // g for n in self.numers]
+            self.denom //= g
+
+    @staticmethod
+    def from_vector(vec):
+        """
+        Returns an IntVector equal to a Vector, or to
+        any list of values that can make a RationalFrac.
+        """
+        ratios = [_ratio(entry) for entry in vec]
+        denom = 1
+        for _, d in ratios:
+            denom = denom * d // gcd(denom, d)
+        return IntVector([n * (denom // d) for n, d in ratios], denom)
+
+    def to_vector(self):
+        """ Returns this as a Vector of RationalFrac. """
+        return vector.Vector([RF.from_ratio(n, self.denom)
+                              for n in self.numers])
+
+    def __len__(self):
+        return len(self.numers)
+
+    def __getitem__(self, i: int) -> RF:
+        return RF.from_ratio(self.numers[i], self.denom)
+
+    def __iter__(self):
+        for n in self.numers:
+            yield RF.from_ratio(n, self.denom)
+
+    def __str__(self):
+        return str(self.to_vector())
+
+    def __eq__(self, other):
+        if isinstance(other, IntVector):
+            return self.denom == other.denom and self.numers == other.numers
+        return NotImplemented
+
+    def _aligned(self, other) -> ([int, ], [int, ], int):
+        """
+        Private. Returns both numerator lists
+        over the lcm of both denominators.
+        """
+        if len(self) != len(other):
+            raise matrix.MatrixSizeError('vector lengths incompatible.')
+        g = gcd(self.denom, other.denom)
+        s, o = other.denom // g, self.denom // g
+        return ([n * s for n in self.numers],
+                [n * o for n in other.numers], self.denom * s)
+
+    def __add__(self, other):
+        if isinstance(other, IntVector):
+            a, b, denom = self._aligned(other)
+            return IntVector(list(map(int.__add__, a, b)), denom)
+        else:
+            return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, IntVector):
+            a, b, denom = self._aligned(other)
+            return IntVector(list(map(int.__sub__, a, b)), denom)
+        else:
+            return NotImplemented
+
+    def __neg__(self):
+        return IntVector([-n for n in self.numers], self.denom)
+
+    def __mul__(self, other):
+        """ Scalar multiplication. """
+        if isinstance(other, (RF, Number)):
+            numer, denom = _ratio(other)
+            return IntVector([n * numer for n in self.numers],
+                             self.denom * denom)
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def dot(self, other) -> RF:
+        """ Returns the dot product as a RationalFrac. """
+        if isinstance(other, IntVector):
+            if len(self) != len(other):
+                raise matrix.MatrixSizeError('vector lengths incompatible.')
+            return RF.from_ratio(sum(map(mul, self.numers, other.numers)),
+                                 self.denom * other.denom)
+        return self.dot(IntVector.from_vector(other))
+
+
+class IntMatrix:
+    """
+    A matrix stored as a list of IntVector rows,
+    so each row has its own shared denominator.
+    -- rows:    [IntVector, ]
+    """
+
+    def __init__(self, rows: [IntVector, ]):
+        """ rows is stored by reference. """
+        self.rows = rows
+
+    @property
+    def nrows(self) -> int:
+        return len(self.rows)
+
+    @property
+    def ncols(self) -> int:
+        return len(self.rows[0])
+
+    @staticmethod
+    def from_matrix(mtx):
+        """ Returns an IntMatrix equal to a Matrix or MatrixView. """
+        return IntMatrix([IntVector.from_vector(row) for row in mtx.rows()])
+
+    def to_matrix(self):
+        """ Returns this as a Matrix of RationalFrac. """
+        return matrix.Matrix([row.to_vector() for row in self.rows])
+
+    def __getitem__(self, r: int) -> IntVector:
+        return self.rows[r]
+
+    def __str__(self):
+        return str(self.to_matrix())
+
+    def __eq__(self, other):
+        if isinstance(other, IntMatrix):
+            return self.rows == other.rows
+        return NotImplemented
+
+    def __add__(self, other):
+        if isinstance(other, IntMatrix):
+            if self.nrows != other.nrows:
+                raise matrix.MatrixSizeError('dimensions not equal')
+            return IntMatrix([a + b for a, b in zip(self.rows, other.rows)])
+        else:
+            return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, IntMatrix):
+            if self.nrows != other.nrows:
+                raise matrix.MatrixSizeError('dimensions not equal')
+            return IntMatrix([a - b for a, b in zip(self.rows, other.rows)])
+        else:
+            return NotImplemented
+
+    def __mul__(self, other):
+        """ Scalar multiplication. """
+        if isinstance(other, (RF, Number)):
+            return IntMatrix([row * other for row in self.rows])
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def _common_rows(self) -> ([[int, ], ], int):
+        """
+        Private. Returns the numerators of every row
+        over the lcm of all of the row denominators.
+        """
+        denom = 1
+        for row in self.rows:
+            denom = denom * row.denom // gcd(denom, row.denom)
+        return [[n * (denom // row.denom) for n in row.numers]
+                for row in self.rows], denom
+
+    def __matmul__(self, other):
+        """
+        Matrix product with an IntMatrix or an IntVector. The integer
+        product runs on the engine in matmul.py, and each result row
+        is reduced once.
+        """
+        if isinstance(other, IntMatrix):
+            if self.ncols != other.nrows:
+                raise matrix.MatrixSizeError('op1 #cols != op2 #rows')
+            b, b_denom = other._common_rows()
+            prod = matmul.int_matmul([row.numers for row in self.rows], b)
+            return IntMatrix([IntVector(numers, row.denom * b_denom)
+                              for numers, row in zip(prod, self.rows)])
+
+        elif isinstance(other, IntVector):
+            if self.ncols != len(other):
+                raise matrix.MatrixSizeError('op1 #cols != op2 length')
+            a, a_denom = self._common_rows()
+            return IntVector([sum(map(mul, row, other.numers)) for row in a],
+                             a_denom * other.denom)
+        else:
+            return NotImplemented
+
+
+def intvec_tests():
+    print('\n==========================================')
+    print('intvec.py @ intvec_tests: ////////////////\n')
+    v = IntVector.from_vector([RF(1, 2), RF(1, 3), 2])
+    w = IntVector.from_vector([RF(1, 6), 0, RF(-5, 4)])
+    print('v =', v, 'as', v.numers, '/', v.denom)
+    print('v + w =', v + w, 'and expected = [2/3, 1/3, 3/4]')
+    print('v . w =', v.dot(w), 'and expected = -29/12')
+    m = IntMatrix.from_matrix(matrix.Matrix([[1, RF(1, 2)], [RF(2, 3), 3]]))
+    print('m @ m =\n', m @ m)
+    print('m @ [6, 4] =', m @ IntVector([6, 4]), 'and expected = [8, 16]')
+    print('\nintvec.py @ end of intvec_tests //////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    intvec_tests()
@@ -0,0 +1,393 @@
+"""
+Lazy Matrix and Vector expressions.
+
+Matrix.lazy() and Vector.lazy() wrap a value in an Expr, whose @, +,
+- and scalar * build an expression graph instead of computing
+anything. Expr.evaluate() then rewrites the graph before running it:
+    1. Scalar factors are pulled out of products, and sums are
+       flattened into one linear combination, where equal terms
+       are merged: (2A) @ B - A @ (3B) + C becomes -(A @ B) + C.
+    2. Each flattened product A_1 @ ... @ A_k is multiplied in the
+       order that minimizes the scalar multiplications, found by the
+       matrix-chain dynamic program in O(k^3). A trailing Vector
+       counts as an n x 1 matrix, so A @ B @ v costs two matrix-vector
+       products instead of a matrix product.
+    3. Every linear combination is computed in a single pass over its
+       terms, entry by entry.
+    4. Subexpressions that are the same after step 1, including the
+       sub-chains of products, are computed only once.
+
+Values are converted once to intvec.IntMatrix and IntVector, so that
+intermediate results never go through RationalFrac, and the result
+is converted back at the end. Expressions over Polynomial entries run
+on Matrix and Vector themselves, in the same order.
+
+Leaves are read when evaluate() is called, not when the expression
+is built.
+"""
+from fractions import Fraction
+from math import gcd
+from numbers import Number
+
+import intvec
+import matrix
+import rfrac
+import vector
+
+RF = rfrac.RationalFrac
+
+
+def _to_fraction(value) -> Fraction:
+    if isinstance(value, (int, Fraction)):
+        return Fraction(value)
+    value = value if isinstance(value, RF) else RF(value)
+    return Fraction(*value.as_ratio())
+
+
+def _wrap(value):
+    """ Private. Returns value as an Expr, or None if it cannot be one. """
+    if isinstance(value, Expr):
+        return value
+    if isinstance(value, (matrix.Matrix, matrix.MatrixView,
+                          vector.Vector)):
+        return Expr.leaf(value)
+    return None
+
+
+class Expr:
+    """
+    A node of a lazy expression.
+    -- op:      str             'leaf', '@', '+' or '*' (by a scalar).
+    -- args:    tuple           Child Exprs, or (value, ) for a leaf.
+    -- scalar:  Fraction        The factor of a '*' node, else None.
+    -- shape:   (int, int)      (nrows, ncols), with ncols None for
+                                Vectors, which act as columns.
+    """
+
+    def __init__(self, op: str, args: tuple, shape: tuple, scalar=None):
+        self.op = op
+        self.args = args
+        self.shape = shape
+        self.scalar = scalar
+
+    @staticmethod
+    def leaf(value):
+        """ Returns an Expr for a Matrix, MatrixView or Vector. """
+        if isinstance(value, vector.Vector):
+            return Expr('leaf', (value, ), (len(value), None))
+        return Expr('leaf', (value, ), (value.nrows, value.ncols))
+
+    def is_vector(self) -> bool:
+        return self.shape[1] is None
+
+    def __str__(self):
+        if self.op == 'leaf':
+            rows, cols = self.shape
+            return f'v{rows}' if cols is None else f'm{rows}x{cols}'
+        if self.op == '*':
+            return f'{self.scalar} * {self.args[0]}'
+        return '(' + f' {self.op} '.join(map(str, self.args)) + ')'
+
+    """
+    Building:
+    """
+    def __matmul__(self, other):
+        other = _wrap(other)
+        if other is None:
+            return NotImplemented
+        if self.is_vector():
+            raise TypeError('lazy vector cross products are not '
+                            'supported.')
+        if self.shape[1] != other.shape[0]:
+            raise matrix.MatrixSizeError('op1 #cols != op2 #rows')
+        return Expr('@', (self, other), (self.shape[0], other.shape[1]))
+
+    def __rmatmul__(self, other):
+        other = _wrap(other)
+        return NotImplemented if other is None else other @ self
+
+    def __add__(self, other):
+        other = _wrap(other)
+        if other is None:
+            return NotImplemented
+        if self.shape != other.shape:
+            raise matrix.MatrixSizeError('dimensions not equal')
+        return Expr('+', (self, other), self.shape)
+
+    def __radd__(self, other):
+        other = _wrap(other)
+        return NotImplemented if other is None else other + self
+
+    def __neg__(self):
+        return self * -1
+
+    def __sub__(self, other):
+        other = _wrap(other)
+        return NotImplemented if other is None else self + -other
+
+    def __rsub__(self, other):
+        other = _wrap(other)
+        return NotImplemented if other is None else other + -self
+
+    def __mul__(self, other):
+        """ Multiplication by a number or RationalFrac. """
+        if isinstance(other, (RF, Number)):
+            return Expr('*', (self, ), self.shape, _to_fraction(other))
+        return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    """
+    Evaluation:
+    """
+    def evaluate(self):
+        """
+        Returns the value of this expression, as a Matrix or a
+        Vector. See the module docstring for the rewrites done first.
+        """
+        return _Evaluation().run(self)
+
+
+class _Evaluation:
+    """
+    Private. The state of one Expr.evaluate() call.
+
+    Expressions are rewritten into hashable forms, which are also the
+    keys of the results computed so far:
+        ('leaf', id)                        a leaf value,
+        ('@', form, form, ...)              a product of two or more,
+        ('+', (coef, form), (coef, ...))    a linear combination,
+    where the factors of a product are leaves or combinations, and
+    the terms of a combination are leaves or products.
+    -- leaves:  {int: Matrix or Vector}     The leaf values, by id.
+    -- linear:  {int: [(Fraction, form), ]} The terms of each Expr.
+    -- values:  {form: value}               The results so far.
+    -- exact:   bool                        False if some leaf has
+                                            Polynomial entries.
+    """
+
+    def __init__(self):
+        self.leaves = {}
+        self.linear = {}
+        self.values = {}
+        self.exact = True
+
+    def run(self, expr: Expr):
+        terms = self._terms(expr)
+        self.exact = not any(
+            _symbolic(value) for value in self.leaves.values())
+        if not terms:
+            rows, cols = expr.shape
+            if cols is None:
+                return vector.Vector([0] * rows)
+            return matrix.Matrix([[0] * cols for _ in range(rows)])
+        if len(terms) == 1 and terms[0][0] == 1:
+            result = self._value(terms[0][1])
+        else:
+            result = self._value(('+', ) + tuple(terms))
+        if isinstance(result, intvec.IntMatrix):
+            return result.to_matrix()
+        elif isinstance(result, intvec.IntVector):
+            return result.to_vector()
+        # Do not hand out a leaf itself:
+        return result.copy()
+
+    """
+    Rewriting:
+    """
+    def _terms(self, expr: Expr) -> [(Fraction, tuple), ]:
+        """
+        Private. Returns expr as a linear combination of leaves and
+        products, with the scalars folded into the coefficients.
+        Results are kept per node, so shared nodes are seen once.
+        """
+        terms = self.linear.get(id(expr))
+        if terms is not None:
+            return terms
+        if expr.op == 'leaf':
+            value = expr.args[0]
+            self.leaves[id(value)] = value
+            terms = [(Fraction(1), ('leaf', id(value)))]
+        elif expr.op == '*':
+            terms = [(expr.scalar * coef, form)
+                     for coef, form in self._terms(expr.args[0])]
+        elif expr.op == '+':
+            terms = self._terms(expr.args[0]) + self._terms(expr.args[1])
+        else:
+            coef, factors = Fraction(1), []
+            for arg in expr.args:
+                arg_terms = self._terms(arg)
+                if len(arg_terms) == 1:
+                    k, form = arg_terms[0]
+                    coef *= k
+                    factors.extend(form[1:] if form[0] == '@' else [form])
+                else:
+                    factors.append(('+', ) + tuple(arg_terms))
+            terms = [(coef, ('@', ) + tuple(factors))]
+        self.linear[id(expr)] = terms = _merged(terms)
+        return terms
+
+    def _shape(self, form: tuple) -> (int, int):
+        """ Private. Returns (nrows, ncols) of a form, as in Expr. """
+        if form[0] == 'leaf':
+            value = self.leaves[form[1]]
+            if isinstance(value, vector.Vector):
+                return len(value), None
+            return value.nrows, value.ncols
+        elif form[0] == '@':
+            return self._shape(form[1])[0], self._shape(form[-1])[1]
+        return self._shape(form[1][1])
+
+    """
+    Computing:
+    """
+    def _value(self, form: tuple):
+        """ Private. Returns the value of a form, computed only once. """
+        value = self.values.get(form)
+        if value is not None:
+            return value
+        if form[0] == 'leaf':
+            value = self.leaves[form[1]]
+            if self.exact and isinstance(value, vector.Vector):
+                value = intvec.IntVector.from_vector(value)
+            elif self.exact:
+                value = intvec.IntMatrix.from_matrix(value)
+        elif form[0] == '@':
+            value = self._product(form[1:], _chain_order(
+                [self._shape(f) for f in form[1:]]))
+        else:
+            terms = [(coef, self._value(f)) for coef, f in form[1:]]
+            value = (_combine(terms) if self.exact
+                     else _combine_symbolic(terms))
+        self.values[form] = value
+        return value
+
+    def _product(self, factors: tuple, split: dict):
+        """
+        Private. Returns the product of the factors, multiplied in the
+        order given by split, which maps each (i, j) to the k such
+        that factors[i:j] is factors[i:k] @ factors[k:j].
+        """
+        def product(i: int, j: int):
+            if j - i == 1:
+                return self._value(factors[i])
+            form = ('@', ) + factors[i:j]
+            value = self.values.get(form)
+            if value is None:
+                k = split[i, j]
+                value = product(i, k) @ product(k, j)
+                self.values[form] = value
+            return value
+        return product(0, len(factors))
+
+
+def _symbolic(value) -> bool:
+    if isinstance(value, vector.Vector):
+        return matrix._any_symbolic([value])
+    return value.is_symbolic()
+
+
+def _merged(terms: [(Fraction, tuple), ]) -> [(Fraction, tuple), ]:
+    """
+    Private. Adds up the coefficients of equal forms, and drops terms
+    whose coefficient is zero, or whose product has a zero factor.
+    """
+    coefs = {}
+    for coef, form in terms:
+        if form[0] == '@' and any(f == ('+', ) for f in form[1:]):
+            continue
+        coefs[form] = coefs.get(form, 0) + coef
+    return [(coef, form) for form, coef in coefs.items() if coef]
+
+
+def _chain_order(shapes: [(int, int), ]) -> {(int, int): int}:
+    """
+    Private. Solves the matrix-chain problem: returns the split point
+    of every sub-chain in the product of matrices of the given shapes
+    that needs the fewest scalar multiplications, in O(k^3).
+    """
+    dims = [shapes[0][0]] + [cols or 1 for _, cols in shapes]
+    k = len(shapes)
+    cost, split = {}, {}
+    for i in range(k):
+        cost[i, i + 1] = 0
+    for length in range(2, k + 1):
+        for i in range(k - length + 1):
+            j = i + length
+            cost[i, j], split[i, j] = min(
+                (cost[i, m] + cost[m, j] + dims[i] * dims[m] * dims[j], m)
+                for m in range(i + 1, j))
+    return split
+
+
+def _combine(terms: [(Fraction, ), ]):
+    """
+    Private. Returns sum(coef * value) for IntMatrix or IntVector
+    values, in one pass: each row of the result is summed over the
+    lcm of the denominators of its terms, and reduced once.
+    """
+    def combine(rows: list) -> intvec.IntVector:
+        denom = 1
+        for coef, row in zip(coefs, rows):
+            d = coef.denominator * row.denom
+            denom = denom * d // gcd(denom, d)
+        scales = [coef.numerator * (denom // (coef.denominator * row.denom))
+                  for coef, row in zip(coefs, rows)]
+        return intvec.IntVector(
+            [sum(s * n for s, n in zip(scales, col))
+             for col in zip(*(row.numers for row in rows))], denom)
+
+    coefs = [coef for coef, _ in terms]
+    values = [value for _, value in terms]
+    if isinstance(values[0], intvec.IntVector):
+        return combine(values)
+    return intvec.IntMatrix([combine(rows)
+                             for rows in zip(*(v.rows for v in values))])
+
+
+def _combine_symbolic(terms: [(Fraction, ), ]):
+    """ Private. Returns sum(coef * value) for Matrix or Vector values. """
+    coefs = [RF.from_ratio(coef.numerator, coef.denominator)
+             for coef, _ in terms]
+    values = [value for _, value in terms]
+    is_vector = isinstance(values[0], vector.Vector)
+    if is_vector:
+        values = [[v] for v in values]
+    else:
+        values = [list(v.rows()) for v in values]
+    rows = []
+    for row_group in zip(*values):
+        row = []
+        for entries in zip(*row_group):
+            total = None
+            for coef, x in zip(coefs, entries):
+                if x != 0:
+                    total = x * coef if total is None else total + x * coef
+            row.append(RF(0) if total is None else total)
+        rows.append(row)
+    return vector.Vector(rows[0]) if is_vector else matrix.Matrix(rows)
+
+
+def lazy_tests():
+    print('\n==========================================')
+    print('lazy.py @ lazy_tests: ////////////////////\n')
+    a = matrix.Matrix([[1, 2], [3, 4], [5, 6]])
+    b = matrix.Matrix([[1, 0, RF(1, 2)], [0, 1, -1]])
+    v = vector.Vector([1, -1, 2])
+    expr = a.lazy() @ b @ a @ b @ v
+    print(expr, '=', expr.evaluate())
+    print('and expected =', a @ (b @ (a @ (b @ v))))
+    twice = (a @ b).lazy() * 2 - a.lazy() @ (b.lazy() * 3)
+    print('\n2 (a @ b) - a @ (3 b) =\n', twice.evaluate(),
+          '\nand expected = -(a @ b) =\n', a @ b * -1)
+    square = (a.lazy() @ b + b.T @ a.T) @ (a.lazy() @ b + b.T @ a.T)
+    print('\n(ab + (ab)^T)^2 =\n', square.evaluate())
+    print('zero:', (a.lazy() - a).evaluate() == matrix.Matrix(
+        [[0, 0], [0, 0], [0, 0]]))
+    print('\nlazy.py @ end of lazy_tests //////////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    lazy_tests()
@@ -0,0 +1,281 @@
+"""
+Exact LU factorization with low-rank updates.
+
+An LU object keeps the factorization P A = L U of a nonsingular square
+matrix A, with P a row permutation, L unit lower triangular and U upper
+triangular. When A changes by a rank-one term u v^T, as when one row
+or one column is replaced, the factors are updated in O(n^2) by
+Bennett's algorithm instead of being recomputed in O(n^3):
+    P (A + u v^T) = L U + (P u) v^T.
+The determinant is then the product of the diagonal of U, and linear
+systems are solved by two triangular solves, both without touching A.
+An inverse, once asked for, is kept up to date by the Sherman-Morrison
+(rank one) or Woodbury (rank k) formula, also in O(n^2) per rank.
+
+Entries are converted once to fractions.Fraction (see sparse.py), and
+converted back to RationalFrac at the interface.
+"""
+from fractions import Fraction
+
+import matrix
+import rfrac
+import vector
+
+RF = rfrac.RationalFrac
+
+
+def _to_fraction(value) -> Fraction:
+    if isinstance(value, (int, Fraction)):
+        return Fraction(value)
+    value = value if isinstance(value, RF) else RF(value)
+    return Fraction(*value.as_ratio())
+
+
+def _to_rf(value: Fraction) -> RF:
+    return RF.from_ratio(value.numerator, value.denominator)
+
+
+def _factor(rows: [[Fraction, ], ]) -> ([int, ], list, list, int):
+    """
+    Private. Returns (perm, lower, upper, sign) for P A = L U by
+    Gaussian elimination, taking the first nonzero pivot of each
+    column. lower[i][k] holds L below the diagonal. Raises
+    ArithmeticError if A is singular.
+    """
+    n = len(rows)
+    work = [list(row) for row in rows]
+    perm = list(range(n))
+    lower = [[Fraction(0)] * n for _ in range(n)]
+    sign = 1
+    for k in range(n):
+        pivot = next((i for i in range(k, n) if work[i][k]), None)
+        if pivot is None:
+            raise ArithmeticError('matrix is singular.')
+        if pivot != k:
+            work[k], work[pivot] = work[pivot], work[k]
+            perm[k], perm[pivot] = perm[pivot], perm[k]
+            lower[k], lower[pivot] = lower[pivot], lower[k]
+            sign = -sign
+        head = work[k]
+        for i in range(k + 1, n):
+            f = work[i][k] / head[k]
+            if f:
+                lower[i][k] = f
+                row = work[i]
+                for j in range(k, n):
+                    row[j] -= f * head[j]
+    return perm, lower, work, sign
+
+
+def _bennett(lower: list, upper: list, x: [Fraction, ],
+             y: [Fraction, ]) -> bool:
+    """
+    Private. Updates L U to L U + x y^T in place, in O(n^2), and
+    returns True. Each step splits off the first row and column:
+        u' = u + x_k y_k,    r' = r + x_k y_rest,
+        l' = l + x_rest' y_k / u',
+    and recurses on x_rest' = x_rest - x_k l, y_rest' = y_rest -
+    y_k r' / u'. Returns False, with the factors partly updated,
+    if some u' is 0, where a pivoting-free update does not exist.
+    """
+    n = len(upper)
+    x, y = list(x), list(y)
+    for k in range(n):
+        pivot = upper[k][k] + x[k] * y[k]
+        if not pivot:
+            return False
+        head = upper[k]
+        if x[k]:
+            for j in range(k + 1, n):
+                head[j] += x[k] * y[j]
+        c = y[k] / pivot
+        for i in range(k + 1, n):
+            if x[k]:
+                x[i] -= x[k] * lower[i][k]
+            if c and x[i]:
+                lower[i][k] += x[i] * c
+        if c:
+            for j in range(k + 1, n):
+                y[j] -= c * head[j]
+        head[k] = pivot
+    return True
+
+
+class LU:
+    """
+    The factorization P A = L U of a nonsingular square matrix A,
+    updated in place when A changes by a low-rank term.
+    -- rows:    [[Fraction, ], ]    A itself.
+    -- perm:    [int, ]             The row of A in each row of L U.
+    -- lower:   [[Fraction, ], ]    L, below the diagonal.
+    -- upper:   [[Fraction, ], ]    U.
+    -- sign:    int                 The sign of the permutation.
+    """
+
+    def __init__(self, mtx):
+        """
+        mtx is a Matrix, a MatrixView or a list of rows. Raises
+        ArithmeticError if it is singular.
+        """
+        if isinstance(mtx, (matrix.Matrix, matrix.MatrixView)):
+            mtx = mtx.rows()
+        rows = [[_to_fraction(x) for x in row] for row in mtx]
+        if any(len(row) != len(rows) for row in rows):
+            raise matrix.MatrixSizeError(
+                'cannot factor a non-square matrix.')
+        self.rows = rows
+        self.perm, self.lower, self.upper, self.sign = _factor(rows)
+        self._inv = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def to_matrix(self):
+        """ Returns A as a Matrix. """
+        return matrix.Matrix([[_to_rf(x) for x in row]
+                              for row in self.rows])
+
+    """
+    Queries:
+    """
+    def det(self) -> RF:
+        """ Returns det(A), in O(n). """
+        d = Fraction(self.sign)
+        for k, row in enumerate(self.upper):
+            d *= row[k]
+        return _to_rf(d)
+
+    def _solve(self, b: [Fraction, ]) -> [Fraction, ]:
+        """ Private. Solves A x = b by two triangular solves. """
+        n = len(self.rows)
+        z = [b[p] for p in self.perm]
+        for i in range(n):
+            row = self.lower[i]
+            z[i] -= sum(row[k] * z[k] for k in range(i) if row[k])
+        for i in range(n - 1, -1, -1):
+            row = self.upper[i]
+            z[i] = (z[i] - sum(row[k] * z[k] for k in range(i + 1, n)
+                               if row[k])) / row[i]
+        return z
+
+    def solve(self, b) -> vector.Vector:
+        """ Returns the Vector x such that A @ x == b, in O(n^2). """
+        if len(b) != len(self.rows):
+            raise matrix.MatrixSizeError('solution length != #rows')
+        return vector.Vector([_to_rf(x) for x in
+                              self._solve([_to_fraction(v) for v in b])])
+
+    def inverse(self) -> matrix.Matrix:
+        """
+        Returns A^-1. It is computed once in O(n^3), and kept up
+        to date in O(n^2) per rank by the updates that follow.
+        """
+        if self._inv is None:
+            n = len(self.rows)
+            cols = [self._solve([Fraction(int(i == j)) for i in range(n)])
+                    for j in range(n)]
+            self._inv = [list(row) for row in zip(*cols)]
+        return matrix.Matrix([[_to_rf(x) for x in row]
+                              for row in self._inv])
+
+    def det_after(self, u, v) -> RF:
+        """
+        Returns det(A + u v^T) without changing anything, by the
+        matrix determinant lemma: det(A) * (1 + v^T A^-1 u), in O(n^2).
+        """
+        u = [_to_fraction(x) for x in u]
+        v = [_to_fraction(x) for x in v]
+        factor = 1 + sum(a * b for a, b in zip(v, self._solve(u)) if a)
+        return _to_rf(_to_fraction(self.det()) * factor)
+
+    """
+    Updates:
+    """
+    def update(self, u, v):
+        """
+        Changes A to A + u v^T, for vectors u and v, or to A + U V^T
+        for lists u and v of k vectors each (the columns of U and V).
+        The factors get one Bennett update per rank, and the inverse,
+        if it was computed, one Woodbury update. Raises ArithmeticError,
+        and leaves everything unchanged, if A + U V^T is singular.
+        """
+        if u and not isinstance(u[0], (list, tuple, vector.Vector)):
+            u, v = [u], [v]
+        n = len(self.rows)
+        us = [[_to_fraction(x) for x in col] for col in u]
+        vs = [[_to_fraction(x) for x in col] for col in v]
+        if any(len(col) != n for col in us + vs):
+            raise matrix.MatrixSizeError('vector lengths incompatible.')
+        rows = [list(row) for row in self.rows]
+        for uc, vc in zip(us, vs):
+            for i, a in enumerate(uc):
+                if a:
+                    rows[i] = [x + a * b for x, b in zip(rows[i], vc)]
+
+        lower = [list(row) for row in self.lower]
+        upper = [list(row) for row in self.upper]
+        if all(_bennett(lower, upper, [uc[p] for p in self.perm], vc)
+               for uc, vc in zip(us, vs)):
+            perm, sign = self.perm, self.sign
+        else:
+            # Some intermediate pivot vanished: refactor from scratch.
+            perm, lower, upper, sign = _factor(rows)
+        if self._inv is not None:
+            self._inv = self._woodbury(us, vs)
+        self.rows, self.perm, self.sign = rows, perm, sign
+        self.lower, self.upper = lower, upper
+
+    def _woodbury(self, us: list, vs: list) -> [[Fraction, ], ]:
+        """
+        Private. Returns (A + U V^T)^-1 from A^-1 = B, in O(k n^2):
+            B - (B U) (I + V^T B U)^-1 (V^T B).
+        """
+        inv, k = self._inv, len(us)
+        bu = [[sum(row[j] * col[j] for j in range(len(col)) if col[j])
+               for row in inv] for col in us]         # k columns B u
+        vb = [[sum(col[i] * inv[i][j] for i in range(len(col)) if col[i])
+               for j in range(len(inv))] for col in vs]   # k rows v^T B
+        small = [[int(a == b) + sum(x * y for x, y in zip(vs[a], bu[b]))
+                  for b in range(k)] for a in range(k)]
+        # The columns of (I + V^T B U)^-1 (V^T B), then B - (B U) that:
+        solver = LU(small)
+        coef = [solver._solve(list(col)) for col in zip(*vb)]
+        return [[x - sum(bu[a][i] * coef[j][a] for a in range(k))
+                 for j, x in enumerate(row)] for i, row in enumerate(inv)]
+
+    def replace_row(self, i: int, row):
+        """ Replaces row i of A, as the rank-one update e_i (new - old)^T. """
+        n = len(self.rows)
+        diff = [_to_fraction(x) - y for x, y in zip(row, self.rows[i])]
+        self.update([Fraction(int(k == i)) for k in range(n)], diff)
+
+    def replace_col(self, j: int, col):
+        """ Replaces column j of A, as the update (new - old) e_j^T. """
+        n = len(self.rows)
+        diff = [_to_fraction(x) - row[j] for x, row in zip(col, self.rows)]
+        self.update(diff, [Fraction(int(k == j)) for k in range(n)])
+
+
+def lu_tests():
+    print('\n==========================================')
+    print('lu.py @ lu_tests: ////////////////////////\n')
+    system = LU(matrix.Matrix([[2, 1, 1], [4, -6, 0], [-2, 7, 2]]))
+    print('det =', system.det(), 'and expected = -16')
+    print('solve =', system.solve([5, -2, 9]), 'and expected = [1, 1, 2]')
+    system.inverse()
+    print('det after replacing row 0 =',
+          system.det_after([1, 0, 0], [-1, 1, 0]))
+    system.replace_row(0, [1, 2, 1])
+    print('det =', system.det(), 'and expected =',
+          system.to_matrix().det())
+    print('inverse updated:', system.inverse() ==
+          LU(system.to_matrix()).inverse())
+    system.replace_col(2, [0, 1, 0])
+    print('solve after a column =', system.solve([3, 0, 5]),
+          'and expected =', system.to_matrix().solve([3, 0, 5]))
+    print('\nlu.py @ end of lu_tests //////////////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    lu_tests()
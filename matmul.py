@@ -0,0 +1,265 @@
+"""
+Matrix multiplication engine for exact entries.
+
+Operands are converted once to integer rows (and columns) that share
+one denominator per row of the left operand and one per column of the
+right operand. The integer product is then computed by blocked
+iteration, or by Strassen-Winograd recursion for large operands, and
+each entry is divided by its row and column denominators at the end.
+"""
+from math import isqrt
+from operator import add, mul
+
+import matrix
+import modular
+import rfrac
+import vector
+
+RF = rfrac.RationalFrac
+
+# Operands whose dimensions are all at least this
+# large are multiplied by Strassen-Winograd recursion.
+# See benchmark.matmul_crossover() to tune it:
+STRASSEN_THRESHOLD = 128
+BLOCK_SIZE = 32
+
+
+def blocked_matmul(a: [[int, ], ], b_t: [[int, ], ],
+                   block: int = BLOCK_SIZE) -> [[int, ], ]:
+    """
+    Returns a @ b for integer matrices, where b_t is b transposed.
+    Output tiles of block x block cells are filled one at a time so
+    that the same few columns of b are reused across a tile of rows.
+    """
+    prod = [[0] * len(b_t) for _ in a]
+    for j0 in range(0, len(b_t), block):
+        cols = b_t[j0: j0 + block]
+        for i0 in range(0, len(a), block):
+            for i in range(i0, min(i0 + block, len(a))):
+                row = a[i]
+                prod[i][j0: j0 + len(cols)] = [
+                    sum(map(mul, row, col)) for col in cols]
+    return prod
+
+
+def _add(a, b):
+    return [list(map(int.__add__, x, y)) for x, y in zip(a, b)]
+
+
+def _sub(a, b):
+    return [list(map(int.__sub__, x, y)) for x, y in zip(a, b)]
+
+
+def _quadrants(a, nrows, ncols):
+    """
+    Splits a into four quadrants, padding
+    with zeros when a dimension is odd.
+    """
+    hr, hc = (nrows + 1) // 2, (ncols + 1) // 2
+    rows = [row + [0] * (2 * hc - ncols) for row in a]
+    rows.extend([[0] * (2 * hc) for _ in range(2 * hr - nrows)])
+    return ([row[:hc] for row in rows[:hr]], [row[hc:] for row in rows[:hr]],
+            [row[:hc] for row in rows[hr:]], [row[hc:] for row in rows[hr:]])
+
+
+def _transpose(a):
+    return [list(col) for col in zip(*a)]
+
+
+def strassen_matmul(a: [[int, ], ], b: [[int, ], ],
+                    threshold: int = STRASSEN_THRESHOLD) -> [[int, ], ]:
+    """
+    Returns a @ b for integer matrices using Winograd's form of
+    Strassen's algorithm (7 products and 15 additions per level).
+    Recursion stops once any dimension drops below threshold.
+    """
+    n, m, p = len(a), len(b), len(b[0])
+    if min(n, m, p) < max(threshold, 2):
+        return blocked_matmul(a, _transpose(b))
+
+    a11, a12, a21, a22 = _quadrants(a, n, m)
+    b11, b12, b21, b22 = _quadrants(b, m, p)
+
+    s1 = _add(a21, a22)
+    s2 = _sub(s1, a11)
+    s3 = _sub(a11, a21)
+    s4 = _sub(a12, s2)
+    t1 = _sub(b12, b11)
+    t2 = _sub(b22, t1)
+    t3 = _sub(b22, b12)
+    t4 = _sub(t2, b21)
+
+    m1 = strassen_matmul(a11, b11, threshold)
+    m2 = strassen_matmul(a12, b21, threshold)
+    m3 = strassen_matmul(s4, b22, threshold)
+    m4 = strassen_matmul(a22, t4, threshold)
+    m5 = strassen_matmul(s1, t1, threshold)
+    m6 = strassen_matmul(s2, t2, threshold)
+    m7 = strassen_matmul(s3, t3, threshold)
+
+    u2 = _add(m1, m6)
+    u3 = _add(u2, m7)
+    u4 = _add(u2, m5)
+    c11 = _add(m1, m2)
+    c12 = _add(u4, m3)
+    c21 = _sub(u3, m4)
+    c22 = _add(u3, m5)
+
+    # Stitch the quadrants together and drop any padding:
+    top = [x + y for x, y in zip(c11, c12)]
+    bottom = [x + y for x, y in zip(c21, c22)]
+    return [row[:p] for row in (top + bottom)[:n]]
+
+
+def int_matmul(a: [[int, ], ], b: [[int, ], ],
+               threshold: int = None) -> [[int, ], ]:
+    """
+    Returns a @ b for integer matrices, choosing blocked
+    iteration or Strassen-Winograd recursion by size.
+    """
+    threshold = STRASSEN_THRESHOLD if threshold is None else threshold
+    if min(len(a), len(b), len(b[0])) >= threshold:
+        return strassen_matmul(a, b, threshold)
+    return blocked_matmul(a, _transpose(b))
+
+
+def _mod_rows(a: [[int, ], ], modulus: int) -> [[int, ], ]:
+    return [[x % modulus for x in row] for row in a] if modulus else a
+
+
+def _identity(n: int) -> [[int, ], ]:
+    return [[int(i == j) for j in range(n)] for i in range(n)]
+
+
+def square_pow(a: [[int, ], ], exp: int,
+               modulus: int = None) -> [[int, ], ]:
+    """
+    Returns a^exp for a square integer matrix, reduced modulo
+    modulus if given, by repeated squaring: about log2(exp)
+    squarings and one product per set bit of exp.
+    """
+    result, base = None, _mod_rows(a, modulus)
+    while exp:
+        if exp & 1:
+            result = base if result is None else \
+                _mod_rows(int_matmul(result, base), modulus)
+        exp >>= 1
+        if exp:
+            base = _mod_rows(int_matmul(base, base), modulus)
+    return result if result is not None else _identity(len(a))
+
+
+def paterson_stockmeyer(coeffs: [int, ], a: [[int, ], ],
+                        modulus: int = None) -> [[int, ], ]:
+    """
+    Returns sum(coeffs[i] * a^i) for a square integer matrix, with
+    about 2 * sqrt(len(coeffs)) matrix products instead of one per
+    coefficient: the powers a^0 ... a^k are computed once for
+    k ~ sqrt(len(coeffs)), and the blocks of k coefficients are
+    combined by Horner's scheme in a^k.
+    """
+    n = len(a)
+    k = max(1, isqrt(len(coeffs) - 1) + 1) if coeffs else 1
+    powers = [_identity(n), _mod_rows(a, modulus)]
+    while len(powers) <= k:
+        powers.append(_mod_rows(int_matmul(powers[-1], powers[1]),
+                                modulus))
+    step = powers[k]
+    result = None
+    for start in range((len(coeffs) - 1) // k * k, -1, -k):
+        block = [[0] * n for _ in range(n)]
+        for c, p in zip(coeffs[start:start + k], powers):
+            if c:
+                for row, p_row in zip(block, p):
+                    for j, x in enumerate(p_row):
+                        row[j] += c * x
+        if result is not None:
+            result = int_matmul(result, step)
+            block = [list(map(add, row, b)) for row, b in zip(result, block)]
+        result = _mod_rows(block, modulus)
+    return result if result is not None else [[0] * n for _ in range(n)]
+
+
+def charpoly_pow(a: [[int, ], ], exp: int,
+                 modulus: int = None) -> [[int, ], ]:
+    """
+    Returns a^exp as r(a), where r(x) = x^exp modulo the characteristic
+    polynomial of a (which vanishes at a, by Cayley-Hamilton). r is
+    found with polynomial arithmetic (see modular.xpow_mod), and r(a)
+    takes about 2 * sqrt(n) matrix products, however large exp is.
+    """
+    chi = modular.berkowitz(a, modulus)
+    return paterson_stockmeyer(modular.xpow_mod(exp, chi, modulus),
+                               a, modulus)
+
+
+def int_matpow(a: [[int, ], ], exp: int,
+               modulus: int = None) -> [[int, ], ]:
+    """
+    Returns a^exp for a square integer matrix, reduced modulo
+    modulus if given, by square_pow or, when it needs fewer matrix
+    products, by charpoly_pow. Only reduced entries have a bounded
+    size, so charpoly_pow is only used with a modulus.
+    """
+    n = len(a)
+    # Costs in n x n matrix products. Berkowitz takes about n/4 of
+    # them, and each polynomial squaring about 2/n:
+    squarings = exp.bit_length() + bin(exp).count('1')
+    reduction = n / 4 + 2 * isqrt(n) + 2 + 2 * exp.bit_length() / n
+    if modulus and n and reduction < squarings:
+        return charpoly_pow(a, exp, modulus)
+    return square_pow(a, exp, modulus)
+
+
+def matmul(lhs, rhs, threshold: int = None):
+    """
+    Returns the Matrix product of two matrices of RationalFrac
+    entries. Every entry is accumulated as an integer over the
+    shared denominator of its row of lhs and its column of rhs.
+    """
+    a, row_denoms = modular.clear_denominators(lhs.rows())
+    b_t, col_denoms = modular.clear_denominators(zip(*rhs.rows()))
+    prod = int_matmul(a, _transpose(b_t), threshold)
+    return matrix.Matrix([
+        [RF.from_ratio(numer, rd * cd)
+         for numer, cd in zip(row, col_denoms)]
+        for row, rd in zip(prod, row_denoms)
+    ])
+
+
+def matvec(lhs, vec):
+    """
+    Returns the Vector product of a matrix and a vector
+    of RationalFrac entries, using the same kernel.
+    """
+    a, row_denoms = modular.clear_denominators(lhs.rows())
+    (v,), (vd,) = modular.clear_denominators([vec])
+    return vector.Vector([
+        RF.from_ratio(sum(map(mul, row, v)), rd * vd)
+        for row, rd in zip(a, row_denoms)
+    ])
+
+
+def _dot(row, col):
+    """ Returns the sum of the products of nonzero entry pairs, or 0. """
+    total = None
+    for x, y in zip(row, col):
+        if x != 0 and y != 0:
+            total = x * y if total is None else total + x * y
+    return RF(0) if total is None else total
+
+
+def symbolic_matmul(lhs, rhs):
+    """
+    Returns the Matrix product of two matrices whose entries may
+    be polynomial.Polynomial objects, by the textbook algorithm:
+    the integer kernels above only apply to numbers.
+    """
+    cols = list(zip(*rhs.rows()))
+    return matrix.Matrix([[_dot(row, col) for col in cols]
+                          for row in lhs.rows()])
+
+
+def symbolic_matvec(lhs, vec):
+    """ Same as symbolic_matmul, for a Vector. """
+    return vector.Vector([_dot(row, vec) for row in lhs.rows()])
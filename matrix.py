@@ -1,11 +1,58 @@
-from functools import reduce
+from fractions import Fraction
+from functools import lru_cache
+from math import gcd
 from numbers import Number
-
+from operator import mul
+
+import backend
+import densepoly
+import horner
+import lazy
+import matmul
+import modular
+import parallel
+import polynomial
 import rfrac
 import vector
 
 RF = rfrac.RationalFrac
 
+# Number of distinct bindings whose values Matrix.eval keeps per matrix:
+EVAL_CACHE_SIZE = 256
+# Matrix.det expands with memoized minors rather than eliminating when
+# modular.subset_det_cost is below n^3 / SUBSET_DET_WEIGHT:
+SUBSET_DET_WEIGHT = 4
+
+
+def _any_symbolic(rows) -> bool:
+    return any(isinstance(x, polynomial.Polynomial)
+               for row in rows for x in row)
+
+
+def _krylov_minpoly(rows: [[int, ], ], j: int):
+    """
+    Private. Returns the monic DensePoly p of least degree such that
+    p(rows) @ e_j = 0, by reducing e_j, rows @ e_j, ... one at a time
+    against the earlier ones, until one reduces to zero.
+    """
+    power = [int(i == j) for i in range(len(rows))]
+    basis = []  # (pivot, reduced vector, its combination of powers)
+    while True:
+        vec = [Fraction(x) for x in power]
+        combo = [Fraction(0)] * len(basis) + [Fraction(1)]
+        for pivot, b_vec, b_combo in basis:
+            f = vec[pivot]
+            if f:
+                vec = [x - f * y for x, y in zip(vec, b_vec)]
+                for i, y in enumerate(b_combo):
+                    combo[i] -= f * y
+        pivot = next((i for i, x in enumerate(vec) if x), None)
+        if pivot is None:
+            return densepoly.DensePoly(combo)
+        f = vec[pivot]
+        basis.append((pivot, [x / f for x in vec], [c / f for c in combo]))
+        power = [sum(map(mul, row, power)) for row in rows]
+
 
 class MatrixSizeError(Exception):
     """
@@ -22,21 +69,109 @@ class MatrixSizeError(Exception):
 class Matrix(list):
     """
     A matrix. A list of equal-length columns.
+
+    Copies are copy-on-write: Matrix(other) shares the rows of
+    other, and a shared row is only duplicated when a Matrix
+    holding it hands it out through __getitem__ or __iter__,
+    which may be used to modify it. Read-only access through
+    rows() and entry() never duplicates anything. Rows that were
+    handed out before the copy may still be held and written to,
+    so Matrix(other) duplicates those at once.
+
+    Entries may also be polynomial.Polynomial objects: see eval().
     """
     nrows: int
     ncols: int
+    # The compiled plan and result cache of eval(), dropped on writes
+    # (see vector.Vector._owner):
+    _evaluator: tuple = None
 
     def __init__(self, rows: [[], ]):
         """
         Requires that all elements of m
         are lists or Vector objects of equal length.
+        If m is a Matrix, its rows are shared (copy on write).
         """
         self.nrows = len(rows)
-        self.ncols = len(rows[0])
-        super().__init__([vector.Vector(row) for row in rows])
+        if isinstance(rows, Matrix):
+            self.ncols = rows.ncols
+            shared = []
+            for row in rows.rows():
+                if row._owner is None:
+                    row._shares += 1
+                else:
+                    row = vector.Vector(row)
+                shared.append(row)
+            super().__init__(shared)
+        else:
+            self.ncols = len(rows[0])
+            super().__init__([vector.Vector(row) for row in rows])
+
+    def copy(self):
+        """ Returns a copy in O(nrows). Rows are copied on write. """
+        return Matrix(self)
+
+    def as_float(self):
+        """
+        Returns a float64 copy with the same API (see backend.py).
+        Use its exact() method to convert back.
+        """
+        return backend.FloatMatrix(self)
+
+    def __getitem__(self, key):
+        """
+        Returns a row, which the caller may modify. A row that
+        is shared with a copy of this Matrix is duplicated first.
+        Writes to the row drop the results cached by eval().
+        """
+        if isinstance(key, slice):
+            return [self[i] for i in range(len(self))[key]]
+        row = super().__getitem__(key)
+        if row._shares:
+            row._shares -= 1
+            row = vector.Vector(row)
+            super().__setitem__(key, row)
+        row._owner = self
+        return row
+
+    def __setitem__(self, key, row):
+        """
+        Replaces a row, or the rows in a slice, with copies of the
+        given rows, which must have ncols entries.
+        """
+        if isinstance(key, slice):
+            indices, rows = range(len(self))[key], list(row)
+            if len(rows) != len(indices):
+                raise MatrixSizeError('cannot change the number of rows.')
+            for i, new in zip(indices, rows):
+                self[i] = new
+            return
+        if len(row) != self.ncols:
+            raise MatrixSizeError('row length != #cols')
+        old = super().__getitem__(key)
+        if old._shares:
+            old._shares -= 1
+        self._evaluator = None
+        super().__setitem__(key, vector.Vector(list(row)))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def rows(self):
+        """
+        Iterates over the rows without claiming them for
+        writing. The rows must not be modified.
+        """
+        return super().__iter__()
+
+    def entry(self, r: int, c: int):
+        """ Returns the entry at row r and column c, read-only. """
+        return super().__getitem__(r)[c]
 
     def append(self, obj):
         """ Assumes that len(obj) == self.ncols. """
+        self._evaluator = None
         self.nrows += 1
         super(Matrix, self).append(vector.Vector(obj))
 
@@ -46,18 +181,19 @@ class Matrix(list):
         for each obj in iterable.
         """
         rows = [vector.Vector(obj) for obj in iterable]
+        self._evaluator = None
         self.nrows += len(rows)
         super(Matrix, self).extend(rows)
 
     def __str__(self):
         contents = []
-        for vec in self:
+        for vec in self.rows():
             contents.extend(vec)
         width = max(map(lambda frac: len(frac.__str__()), contents))
         return '\n'.join([
             '[%s]' % ', '.join(
                 map(lambda f: f.__str__().center(width), row)
-            ) for row in self
+            ) for row in self.rows()
         ])
 
     def is_square(self):
@@ -69,15 +205,14 @@ class Matrix(list):
         and other are instances of the same type.
         """
         # check if matrix addition is valid
-        if isinstance(other, Matrix):
+        if isinstance(other, (Matrix, MatrixView)):
             if not (other.nrows == self.nrows and
                     other.ncols == self.ncols):
                 raise MatrixSizeError('dimensions not equal')
             sum_mtx = []
-            for r in range(self.nrows):
+            for row, other_row in zip(self.rows(), other.rows()):
                 sum_mtx.append(
-                    [self[r][c] + other[r][c]
-                     for c in range(self.ncols)]
+                    [x + y for x, y in zip(row, other_row)]
                 )
             return Matrix(sum_mtx)
         else:
@@ -89,13 +224,14 @@ class Matrix(list):
         and other are instances of the same type.
         """
         # check if matrix addition is valid
-        if isinstance(other, Matrix):
+        if isinstance(other, (Matrix, MatrixView)):
             if not (other.nrows == self.nrows and
                     other.ncols == self.ncols):
                 raise MatrixSizeError('dimensions not equal')
             for r in range(self.nrows):
                 for c in range(self.ncols):
                     self[r][c] += other[r][c]
+            return self
         else:
             return NotImplemented
 
@@ -107,11 +243,86 @@ class Matrix(list):
         Returns a version of this matrix where all
         entries are reflected along the main diagonal.
         """
-        t = []
-        for c in range(self.ncols):
-            t.append([self[r][c] for r in
-                      range(self.nrows)])
-        return Matrix(t)
+        return Matrix([list(col) for col in zip(*self.rows())])
+
+    @property
+    def T(self):
+        """ Returns a transposed view of this matrix. No copy is made. """
+        return MatrixView(self).transpose()
+
+    def view(self, rows=None, cols=None):
+        """
+        Returns a MatrixView of the given rows and columns, which
+        may each be a slice (including strided slices), a list of
+        indices, or None for all of them. No copy is made.
+        """
+        return MatrixView(self).view(rows, cols)
+
+    """
+    Symbolic entries:
+    """
+    def is_symbolic(self) -> bool:
+        """ Returns True if some entry is a Polynomial. """
+        return _any_symbolic(self.rows())
+
+    def lazy(self):
+        """
+        Returns this matrix as a lazy.Expr: operators on it build an
+        expression, which evaluate() computes in a good order.
+        """
+        return lazy.Expr.leaf(self)
+
+    def plan(self):
+        """
+        Returns the entries compiled into one horner.EvalPlan.
+        It is compiled once, and again after a row is written
+        to, or rows are added by append or extend.
+        """
+        if self._evaluator is None:
+            plan = horner.EvalPlan([list(row) for row in self.rows()])
+            # Keys carry exactness, since 0.1 == Fraction(0.1):
+            self._evaluator = (plan, lru_cache(maxsize=EVAL_CACHE_SIZE)(
+                lambda exact, key: plan.eval(*key)))
+        return self._evaluator[0]
+
+    def _result(self, rows: list, exact: bool):
+        """ Private. Returns evaluated rows as a Matrix or FloatMatrix. """
+        return Matrix(rows) if exact else backend.FloatMatrix(rows)
+
+    def eval(self, bindings: dict = None, **named):
+        """
+        Returns this matrix with every Polynomial entry evaluated at
+        bindings, a dict from variable names to values, or at the same
+        names given as keyword arguments. Values may be RationalFracs,
+        ints or Fractions, or floats, which give a backend.FloatMatrix.
+
+        Results are kept in an LRU cache of EVAL_CACHE_SIZE entries
+        keyed by the bound values, so a symbolic product, such as a
+        composition of rotations, can be built once with @ and then
+        evaluated cheaply for every frame.
+        """
+        bindings = dict(bindings or {}, **named)
+        plan = self.plan()
+        missing = [v for v in plan.variables if v not in bindings]
+        if missing:
+            raise ValueError(f'no values bound to {missing}.')
+        key = tuple(bindings[v] if isinstance(bindings[v], float) else
+                    Fraction(*horner._ratio(bindings[v]))
+                    for v in plan.variables)
+        exact = not any(isinstance(x, float) for x in key)
+        return self._result(self._evaluator[1](exact, key), exact)
+
+    def eval_batch(self, points) -> list:
+        """
+        Returns this matrix evaluated at every point of points, as a
+        list of matrices. See horner.EvalPlan.eval_batch: points are
+        dicts from names to values, tuples of values in the order of
+        plan().variables, or a batch.VectorBatch.
+        """
+        results = self.plan().eval_batch(points)
+        exact = not results or not results[0] or \
+            not isinstance(results[0][0][0], float)
+        return [self._result(rows, exact) for rows in results]
 
     def add_solution_col(self, solution):
         """
@@ -123,10 +334,14 @@ class Matrix(list):
         for row in range(self.nrows):
             self[row].append(solution[row])
 
-    def rref(self):
+    def rref(self, workers: int = None, executor=None):
         """
-        Returns the reduced form of self
+        Returns the reduced form of self.
+        If workers or a concurrent.futures executor is given,
+        the work is spread over processes (see parallel.py).
         """
+        if workers is not None or executor is not None:
+            return parallel.rref_parallel(self, workers, executor)
         red = Matrix(self)
         free_vars = 0  # Increments when a column is all zeros.
 
@@ -153,41 +368,78 @@ class Matrix(list):
                     other_row -= anti_target_row
         return red
 
-    def det(self) -> (RF, None):
-        """ Returns the determinant of this matrix if it is square. """
-        if self.is_square():
-            rows = list(range(self.nrows))
-            cols = list(range(self.ncols))
-            return self.recursive_det(rows, cols)
-            # or alternatively, return reduce(mul,
-            # [self[i][i] for i in range(self.nrows)])
+    def solve(self, solution, method: str = 'dixon'):
+        """
+        Returns the Vector x such that self @ x is the solution
+        column, if it is unique.
+
+        method 'dixon' lifts an exact solution p-adically from a
+        single inverse modulo a prime, which avoids the growth of
+        intermediate fractions. method 'rref' row-reduces the
+        augmented matrix.
+        """
+        if not self.is_square():
+            raise MatrixSizeError('cannot solve a non-square system.')
+        elif len(solution) != self.nrows:
+            raise MatrixSizeError('solution length != #rows')
+        solution = vector.Vector(solution)
+
+        if method == 'dixon':
+            # Scale each equation to integer coefficients:
+            rows, _ = modular.clear_denominators(
+                [list(row) + [b] for row, b in zip(self.rows(), solution)])
+            numers, denom = modular.dixon_solve(
+                [row[:-1] for row in rows], [row[-1] for row in rows])
+            return vector.Vector([RF.from_ratio(numer, denom)
+                                  for numer in numers])
+
+        elif method == 'rref':
+            aug = Matrix(self)
+            aug.add_solution_col(solution)
+            red = aug.rref()
+            if any(red[i][i] != 1 for i in range(self.nrows)):
+                raise ArithmeticError('matrix is singular.')
+            return vector.Vector([row[-1] for row in red.rows()])
         else:
+            raise ValueError(f'unknown method {method}.')
+
+    def det(self, workers: int = None, executor=None) -> (RF, None):
+        """
+        Returns the determinant of this matrix if it is square.
+        If workers or a concurrent.futures executor is given,
+        the work is spread over processes (see parallel.py).
+
+        Otherwise the matrix is scaled to integers, and expanded with
+        memoized minors (see modular.subset_det) if that costs less
+        than elimination, which is usual only for very sparse or
+        banded matrices, or else eliminated by modular.bareiss_det.
+        Matrices of Polynomials are always expanded.
+        """
+        if workers is not None or executor is not None:
+            return parallel.det_parallel(self, workers, executor)
+        if not self.is_square():
             raise MatrixSizeError(
                 'cannot take determinant: matrix not square.')
+        if self.is_symbolic():
+            # No exact division to eliminate with, so expand instead:
+            return modular.subset_det([list(row) for row in self.rows()])
+        rows, scales = modular.clear_denominators(self.rows())
+        n = len(rows)
+        if modular.subset_det_cost(rows) * SUBSET_DET_WEIGHT < n ** 3:
+            det = modular.subset_det(rows)
+        else:
+            det = modular.bareiss_det(rows)
+        denom = 1
+        for scale in scales:
+            denom *= scale
+        return RF.from_ratio(det, denom)
 
     def recursive_det(self, rows: [int, ], cols: [int, ]) -> RF:
         """
-        Private helper for det(). Recursive function.
-        cols and rows are chopped up index slices.
+        Returns the determinant of the minor on the given
+        rows and columns. Works on a view: nothing is copied.
         """
-        # Terminating condition:
-        if len(rows) == 1:
-            # this implies len(cols) is also 1.
-            return self[rows[0]][cols[0]]
-        else:
-            sign = 1
-            det = 0
-            for col in cols:
-                _cols = cols.copy()
-                _cols.remove(col)
-                sub_sub_det = self.recursive_det(rows[1:], _cols)
-                sub_det = sign * self[rows[0]][col] * sub_sub_det
-
-                # print(rows[0], col, rows[1:], _cols, ':',
-                #       self[rows[0]][col], sub_sub_det, sub_det, sub_det.denom)
-                det += sub_det
-                sign = -sign
-            return det
+        return self.view(rows, cols).det()
 
     def inverse(self):
         """ Finds a matrix A^-1 such that A * A^-1 is I. """
@@ -202,6 +454,72 @@ class Matrix(list):
         i = Matrix.identity(self.nrows)
         # TODO:
 
+    """
+    Characteristic and minimal polynomials, eigenvalues:
+    """
+    def _int_rows(self) -> ([[int, ], ], int):
+        """ Private. Returns integer rows m and an int d with self = m / d. """
+        rows, scales = modular.clear_denominators(self.rows())
+        d = 1
+        for scale in scales:
+            d = d * scale // gcd(d, scale)
+        return [[x * (d // scale) for x in row]
+                for row, scale in zip(rows, scales)], d
+
+    def charpoly(self):
+        """
+        Returns det(x*I - self) as a densepoly.DensePoly. It is found
+        without division, by modular.berkowitz on this matrix scaled
+        to integers, in O(n^4) integer operations.
+        """
+        if not self.is_square():
+            raise MatrixSizeError(
+                'cannot take characteristic polynomial: matrix not square.')
+        rows, d = self._int_rows()
+        coeffs = modular.berkowitz(rows)
+        # det(x*I - m/d) = det(d*x*I - m) / d^n:
+        return densepoly.DensePoly([c * d ** k for k, c in enumerate(coeffs)],
+                                   d ** self.nrows)
+
+    def minpoly(self):
+        """
+        Returns the monic polynomial p of least degree such that
+        p(self) = 0, as a densepoly.DensePoly. It is the least common
+        multiple, over the unit vectors e, of the least polynomials
+        with p(self) @ e = 0, each found as the first linear dependency
+        of the vectors e, self @ e, self^2 @ e, ...
+        """
+        if not self.is_square():
+            raise MatrixSizeError(
+                'cannot take minimal polynomial: matrix not square.')
+        rows, d = self._int_rows()
+        poly = densepoly.DensePoly([1])
+        for j in range(self.nrows):
+            if poly.degree() == self.nrows:
+                break
+            local = _krylov_minpoly(rows, j)
+            poly = (poly * local // poly.gcd(local)).monic()
+        # If p(m) = 0 then p(d*x) / d^k is monic and vanishes at m/d:
+        k = poly.degree()
+        return densepoly.DensePoly(
+            [c * d ** i for i, c in enumerate(poly.coeffs)],
+            poly.denom * d ** k)
+
+    def count_real_eigenvalues(self, lo=None, hi=None) -> int:
+        """
+        Returns the number of distinct real eigenvalues in (lo, hi],
+        or of all of them by default, by Sturm's theorem.
+        """
+        return self.charpoly().count_real_roots(lo, hi)
+
+    def eigenvalue_intervals(self, max_width=None) -> [(RF, RF), ]:
+        """
+        Returns disjoint intervals with rational endpoints isolating
+        each distinct real eigenvalue, in increasing order. See
+        densepoly.DensePoly.real_root_intervals.
+        """
+        return self.charpoly().real_root_intervals(max_width)
+
     """
     Matrix multiplication and Scalar multiplication:
     """
@@ -213,41 +531,85 @@ class Matrix(list):
              a vector if other is a vector.
         """
         # Matrix multiplied be another matrix:
-        if isinstance(other, Matrix):
+        if isinstance(other, (Matrix, MatrixView)):
             if self.ncols != other.nrows:
                 raise MatrixSizeError('op1 #cols != op2 #rows')
-            prod = []
-            other_t = other.transpose()
-            for r in range(self.nrows):
-                prod.append(
-                    [reduce(lambda x, y: x + y, self[r].dot(c))
-                     for c in other_t]
-                )
-            return Matrix(prod)
+            if self.is_symbolic() or other.is_symbolic():
+                return matmul.symbolic_matmul(self, other)
+            return matmul.matmul(self, other)
 
         # Matrix multiplied by a vector:
         elif isinstance(other, vector.Vector):
             if self.ncols != len(other):
                 raise MatrixSizeError('op1 #cols != op2 length')
-            return vector.Vector([
-                sum(self[r].dot(other))
-                for r in range(self.nrows)
-            ])
+            if self.is_symbolic() or _any_symbolic([other]):
+                return matmul.symbolic_matvec(self, other)
+            return matmul.matvec(self, other)
 
         # Unexpected second operand:
         else:
             return NotImplemented
 
+    def matmul(self, other, workers: int = None, executor=None):
+        """
+        Same as self @ other, but if workers or a concurrent.futures
+        executor is given, blocks of rows are multiplied in separate
+        processes (see parallel.py).
+        """
+        if isinstance(other, (Matrix, MatrixView)) and (
+                workers is not None or executor is not None):
+            return parallel.matmul_parallel(self, other, workers, executor)
+        return self.__matmul__(other)
+
+    def __pow__(self, exp: int, modulo: int = None):
+        """
+        Returns self^exp for an int exp >= 0, by repeated squaring
+        of the integer numerators of this matrix (see matmul.int_matpow).
+
+        pow(self, exp, modulo) returns the integer matrix congruent to
+        self^exp modulo modulo, with entries in range(modulo). Entries
+        may be fractions whose denominators are invertible modulo
+        modulo. Large exponents are then reduced modulo the
+        characteristic polynomial, so that even exp = 10^18 takes
+        about 2 * sqrt(n) matrix products after O(n^4) setup.
+        """
+        if not isinstance(exp, int):
+            return NotImplemented
+        if not self.is_square():
+            raise MatrixSizeError('cannot take power: matrix not square.')
+        if exp < 0:
+            raise ValueError('negative matrix powers are not supported.')
+        if self.is_symbolic():
+            result, base = Matrix.identity(self.nrows), self
+            while exp:
+                if exp & 1:
+                    result = result @ base
+                exp >>= 1
+                if exp:
+                    base = base @ base
+            return result
+        rows, d = self._int_rows()
+        if modulo is None:
+            power = matmul.int_matpow(rows, exp)
+            return Matrix([[RF.from_ratio(x, d ** exp) for x in row]
+                           for row in power])
+        if gcd(d, modulo) != 1:
+            raise ArithmeticError('a denominator is not invertible '
+                                  f'modulo {modulo}.')
+        inv = pow(d, -1, modulo)
+        rows = [[x * inv % modulo for x in row] for row in rows]
+        return Matrix(matmul.int_matpow(rows, exp, modulo))
+
     def __mul__(self, other):
         """
         Multiplies this matrix by a leading scalar.
         Returns the product.
         """
-        if isinstance(other, (RF, Number)):
+        if isinstance(other, (RF, Number, polynomial.Polynomial)):
             prod = []
-            # Multiply each vector-row by the scalar
-            for r in range(self.nrows):
-                prod.append(self[r] * other)
+            # Multiply each row by the scalar
+            for row in self.rows():
+                prod.append([entry * other for entry in row])
             return Matrix(prod)
         else:
             return NotImplemented
@@ -255,19 +617,19 @@ class Matrix(list):
     def __eq__(self, other):
         """
         Checks if all corresponding pairs
-        of Vectors are equal using __eq__().
+        of entries are equal using __eq__().
         """
-        if not isinstance(other, Matrix):
+        if not isinstance(other, (Matrix, MatrixView)):
             return False
         elif not (self.nrows == other.nrows and
                   self.ncols == other.ncols):
             return False
         else:
-            return all(map(
-                # Delegates to Vector content equality comparison:
-                lambda i: self[i].__eq__(other[i]),
-                list(range(self.nrows))
-            ))
+            return all(
+                # Delegates to entry content equality comparison:
+                all(x == y for x, y in zip(row, other_row))
+                for row, other_row in zip(self.rows(), other.rows())
+            )
 
     @staticmethod
     def identity(n: int):
@@ -288,12 +650,157 @@ class Matrix(list):
         return Matrix([[RF(0)] * n] * n)
 
 
+class MatrixView:
+    """
+    A window onto a Matrix: a subset or strided slice of its rows
+    and columns, optionally transposed. Shares storage with the
+    parent matrix, and supports the same read-only operations.
+
+    Writing through a view first copies the entries it covers into
+    a private Matrix (copy on write), so the parent never changes.
+    -- _base:   Matrix          The matrix that holds the entries.
+    -- _rows:   range, tuple    Indices of rows of _base.
+    -- _cols:   range, tuple    Indices of columns of _base.
+    -- _t:      bool            Whether _rows index columns of the view.
+    """
+
+    def __init__(self, base: Matrix, rows=None, cols=None,
+                 transposed: bool = False):
+        self._base = base
+        self._rows = range(base.nrows) if rows is None else rows
+        self._cols = range(base.ncols) if cols is None else cols
+        self._t = transposed
+        self._owned = False
+
+    @property
+    def nrows(self) -> int:
+        return len(self._cols if self._t else self._rows)
+
+    @property
+    def ncols(self) -> int:
+        return len(self._rows if self._t else self._cols)
+
+    def entry(self, r: int, c: int):
+        """ Returns the entry at row r and column c of the view. """
+        if self._t:
+            r, c = c, r
+        return self._base.entry(self._rows[r], self._cols[c])
+
+    def __len__(self):
+        return self.nrows
+
+    def __getitem__(self, r: int):
+        """ Returns a row of the view, which is also a view. """
+        return _ViewRow(self, range(self.nrows)[r])
+
+    def __iter__(self):
+        for r in range(self.nrows):
+            yield _ViewRow(self, r)
+
+    def rows(self):
+        return self.__iter__()
+
+    def _write(self, r: int, c: int, value):
+        """ Private. Detaches from the parent before the first write. """
+        if not self._owned:
+            self._base = self.copy()
+            self._rows = range(self._base.nrows)
+            self._cols = range(self._base.ncols)
+            self._t = False
+            self._owned = True
+        self._base[r][c] = value
+
+    @staticmethod
+    def _select(indices, key):
+        """ Private. Composes an index sequence with a slice or list. """
+        if key is None:
+            return indices
+        elif isinstance(key, slice):
+            return indices[key]
+        return tuple(indices[i] for i in key)
+
+    def is_symbolic(self) -> bool:
+        return _any_symbolic(self.rows())
+
+    def view(self, rows=None, cols=None):
+        """
+        Returns a view of some rows and columns of this view.
+        See Matrix.view. Indices always refer to the parent.
+        """
+        if self._t:
+            return MatrixView(self._base, self._select(self._rows, cols),
+                              self._select(self._cols, rows), True)
+        return MatrixView(self._base, self._select(self._rows, rows),
+                          self._select(self._cols, cols))
+
+    def transpose(self):
+        """ Returns a transposed view. No copy is made. """
+        return MatrixView(self._base, self._rows, self._cols, not self._t)
+
+    @property
+    def T(self):
+        return self.transpose()
+
+    def copy(self) -> Matrix:
+        """ Returns the viewed entries as a new Matrix. """
+        return Matrix([list(row) for row in self])
+
+    is_square = Matrix.is_square
+    lazy = Matrix.lazy
+    as_float = Matrix.as_float
+    det = Matrix.det
+    recursive_det = Matrix.recursive_det
+    solve = Matrix.solve
+    rref = Matrix.rref
+    matmul = Matrix.matmul
+    __add__ = Matrix.__add__
+    __matmul__ = Matrix.__matmul__
+    __mul__ = Matrix.__mul__
+    __eq__ = Matrix.__eq__
+    __str__ = Matrix.__str__
+
+
+class _ViewRow:
+    """ One row of a MatrixView. Indexable and iterable like a list. """
+    __slots__ = ('_view', '_r')
+
+    def __init__(self, view: MatrixView, r: int):
+        self._view = view
+        self._r = r
+
+    def __len__(self):
+        return self._view.ncols
+
+    def __getitem__(self, c):
+        if isinstance(c, slice):
+            return [self._view.entry(self._r, k)
+                    for k in range(self._view.ncols)[c]]
+        return self._view.entry(self._r, range(self._view.ncols)[c])
+
+    def __setitem__(self, c: int, value):
+        self._view._write(self._r, range(self._view.ncols)[c], value)
+
+    def __iter__(self):
+        for c in range(self._view.ncols):
+            yield self._view.entry(self._r, c)
+
+    def __str__(self):
+        return str(list(self))
+
+
 def matrix_tests():
     print('\n==========================================')
     print('matrix.py @ matrix_tests: ////////////////\n')
     i5 = Matrix.identity(5)
+    i5_copy = i5.copy()
     i5[0][0] = RF(0.125)
     print(i5)
+    print('copy unchanged:', i5_copy[0][0])
+    row = i5[1]
+    i5_copy = i5.copy()
+    row[1] = 7
+    print('copy unchanged by a row held from before it:',
+          i5_copy[1][1], '\n')
 
     sqr3_0 = Matrix([[-2, 2, -3], [-1, 1, 3], [2, 0, -1]])
     print(sqr3_0, '\nactual =', sqr3_0.det(), 'and expected = 18\n')
@@ -301,11 +808,48 @@ def matrix_tests():
     sqr3_1 = Matrix([[1, 2, 4], [-1, 3, 0], [4, 1, 0]])
     print(sqr3_1, '\nactual =', sqr3_1.det(), 'and expected = -52\n')
 
+    minor = sqr3_1.T.view(slice(1, None), [0, 2])
+    print(minor, '\nactual =', minor.det(), 'and expected = -4\n')
+    band = Matrix([[2 if i == j else -(abs(i - j) == 1) for j in range(12)]
+                   for i in range(12)])
+    print('det of 12 x 12 tridiag(-1, 2, -1) =', band.det(),
+          'and expected = 13\n')
+
     rref_ex = Matrix([[1, 2, 3], [2, -1, 1], [3, 0, -1]])
     rref_soln = [9, 8, 3]
+    print('\nsolve =', rref_ex.solve(rref_soln),
+          'and expected = [2, -1, 3]')
     rref_ex.add_solution_col(rref_soln)
     print(rref_ex)
     print('\nrref =\n', rref_ex.rref())
+
+    c, s = (polynomial.Polynomial.var(v, 'c s') for v in 'cs')
+    twice = Matrix([[c, -s], [s, c]]) @ Matrix([[c, -s], [s, c]])
+    print('\nsymbolic product =\n', twice)
+    print('at c = 3/5, s = 4/5:\n', twice.eval(c=RF(3, 5), s=RF(4, 5)),
+          '\nand expected = [[-7/25, -24/25], [24/25, -7/25]]')
+    edited = Matrix([[c, 1], [2, s]])
+    edited.eval(c=1, s=1)
+    edited[0] = [9, 9]
+    print('after a row is replaced:\n', edited.eval(c=1, s=1),
+          '\nand expected = [[9, 9], [2, 1]]')
+    edited.add_solution_col([5, 6])
+    print('after a column is added:\n', edited.eval(c=1, s=1),
+          '\nand expected = [[9, 9, 5], [2, 1, 6]]')
+
+    jordan = Matrix([[2, 1, 0], [0, 2, 0], [0, 0, RF(1, 2)]])
+    print('\ncharpoly =', jordan.charpoly(),
+          'and expected = x^3 - 9/2*x^2 + 6*x - 2')
+    print('minpoly =', Matrix([[2, 0], [0, 2]]).minpoly(),
+          'and expected = x - 2')
+    print('eigenvalues in:', *Matrix([[0, 2], [1, 0]]).eigenvalue_intervals(
+        RF(1, 100)), 'around -/+ 2^(1/2)')
+
+    fib = Matrix([[1, 1], [1, 0]])
+    print('\nfib ** 10 =\n', fib ** 10,
+          '\nand expected = [[89, 55], [55, 34]]')
+    print('pow(fib, 10^18, 10^9 + 7) =\n', pow(fib, 10 ** 18, 10 ** 9 + 7),
+          '\nand expected = [[680057396, 209783453], [209783453, 470273943]]')
     print('\nmatrix.py @ end of matrix_tests //////////')
     print('==========================================\n')
 
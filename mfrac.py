@@ -9,8 +9,8 @@ RF = rfrac.RationalFrac
 
 def irr_prod(irr):
     irr_factors = map(
-        lambda base, ex: base ** float(ex), irr)
-    return reduce(mul, irr_factors)
+        lambda base, ex: base ** float(ex), irr.keys(), irr.values())
+    return reduce(mul, irr_factors, 1.0)
 
 
 class MonoFrac:
@@ -87,7 +87,7 @@ class MonoFrac:
         Used to maintain that values (representing exponents)
         in irr are in the range (-1, 1) and not zero.
         """
-        for fac, exp in self.irr.items():
+        for fac, exp in list(self.irr.items()):
             # fac ** 0 == 1. Remove redundant mapping:
             if 0 in exp.numer:
                 del self.irr[fac]
@@ -98,9 +98,9 @@ class MonoFrac:
             # (Ie. denominator is 1 -> empty primes list)
             factor_out = [fac, ] * exp.mixed()
             if exp.neg:
-                self.rational.denom.extend(factor_out)
+                self.rational.denom = self.rational.denom + factor_out
             else:
-                self.rational.numer.extend(factor_out)
+                self.rational.numer = self.rational.numer + factor_out
             if not exp.denom:
                 del self.irr[fac]
 
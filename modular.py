@@ -0,0 +1,338 @@
+"""
+Integer and modular linear algebra.
+
+Everything in here works on plain lists of python ints, so that the
+heavy loops never touch RationalFrac. Conversion to and from Matrix
+and Vector happens at the call site.
+"""
+from math import comb, gcd, isqrt
+from operator import mul
+
+import densepoly
+import rfrac
+
+RF = rfrac.RationalFrac
+
+
+def primes_below(bound: int):
+    """ Yields primes in descending order, starting below bound. """
+    num = bound - 1
+    while num > 1:
+        if RF.is_prime(num):
+            yield num
+        num -= 1
+
+
+def clear_denominators(rows: [[RF, ], ]) -> ([[int, ], ], [int, ]):
+    """
+    Scales each row of RationalFrac entries by the least
+    common multiple of its denominators. Returns the integer
+    rows and the multiplier that was used for each row.
+    """
+    int_rows = []
+    scales = []
+    for row in rows:
+        ratios = [entry.as_ratio() for entry in row]
+        lcm = 1
+        for _, denom in ratios:
+            lcm = lcm * denom // gcd(lcm, denom)
+        int_rows.append([numer * (lcm // denom) for numer, denom in ratios])
+        scales.append(lcm)
+    return int_rows, scales
+
+
+def hadamard_bound_sq(rows: [[int, ], ]) -> int:
+    """
+    Returns the square of Hadamard's bound on
+    the determinant of a square integer matrix.
+    """
+    bound = 1
+    for row in rows:
+        bound *= sum(x * x for x in row)
+    return bound
+
+
+def bareiss_det(rows: [[int, ], ]) -> int:
+    """
+    Returns the determinant of a square integer matrix by Bareiss'
+    fraction-free elimination, in O(n^3) exact integer divisions.
+    Every intermediate entry is a minor, so none outgrows the
+    Hadamard bound.
+    """
+    rows = [list(row) for row in rows]
+    n = len(rows)
+    sign, prev = 1, 1
+    for k in range(n - 1):
+        pivot = next((r for r in range(k, n) if rows[r][k]), None)
+        if pivot is None:
+            return 0
+        if pivot != k:
+            rows[k], rows[pivot] = rows[pivot], rows[k]
+            sign = -sign
+        head = rows[k]
+        for r in range(k + 1, n):
+            row = rows[r]
+            f = row[k]
+            rows[r] = [(head[k] * x - f * y) // prev
+                       for x, y in zip(row, head)]
+        prev = head[k]
+    return sign * rows[-1][-1] if n else 1
+
+
+def _expansion_order(nonzeros: [[int, ], ]) -> [int, ]:
+    """
+    Private. Orders the rows for subset_det: each next row is the one
+    that brings in the fewest columns not used by the rows before it,
+    then the one with the fewest nonzeros, which keeps the number of
+    distinct column subsets small for banded and block matrices.
+    """
+    order, seen = [], set()
+    left = list(range(len(nonzeros)))
+    while left:
+        best = min(left, key=lambda i: (len(set(nonzeros[i]) - seen),
+                                        len(nonzeros[i])))
+        left.remove(best)
+        order.append(best)
+        seen.update(nonzeros[best])
+    return order
+
+
+def _expansion_plan(rows: list) -> (list, [[int, ], ], [int, ], int):
+    """
+    Private. Returns (rows, nonzeros, order, cost) for subset_det, on
+    the rows or on the columns, whichever gives the smaller cost: an
+    upper bound on its multiplications. After k rows, the column
+    subsets in use number at most both C(columns seen, k) and the
+    product of the nonzero counts of those rows.
+    """
+    best = None
+    for mtx in (rows, [list(col) for col in zip(*rows)]):
+        nonzeros = [[c for c, x in enumerate(row) if x] for row in mtx]
+        order = _expansion_order(nonzeros)
+        cost, states, seen = 0, 1, set()
+        for k, i in enumerate(order):
+            cost += states * len(nonzeros[i])
+            seen.update(nonzeros[i])
+            states = min(states * len(nonzeros[i]),
+                         comb(len(seen), k + 1))
+        if best is None or cost < best[3]:
+            best = (mtx, nonzeros, order, cost)
+    return best
+
+
+def subset_det_cost(rows: list) -> int:
+    """
+    Returns an upper bound on the number of multiplications
+    subset_det makes on a square matrix, in O(n^2) time.
+    """
+    return _expansion_plan(rows)[3]
+
+
+def subset_det(rows: list):
+    """
+    Returns the determinant of a square matrix by Laplace expansion
+    with memoized minors: after expanding along k rows, the minor
+    left depends only on which k columns were used, so the signed
+    sums are kept per column bitmask, in O(n * 2^n) at worst.
+
+    Zero entries are skipped, and a subset whose sum cancels to zero
+    is dropped, so sparse matrices touch far fewer than 2^n subsets.
+    Rows are expanded sparsest first, or columns if that is cheaper.
+    It uses no division: entries may be ints or any ring elements
+    with +, - and *, such as polynomial.Polynomial.
+    """
+    n = len(rows)
+    if not n:
+        return 1
+    rows, nonzeros, order, _ = _expansion_plan(rows)
+    # Sign of the row order, from its inversions:
+    sign = 1
+    for k, i in enumerate(order):
+        sign *= (-1) ** sum(1 for j in order[k + 1:] if j < i)
+
+    sums = {0: 1}
+    for i in order:
+        row = rows[i]
+        new = {}
+        for used, value in sums.items():
+            for c in nonzeros[i]:
+                bit = 1 << c
+                if used & bit:
+                    continue
+                term = row[c] * value
+                # Columns past c already used each make one inversion:
+                if bin(used >> (c + 1)).count('1') % 2:
+                    term = -term
+                key = used | bit
+                new[key] = new[key] + term if key in new else term
+        sums = {key: value for key, value in new.items() if value}
+        if not sums:
+            return 0
+    value = sums[(1 << n) - 1]
+    return value if sign > 0 else -value
+
+
+def inverse_mod(rows: [[int, ], ], p: int) -> ([[int, ], ], None):
+    """
+    Returns the inverse of a square integer matrix
+    modulo a prime p, or None if it is singular mod p.
+    """
+    n = len(rows)
+    aug = [[x % p for x in row] + [int(i == j) for j in range(n)]
+           for i, row in enumerate(rows)]
+    for c in range(n):
+        # Find a row with a nonzero entry in this column:
+        pivot = next((r for r in range(c, n) if aug[r][c]), None)
+        if pivot is None:
+            return None
+        aug[c], aug[pivot] = aug[pivot], aug[c]
+
+        # Scale the pivot row and clear the column elsewhere:
+        inv = pow(aug[c][c], -1, p)
+        pivot_row = [x * inv % p for x in aug[c]]
+        aug[c] = pivot_row
+        for r in range(n):
+            factor = aug[r][c]
+            if r != c and factor:
+                aug[r] = [(x - factor * y) % p
+                          for x, y in zip(aug[r], pivot_row)]
+    return [row[n:] for row in aug]
+
+
+def rational_reconstruct(residue: int, modulus: int,
+                         bound: int) -> ((int, int), None):
+    """
+    Finds numer / denom congruent to residue mod modulus, with
+    |numer| <= bound and 0 < denom <= bound, using the half-
+    extended Euclidean algorithm. Returns None if there is none.
+    """
+    r0, r1 = modulus, residue % modulus
+    t0, t1 = 0, 1
+    while r1 > bound:
+        q = r0 // r1
+        r0, r1 = r1, r0 - q * r1
+        t0, t1 = t1, t0 - q * t1
+    if t1 == 0 or abs(t1) > bound or gcd(r1, t1) != 1:
+        return None
+    return (r1, t1) if t1 > 0 else (-r1, -t1)
+
+
+def berkowitz(rows: [[int, ], ], modulus: int = None) -> [int, ]:
+    """
+    Returns the coefficients of det(x*I - rows), lowest degree
+    first, for a square integer matrix, by Berkowitz's algorithm.
+    It uses no division and O(n^4) integer operations, so it
+    also works modulo any modulus, prime or not.
+
+    The characteristic polynomial of each leading r+1 x r+1
+    submatrix is that of the leading r x r one, A, multiplied by
+    the Toeplitz matrix of [1, -a, -R*C, -R*A*C, -R*A^2*C, ...],
+    where a is the new diagonal entry, and R and C the new row
+    and column next to A.
+    """
+    poly = [1]     # Highest degree first.
+    for r in range(len(rows)):
+        sub = [row[:r] for row in rows[:r]]
+        left = rows[r][:r]
+        col = [row[r] for row in rows[:r]]
+        toeplitz = [1, -rows[r][r]]
+        for k in range(r):
+            toeplitz.append(-sum(map(mul, left, col)))
+            if k < r - 1:
+                col = [sum(map(mul, row, col)) for row in sub]
+                if modulus:
+                    col = [x % modulus for x in col]
+        poly = [sum(toeplitz[i - j] * poly[j]
+                    for j in range(min(i, r) + 1))
+                for i in range(r + 2)]
+        if modulus:
+            poly = [x % modulus for x in poly]
+    return poly[::-1]
+
+
+def xpow_mod(exp: int, poly: [int, ], modulus: int = None) -> [int, ]:
+    """
+    Returns the coefficients of x^exp modulo a monic integer
+    polynomial (and modulo modulus), lowest degree first, by
+    repeated squaring. Reducing by a monic polynomial needs no
+    division, so any modulus works.
+    """
+    n = len(poly) - 1
+
+    def reduce(a):
+        for k in range(len(a) - 1, n - 1, -1):
+            c = a[k]
+            if c:
+                for i in range(n):
+                    a[k - n + i] -= c * poly[i]
+        a = a[:n]
+        return [x % modulus for x in a] if modulus else a
+
+    result, base = reduce([1]), reduce([0, 1])
+    while exp:
+        if exp & 1:
+            result = reduce(densepoly.int_poly_mul(result, base) or [0])
+        exp >>= 1
+        if exp:
+            base = reduce(densepoly.int_poly_mul(base, base) or [0])
+    return result + [0] * (n - len(result))
+
+
+def dixon_solve(rows: [[int, ], ], rhs: [int, ]) -> ([int, ], int):
+    """
+    Solves the nonsingular integer system rows * x = rhs exactly
+    by Dixon's p-adic lifting. Returns (numerators, denominator)
+    such that x[i] = numerators[i] / denominator.
+
+    Inverts rows once modulo a word-sized prime p, then lifts the
+    solution one p-adic digit at a time until p^k is large enough
+    for rational reconstruction to be unique by Cramer's rule.
+    """
+    n = len(rows)
+    # Find a prime that does not divide the determinant:
+    inv = None
+    for attempt, p in enumerate(primes_below(1 << 31)):
+        inv = inverse_mod(rows, p)
+        if inv is not None:
+            break
+        elif attempt == 8:
+            raise ArithmeticError('matrix is singular.')
+
+    # Numerators and the denominator of the solution are minors
+    # of [rows | rhs], so both are at most its Hadamard bound:
+    bound_sq = hadamard_bound_sq(
+        [row + [b] for row, b in zip(rows, rhs)])
+    target = 2 * bound_sq + 1
+
+    # Lift x (mod p^k) digit by digit:
+    residual = list(rhs)
+    x = [0] * n
+    pk = 1
+    while pk < target:
+        digit = [sum(a * r for a, r in zip(inv_row, residual)) % p
+                 for inv_row in inv]
+        residual = [(r - sum(a * d for a, d in zip(row, digit))) // p
+                    for row, r in zip(rows, residual)]
+        x = [xi + di * pk for xi, di in zip(x, digit)]
+        pk *= p
+
+    # Recover rationals. Entries share a denominator, so scale by
+    # the one found so far to keep the reconstructed parts small:
+    bound = isqrt(pk // 2)
+    numers = []
+    denom = 1
+    for xi in x:
+        ratio = rational_reconstruct(xi * denom, pk, bound)
+        if ratio is None:
+            raise ArithmeticError('rational reconstruction failed.')
+        numer, extra = ratio
+        if extra != 1:
+            numers = [prev * extra for prev in numers]
+            denom *= extra
+        numers.append(numer)
+
+    # Check the result exactly:
+    for row, b in zip(rows, rhs):
+        if sum(a * numer for a, numer in zip(row, numers)) != b * denom:
+            raise ArithmeticError('lifted solution did not verify.')
+    return numers, denom
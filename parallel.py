@@ -0,0 +1,217 @@
+"""
+Process-pool versions of Matrix multiplication, determinant and rref.
+
+Pure-python rational arithmetic holds the GIL, so work is spread over
+processes. Operands are converted once to integer rows, which pickle
+compactly, and each worker receives them once per task, with one task
+per worker. The determinant and the reduced row echelon form are found
+by multi-modular arithmetic: every task works modulo its own primes,
+which needs no communication between workers, and the residues are
+combined by the Chinese remainder theorem.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from math import isqrt
+from operator import mul
+
+import matrix
+import modular
+import rfrac
+
+RF = rfrac.RationalFrac
+
+# Residues are taken modulo primes just below this bound:
+PRIME_BOUND = 1 << 62
+
+
+@contextmanager
+def _pool(workers: int = None, executor=None):
+    """
+    Yields (executor, number of tasks to split work into), which
+    is workers, or the number of CPUs if workers is None.
+    Creates and shuts down a pool only if none is given.
+    """
+    tasks = workers or os.cpu_count() or 1
+    if executor is not None:
+        yield executor, tasks
+    else:
+        with ProcessPoolExecutor(max_workers=tasks) as pool:
+            yield pool, tasks
+
+
+def _chunks(items: list, count: int) -> [list, ]:
+    """ Splits items into at most count contiguous, even chunks. """
+    size = -(-len(items) // max(1, count))
+    return [items[i: i + size] for i in range(0, len(items), size)]
+
+
+def _matmul_rows(rows: [[int, ], ], b_t: [[int, ], ]) -> [[int, ], ]:
+    return [[sum(map(mul, row, col)) for col in b_t] for row in rows]
+
+
+def matmul_parallel(lhs, rhs, workers: int = None, executor=None):
+    """
+    Returns lhs @ rhs, where blocks of rows
+    of lhs are multiplied in separate processes.
+    """
+    if lhs.ncols != rhs.nrows:
+        raise matrix.MatrixSizeError('op1 #cols != op2 #rows')
+    a, row_denoms = modular.clear_denominators(lhs.rows())
+    b_t, col_denoms = modular.clear_denominators(zip(*rhs.rows()))
+    with _pool(workers, executor) as (pool, tasks):
+        futures = [pool.submit(_matmul_rows, chunk, b_t)
+                   for chunk in _chunks(a, tasks)]
+        prod = [row for future in futures for row in future.result()]
+    return matrix.Matrix([
+        [RF.from_ratio(numer, rd * cd)
+         for numer, cd in zip(row, col_denoms)]
+        for row, rd in zip(prod, row_denoms)
+    ])
+
+
+def det_mod(rows: [[int, ], ], p: int) -> int:
+    """ Returns the determinant of a square integer matrix mod p. """
+    rows = [[x % p for x in row] for row in rows]
+    det = 1
+    for c in range(len(rows)):
+        pivot = next((r for r in range(c, len(rows)) if rows[r][c]), None)
+        if pivot is None:
+            return 0
+        if pivot != c:
+            rows[c], rows[pivot] = rows[pivot], rows[c]
+            det = -det
+        det = det * rows[c][c] % p
+        inv = pow(rows[c][c], -1, p)
+        for r in range(c + 1, len(rows)):
+            factor = rows[r][c] * inv % p
+            if factor:
+                rows[r] = [(x - factor * y) % p
+                           for x, y in zip(rows[r], rows[c])]
+    return det % p
+
+
+def rref_mod(rows: [[int, ], ], p: int) -> ((int, ), [[int, ], ]):
+    """
+    Returns the pivot columns and the reduced row
+    echelon form of an integer matrix mod p.
+    """
+    rows = [[x % p for x in row] for row in rows]
+    pivots = []
+    r = 0
+    for c in range(len(rows[0])):
+        pivot = next((i for i in range(r, len(rows)) if rows[i][c]), None)
+        if pivot is None:
+            continue
+        rows[r], rows[pivot] = rows[pivot], rows[r]
+        inv = pow(rows[r][c], -1, p)
+        rows[r] = [x * inv % p for x in rows[r]]
+        for i in range(len(rows)):
+            factor = rows[i][c]
+            if i != r and factor:
+                rows[i] = [(x - factor * y) % p
+                           for x, y in zip(rows[i], rows[r])]
+        pivots.append(c)
+        r += 1
+        if r == len(rows):
+            break
+    return tuple(pivots), rows
+
+
+def _det_task(rows, primes):
+    return [det_mod(rows, p) for p in primes]
+
+
+def _rref_task(rows, primes):
+    return [rref_mod(rows, p) for p in primes]
+
+
+def _primes_for(bound: int) -> [int, ]:
+    """ Returns primes whose product exceeds bound. """
+    primes, prod = [], 1
+    for p in modular.primes_below(PRIME_BOUND):
+        if prod > bound:
+            break
+        primes.append(p)
+        prod *= p
+    return primes
+
+
+def _crt(residues: [int, ], primes: [int, ]) -> (int, int):
+    """ Returns (x, m) with x = residues[i] mod primes[i] and m = prod. """
+    x, m = 0, 1
+    for r, p in zip(residues, primes):
+        x += m * ((r - x) * pow(m, -1, p) % p)
+        m *= p
+    return x, m
+
+
+def det_parallel(mtx, workers: int = None, executor=None) -> RF:
+    """
+    Returns the determinant of a square matrix. Each process finds
+    it modulo its share of primes, enough for the product of all of
+    them to exceed twice the Hadamard bound.
+    """
+    if not mtx.is_square():
+        raise matrix.MatrixSizeError(
+            'cannot take determinant: matrix not square.')
+    rows, scales = modular.clear_denominators(mtx.rows())
+    primes = _primes_for(2 * isqrt(modular.hadamard_bound_sq(rows)) + 2)
+    with _pool(workers, executor) as (pool, tasks):
+        chunks = _chunks(primes, tasks)
+        futures = [pool.submit(_det_task, rows, chunk) for chunk in chunks]
+        residues = [r for future in futures for r in future.result()]
+    det, modulus = _crt(residues, primes)
+    if det > modulus // 2:
+        det -= modulus
+    denom = 1
+    for scale in scales:
+        denom *= scale
+    return RF.from_ratio(det, denom)
+
+
+def rref_parallel(mtx, workers: int = None, executor=None):
+    """
+    Returns the reduced row echelon form of a matrix. Each process
+    reduces it modulo its share of primes. Residues from primes that
+    lose a pivot are discarded, and the rest are combined and turned
+    back into fractions by rational reconstruction.
+    """
+    rows, _ = modular.clear_denominators(mtx.rows())
+    # Every entry of the result is a ratio of two minors:
+    bound_sq = 1
+    for row in rows:
+        bound_sq *= max(1, sum(x * x for x in row))
+    primes = _primes_for(2 * bound_sq + 1)
+
+    with _pool(workers, executor) as (pool, tasks):
+        chunks = _chunks(primes, tasks)
+        futures = [pool.submit(_rref_task, rows, chunk) for chunk in chunks]
+        results = [r for future in futures for r in future.result()]
+
+    # The true pivots are those of maximal rank, leftmost first.
+    # Replace the residues of unlucky primes with fresh primes:
+    best = min((pivots for pivots, _ in results),
+               key=lambda pivots: (-len(pivots), pivots))
+    kept = [(p, red) for p, (pivots, red) in zip(primes, results)
+            if pivots == best]
+    fresh = modular.primes_below(primes[-1])
+    while len(kept) < len(primes):
+        p = next(fresh)
+        pivots, red = rref_mod(rows, p)
+        if pivots == best:
+            kept.append((p, red))
+
+    moduli = [p for p, _ in kept]
+    bound = isqrt(bound_sq)
+    reduced = []
+    for i in range(len(rows)):
+        reduced_row = []
+        for j in range(len(rows[0])):
+            x, m = _crt([red[i][j] for _, red in kept], moduli)
+            ratio = modular.rational_reconstruct(x, m, bound)
+            if ratio is None:
+                raise ArithmeticError('rational reconstruction failed.')
+            reduced_row.append(RF.from_ratio(*ratio))
+        reduced.append(reduced_row)
+    return matrix.Matrix(reduced)
@@ -0,0 +1,267 @@
+"""
+Fixed-timestep simulation of round bodies in a sumo ring.
+
+A World stores the positions and velocities of all of its bodies as
+two VectorBatches (see batch.py), so that integrating a step is a few
+whole-column operations. Each step:
+    1. adds the accelerations given as input for that step,
+    2. moves every body by semi-implicit Euler integration,
+    3. resolves collisions between overlapping bodies that approach
+       each other, with impulses along the line between their centers,
+    4. marks bodies whose centers leave the ring as out.
+
+Collisions are found by bucketing bodies into a grid of cells as wide
+as the largest body and checking neighbouring cells only, with exact
+squared distances in exact mode. Impulses need no square root, so exact mode
+stays exact. Both modes run the same operations in the same order, so
+replaying the inputs recorded in World.log from the initial state
+gives back the same state (see World.replay).
+"""
+from fractions import Fraction
+from itertools import product
+from math import floor, gcd
+
+import backend
+import batch
+import intvec
+import rfrac
+import vector
+
+RF = rfrac.RationalFrac
+
+# Grid cells are keyed by ints in this radix. Bodies must stay within
+# _CELL_RADIX / 2 cells of the origin along every axis:
+_CELL_RADIX = 1 << 32
+
+
+def _to_fraction(value) -> Fraction:
+    if isinstance(value, (int, float, Fraction)):
+        return Fraction(value)
+    value = value if isinstance(value, RF) else RF(value)
+    return Fraction(*value.as_ratio())
+
+
+def _column(values: list, exact: bool):
+    """ Returns a list of Fractions (or floats) as a batch column. """
+    if not exact:
+        return backend.FloatVector(values)
+    denom = 1
+    for v in values:
+        denom = denom * v.denominator // gcd(denom, v.denominator)
+    return intvec.IntVector([v.numerator * (denom // v.denominator)
+                             for v in values], denom)
+
+
+def _values(col) -> list:
+    """ Returns a batch column as a list of Fractions (or floats). """
+    if isinstance(col, intvec.IntVector):
+        return [Fraction(n, col.denom) for n in col.numers]
+    return [float(x) for x in col.data]
+
+
+class Body:
+    """
+    A round body.
+    -- position:    vector.Vector
+    -- velocity:    vector.Vector
+    -- mass:        RationalFrac
+    -- radius:      RationalFrac
+    """
+
+    def __init__(self, position, velocity=None, mass=1, radius=1):
+        self.position = vector.Vector(position)
+        self.velocity = vector.Vector(
+            velocity if velocity is not None else [0] * len(position))
+        self.mass = mass if isinstance(mass, RF) else RF(mass)
+        self.radius = radius if isinstance(radius, RF) else RF(radius)
+
+    def __str__(self):
+        return f'Body(x={self.position}, v={self.velocity})'
+
+
+class World:
+    """
+    Bodies in a ring of the given radius centered at the origin.
+    -- pos, vel:        batch.VectorBatch
+    -- masses, radii:   [Fraction, ] or [float, ]
+    -- dt:              Fraction or float
+    -- ring_radius:     Fraction or float
+    -- restitution:     Fraction or float   1 for elastic collisions.
+    -- tick:            int                 The number of steps taken.
+    -- out:             {int: int}          Ring-outs: body -> tick.
+    -- log:             [(int, {int: [], }), ]  Inputs, for replay.
+    """
+
+    def __init__(self, bodies: [Body, ], dt=RF(1, 60), ring_radius=10,
+                 restitution=1, exact: bool = True):
+        self.exact = exact
+        num = _to_fraction if exact else float
+        self.pos = batch.VectorBatch.from_vectors(
+            [b.position for b in bodies], exact)
+        self.vel = batch.VectorBatch.from_vectors(
+            [b.velocity for b in bodies], exact)
+        self.masses = [num(b.mass) for b in bodies]
+        self.radii = [num(b.radius) for b in bodies]
+        self.dt = num(dt)
+        self.ring_radius = num(ring_radius)
+        self.restitution = num(restitution)
+        self.tick = 0
+        self.out = {}
+        self.log = []
+        self._initial = (self.pos, self.vel)
+
+    def __len__(self):
+        return len(self.masses)
+
+    def body(self, i: int) -> Body:
+        """ Returns a copy of the i-th body. """
+        return Body(self.pos[i], self.vel[i], self.masses[i], self.radii[i])
+
+    def snapshot(self) -> tuple:
+        """ Returns the whole state as a hashable tuple, for comparisons. """
+        return (self.tick, tuple(sorted(self.out.items())),
+                tuple(tuple(_values(c)) for c in self.pos.columns),
+                tuple(tuple(_values(c)) for c in self.vel.columns))
+
+    """
+    Simulation:
+    """
+    def step(self, inputs: dict = None):
+        """
+        Advances the world by one timestep. inputs maps the index
+        of a body to an acceleration (a vector) for this step.
+        """
+        if inputs:
+            self.log.append((self.tick, dict(inputs)))
+            accel = [[0] * self.pos.dim for _ in range(len(self))]
+            for i, a in inputs.items():
+                accel[i] = a
+            self.vel = self.vel + batch.VectorBatch.from_vectors(
+                accel, self.exact) * self.dt
+        self.pos = self.pos + self.vel * self.dt
+        self._collide()
+        self._ring_out()
+        self.tick += 1
+
+    def run(self, steps: int, inputs: dict = None):
+        """
+        Takes several steps. inputs maps tick numbers
+        to the inputs of the step at that tick.
+        """
+        for _ in range(steps):
+            self.step(inputs.get(self.tick) if inputs else None)
+
+    def _candidates(self, pos: [list, ]):
+        """
+        Private. Yields the pairs of bodies in the same or in adjacent
+        cells of a grid of cells as wide as the largest body, skipping
+        bodies that are out. Cells are visited in sorted order.
+
+        A cell (c_1, ..., c_d) is keyed by the int sum(c_k * W^(d-k)),
+        so that adjacent cells are found by adding int offsets.
+        """
+        size = 2 * max(self.radii)
+        keys = [0] * len(self)
+        for p in pos:
+            keys = [key * _CELL_RADIX + floor(x / size)
+                    for key, x in zip(keys, p)]
+        cells = {}
+        for i, key in enumerate(keys):
+            if i not in self.out:
+                cells.setdefault(key, []).append(i)
+        # Half of the neighbouring offsets, so each pair is seen once:
+        offsets = []
+        for o in product((-1, 0, 1), repeat=len(pos)):
+            if o > (0, ) * len(pos):
+                offset = 0
+                for c in o:
+                    offset = offset * _CELL_RADIX + c
+                offsets.append(offset)
+        for key in sorted(cells):
+            members = cells[key]
+            for k, a in enumerate(members):
+                for b in members[k + 1:]:
+                    yield a, b
+            for offset in offsets:
+                for b in cells.get(key + offset, ()):
+                    for a in members:
+                        yield (a, b) if a < b else (b, a)
+
+    def _collide(self):
+        """
+        Private. For every pair of bodies that overlap and approach,
+        exchanges the impulse along the line between their centers:
+            j = (1 + e) * (dv . dx) / (|dx|^2 * (1/m1 + 1/m2))
+        Pairs are resolved in order of their indices.
+        """
+        pos = [_values(c) for c in self.pos.columns]
+        contacts = []
+        for a, b in self._candidates(pos):
+            reach = self.radii[a] + self.radii[b]
+            dx = [p[a] - p[b] for p in pos]
+            if any(x > reach or -x > reach for x in dx):
+                continue
+            dist_sq = sum(x * x for x in dx)
+            if dist_sq and dist_sq <= reach * reach:
+                contacts.append((a, b, dx, dist_sq))
+        if not contacts:
+            return
+
+        vel = [_values(c) for c in self.vel.columns]
+        e = 1 + self.restitution
+        hit = False
+        for a, b, dx, dist_sq in sorted(contacts, key=lambda c: c[:2]):
+            approach = sum((v[a] - v[b]) * x for v, x in zip(vel, dx))
+            if approach >= 0:
+                continue
+            hit = True
+            ma, mb = self.masses[a], self.masses[b]
+            scale = e * approach / (dist_sq * (ma + mb))
+            for v, x in zip(vel, dx):
+                v[a] -= scale * mb * x
+                v[b] += scale * ma * x
+        if hit:
+            self.vel = batch.VectorBatch(
+                [_column(v, self.exact) for v in vel])
+
+    def _ring_out(self):
+        """ Private. Marks the bodies that are outside of the ring. """
+        r_sq = self.ring_radius * self.ring_radius
+        norms = self.pos.norm_squared()
+        for i, n_sq in enumerate(_values(norms)):
+            if i not in self.out and n_sq > r_sq:
+                self.out[i] = self.tick
+
+    def replay(self):
+        """
+        Returns a new World that re-ran this one's inputs from its
+        initial state for as many steps. Its snapshot() equals this
+        one's: a recorded game can be stored as (initial bodies, log).
+        """
+        world = World.__new__(World)
+        world.__dict__.update(self.__dict__)
+        world.pos, world.vel = self._initial
+        world.tick, world.out, world.log = 0, {}, []
+        inputs = dict(self.log)
+        world.run(self.tick, inputs)
+        return world
+
+
+def physics_tests():
+    print('\n==========================================')
+    print('physics.py @ physics_tests: //////////////\n')
+    bodies = [Body([-2, 0], [1, 0]), Body([2, 0], [-1, 0]),
+              Body([0, 5], [0, 0], mass=2)]
+    world = World(bodies, dt=RF(1, 10), ring_radius=6)
+    world.run(20)
+    print('after head-on collision:', world.body(0), world.body(1))
+    print('expected velocities = [-1, 0] and [1, 0]')
+    world.run(10, {20: {2: [0, 30]}})
+    print('ring-outs:', world.out, 'and expected = {2: 23}')
+    print('replay matches:', world.replay().snapshot() == world.snapshot())
+    print('\nphysics.py @ end of physics_tests ////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    physics_tests()
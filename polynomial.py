@@ -1,6 +1,105 @@
+"""
+Sparse multivariate polynomials with rational coefficients.
+
+A Polynomial maps monomials to integer numerators over one shared
+positive denominator (as in intvec.py), so that arithmetic runs on
+python ints and coefficients only become RationalFrac objects when
+they are read. A monomial is a tuple of exponents, one per variable
+name in Polynomial.variables: it is hashable, and multiplying two
+monomials is adding their tuples.
+
+Monomials are ordered by lex, grlex or grevlex order, through a packed
+int encoding of each exponent tuple (see pack_monomial), with the total
+degree in the high bits for the graded orders. Comparing two monomials
+is then one int comparison, and multiplying them is adding their keys.
+
+Products are computed by Johnson's heap algorithm: the terms of the
+product come out of a heap of at most len(lhs) entries in descending
+order, and equal monomials are merged as they are popped. When the
+exponents are dense enough that it is cheaper, Kronecker substitution
+packs both operands into single python ints, which are multiplied once
+instead.
+"""
+import heapq
+from fractions import Fraction
+from math import gcd
 from numbers import Number
+from operator import add
+
+import rfrac
+
+RF = rfrac.RationalFrac
+
+# Rough costs in seconds on CPython, used to choose between Johnson's
+# algorithm and Kronecker substitution for each product:
+JOHNSON_COST = 3e-6     # Per product of two terms.
+BIGINT_COST = 2.5e-8    # Per (64-bit words)^1.585 of an int product.
+SLOT_COST = 2e-6        # Per packed and unpacked slot.
+
+
+def _ratio(value) -> (int, int):
+    """ Returns a number as a (numerator, denominator) pair. """
+    if isinstance(value, int):
+        return value, 1
+    if isinstance(value, Fraction):
+        return value.numerator, value.denominator
+    return (value if isinstance(value, RF) else RF(value)).as_ratio()
+
+
+def _variables(variables) -> (str, ):
+    """ Accepts 'x y z', or any sequence of names. """
+    if isinstance(variables, str):
+        return tuple(variables.replace(',', ' ').split())
+    return tuple(variables)
+
+
+"""
+Monomial orders, on packed int keys:
+"""
+ORDERS = ('lex', 'grlex', 'grevlex')
+
 
-from rfrac import RationalFrac
+def order_width(max_exponent: int) -> int:
+    """ Returns the field width in bits that holds max_exponent. """
+    return max(1, max_exponent.bit_length())
+
+
+def pack_monomial(m: (int, ), order: str, width: int) -> int:
+    """
+    Returns the int key of an exponent tuple m, whose exponents must
+    each fit in width bits. Keys compare as the monomials do:
+    -- lex:     sum(e[i] * B^(n-1-i)), so e[0] is most significant.
+    -- grlex:   deg(m) * B^n + the lex key.
+    -- grevlex: deg(m) * B^n - sum(e[i] * B^i): equal degrees, then
+                the smaller exponent of the last variable that differs
+                is the larger monomial.
+    where B = 2^width and n = len(m). All three are linear in m, so
+    the key of a product of monomials is the sum of their keys.
+    """
+    key = 0
+    if order == 'grevlex':
+        for e in reversed(m):
+            key = key << width | e
+        return (sum(m) << (width * len(m))) - key
+    for e in m:
+        key = key << width | e
+    if order == 'grlex':
+        key |= sum(m) << (width * len(m))
+    elif order != 'lex':
+        raise ValueError(f'unknown monomial order {order}.')
+    return key
+
+
+def unpack_monomial(key: int, order: str, nvars: int,
+                    width: int) -> (int, ):
+    """ Returns the exponent tuple of a key made by pack_monomial. """
+    shift, mask = width * nvars, (1 << width) - 1
+    if order == 'grevlex':
+        deg = -(-key >> shift)
+        key = (deg << shift) - key
+        return tuple((key >> (width * i)) & mask for i in range(nvars))
+    return tuple((key >> (width * (nvars - 1 - i))) & mask
+                 for i in range(nvars))
 
 
 class Monomial(dict):
@@ -9,40 +108,511 @@ class Monomial(dict):
     Represented as a dictionary from strings, which are
     variable names, to integers, which are their degrees.
     """
-    coefficient: RationalFrac
+    coefficient: RF
 
-    def __init__(self, coefficient: (Number, RationalFrac), **kwargs: _VT):
+    def __init__(self, coefficient: (Number, RF) = 1, **kwargs: int):
         super().__init__(**kwargs)
-        self.coefficient = coefficient
-        # TODO
+        self.coefficient = coefficient if isinstance(coefficient, RF) \
+            else RF(coefficient)
 
     def deg(self):
         return sum(self.values())
 
     def __lt__(self, other):
         """
-        true if self.deg() < other.deg(),
-        or if self.deg() is other.deg() and
-            self.keys() < other.keys(),
-            or otherwise if the corresponding items list is less.
+        true if self.deg() < other.deg(), or if the degrees are
+        equal and self is less in lex order, with variables taken
+        in alphabetical order. (Ie. grlex order; see pack_monomial.)
         """
         if isinstance(other, Monomial):
-            pass  # TODO
+            names = sorted(set(self) | set(other))
+            width = order_width(max(max(self.values(), default=0),
+                                    max(other.values(), default=0)))
+            return (pack_monomial([self.get(v, 0) for v in names],
+                                  'grlex', width) <
+                    pack_monomial([other.get(v, 0) for v in names],
+                                  'grlex', width))
         else:
             return NotImplemented
 
 
+"""
+Term multiplication kernels, on {(int, ): int} dicts:
+"""
+def johnson_mul(a: dict, b: dict, order: str = 'grevlex') -> dict:
+    """
+    Returns the product of two term dicts by Johnson's heap algorithm.
+    The heap holds at most one entry per term of the shorter operand:
+    entry (i, j) stands for a[i] * b[j], and (i + 1, 0) is only pushed
+    once (i, 0) is popped. Monomials are packed into negated int keys
+    in the given order, so the min-heap pops the largest first, equal
+    monomials are popped one after another, and the product's terms
+    are inserted in descending order.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    nvars = len(next(iter(a)))
+    width = order_width(max(map(max, a)) + max(map(max, b)))
+    lhs = sorted((-pack_monomial(m, order, width), c) for m, c in a.items())
+    rhs = sorted((-pack_monomial(m, order, width), c) for m, c in b.items())
+    lhs_m, lhs_c = [m for m, _ in lhs], [c for _, c in lhs]
+    rhs_m, rhs_c = [m for m, _ in rhs], [c for _, c in rhs]
+    n, k = len(lhs), len(rhs)
+    push, pop = heapq.heappush, heapq.heappop
+    heap = [(lhs_m[0] + rhs_m[0], 0, 0)]
+    terms = {}
+    last, total = None, 0
+    while heap:
+        m, i, j = pop(heap)
+        if m != last:
+            if total:
+                terms[unpack_monomial(-last, order, nvars, width)] = total
+            last, total = m, 0
+        total += lhs_c[i] * rhs_c[j]
+        if j == 0 and i + 1 < n:
+            push(heap, (lhs_m[i + 1] + rhs_m[0], i + 1, 0))
+        j += 1
+        if j < k:
+            push(heap, (lhs_m[i] + rhs_m[j], i, j))
+    if total:
+        terms[unpack_monomial(-last, order, nvars, width)] = total
+    return terms
+
+
+def kronecker_pack(coeffs: [(int, int), ], slots: int, width: int) -> int:
+    """
+    Returns sum(c * 2^(width * k)) over the (k, c) pairs in coeffs,
+    where every |c| < 2^(width - 1), and width is a multiple of 8.
+    """
+    size = width // 8
+    pos, neg = bytearray(slots * size), bytearray(slots * size)
+    for k, c in coeffs:
+        if c > 0:
+            pos[k * size: (k + 1) * size] = c.to_bytes(size, 'little')
+        elif c < 0:
+            neg[k * size: (k + 1) * size] = (-c).to_bytes(size, 'little')
+    return int.from_bytes(pos, 'little') - int.from_bytes(neg, 'little')
+
+
+def kronecker_unpack(value: int, slots: int, width: int) -> [(int, int), ]:
+    """
+    Returns the nonzero (k, c) pairs of a value packed as by
+    kronecker_pack, whose digits c may be negative.
+    """
+    size = width // 8
+    # Bias every digit by 2^(width - 1), so that all digits are
+    # positive and the value can be read one slot at a time:
+    half = 1 << (width - 1)
+    bias = int.from_bytes((half.to_bytes(size, 'little')) * slots, 'little')
+    data = (value + bias).to_bytes(slots * size, 'little')
+    coeffs = []
+    for k in range(slots):
+        c = int.from_bytes(data[k * size: (k + 1) * size], 'little') - half
+        if c:
+            coeffs.append((k, c))
+    return coeffs
+
+
+def _kronecker_width(a: dict, b: dict) -> int:
+    """ Private. Returns a digit width that no product entry overflows. """
+    bits = (max(map(abs, a.values())).bit_length() +
+            max(map(abs, b.values())).bit_length() +
+            min(len(a), len(b)).bit_length() + 1)
+    return -(-bits // 8) * 8
+
+
+def kronecker_mul(a: dict, b: dict) -> dict:
+    """
+    Returns the product of two term dicts by Kronecker substitution:
+    a monomial with exponents e maps to the slot sum(e[k] * stride[k]),
+    where the strides are such that no two monomials of the product
+    share a slot.
+    """
+    nvars = len(next(iter(a)))
+    dims = [max(m[k] for m in a) + max(m[k] for m in b) + 1
+            for k in range(nvars)]
+    strides, slots = [], 1
+    for d in reversed(dims):
+        strides.append(slots)
+        slots *= d
+    strides.reverse()
+
+    def slot(m):
+        return sum(map(lambda e, s: e * s, m, strides))
+
+    width = _kronecker_width(a, b)
+    prod = (kronecker_pack([(slot(m), c) for m, c in a.items()],
+                           slots, width) *
+            kronecker_pack([(slot(m), c) for m, c in b.items()],
+                           slots, width))
+    terms = {}
+    for k, c in kronecker_unpack(prod, slots, width):
+        m = []
+        for s in strides:
+            e, k = divmod(k, s)
+            m.append(e)
+        terms[tuple(m)] = c
+    return terms
+
+
+def mul_terms(a: dict, b: dict, order: str = 'grevlex') -> dict:
+    """
+    Returns the product of two term dicts, choosing
+    Kronecker substitution or Johnson's algorithm.
+    """
+    if not a or not b:
+        return {}
+    if len(a) == 1 or len(b) == 1:
+        if len(a) != 1:
+            a, b = b, a
+        (ma, ca), = a.items()
+        return {tuple(map(add, ma, m)): ca * c for m, c in b.items()}
+    nvars = len(next(iter(a)))
+    slots = 1
+    for k in range(nvars):
+        slots *= max(m[k] for m in a) + max(m[k] for m in b) + 1
+    words = slots * _kronecker_width(a, b) / 64
+    if (BIGINT_COST * words ** 1.585 + SLOT_COST * slots <
+            JOHNSON_COST * len(a) * len(b)):
+        return kronecker_mul(a, b)
+    return johnson_mul(a, b, order)
+
+
 class Polynomial:
     """
-    A collection of polynomials
+    A sparse polynomial in several variables, with rational
+    coefficients stored as integers over a shared denominator.
+    The representation is kept reduced: no zero numerators,
+    denom > 0, and no factor common to denom and all numerators.
+    -- terms:       {(int, ): int}  Monomial exponents to numerators.
+    -- denom:       int
+    -- variables:   (str, )
+    -- order:       str             One of ORDERS. See sorted_terms.
     """
-    terms: [Monomial, ] = []
 
-    def __init__(self):
-        pass  # TODO;
+    def __init__(self, terms=None, variables='x', order='grevlex'):
+        """
+        terms may be a number (a constant polynomial), a dict from
+        monomials to coefficients, or a list of Monomial objects.
+        A monomial is a tuple of exponents, or an int exponent when
+        there is one variable. Variables named by Monomial objects
+        are added to variables as needed.
+        """
+        if order not in ORDERS:
+            raise ValueError(f'unknown monomial order {order}.')
+        self.order = order
+        self._sorted = None
+        self.variables = _variables(variables)
+        if terms is None:
+            terms = {}
+        elif isinstance(terms, (RF, Number, str)):
+            terms = {(0, ) * len(self.variables): terms}
+        elif isinstance(terms, list):
+            names = list(self.variables)
+            names.extend(sorted({v for mono in terms for v in mono
+                                 if v not in self.variables}))
+            self.variables = tuple(names)
+            merged = {}
+            for mono in terms:
+                m = tuple(mono.get(v, 0) for v in names)
+                merged[m] = merged.get(m, 0) + Fraction(
+                    *_ratio(mono.coefficient))
+            terms = merged
+
+        ratios = {}
+        for m, c in terms.items():
+            m = (m, ) if isinstance(m, int) else tuple(m)
+            if len(m) != len(self.variables):
+                raise ValueError(f'monomial {m} does not match '
+                                 f'variables {self.variables}.')
+            ratios[m] = _ratio(c)
+        denom = 1
+        for _, d in ratios.values():
+            denom = denom * d // gcd(denom, d)
+        self.terms = {m: n * (denom // d) for m, (n, d) in ratios.items()}
+        self.denom = denom
+        self._reduce()
+
+    @staticmethod
+    def _make(terms: dict, denom: int, variables: (str, ),
+              order: str = 'grevlex'):
+        """ Private. Builds a Polynomial, storing terms by reference. """
+        poly = Polynomial.__new__(Polynomial)
+        poly.terms, poly.denom, poly.variables = terms, denom, variables
+        poly.order, poly._sorted = order, None
+        poly._reduce()
+        return poly
+
+    def _reduce(self):
+        """ Private. The single gcd reduction done after each operation. """
+        if any(c == 0 for c in self.terms.values()):
+            self.terms = {m: c for m, c in self.terms.items() if c}
+        if self.denom < 0:
+            self.terms = {m: -c for m, c in self.terms.items()}
+            self.denom = -self.denom
+        g = gcd(self.denom, *self.terms.values())
+        if g > 1:
+            self.terms = {m: c // g for m, c in self.terms.items()}
+            self.denom //= g
+        elif not self.terms:
+            self.denom = 1
+
+    @staticmethod
+    def var(name: str, variables=None, order='grevlex'):
+        """ Returns the polynomial equal to one variable. """
+        variables = _variables(variables or name)
+        m = tuple(int(v == name) for v in variables)
+        return Polynomial._make({m: 1}, 1, variables, order)
+
+    @staticmethod
+    def constant(value, variables='x', order='grevlex'):
+        return Polynomial(value, variables, order)
+
+    def with_order(self, order: str):
+        """ Returns this polynomial, sorted by another monomial order. """
+        if order not in ORDERS:
+            raise ValueError(f'unknown monomial order {order}.')
+        return Polynomial._make(self.terms, self.denom, self.variables, order)
+
+    """
+    Public-use, representation/observer methods:
+    """
+    def __len__(self):
+        """ Returns the number of terms. """
+        return len(self.terms)
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def coefficient(self, monomial) -> RF:
+        """
+        Returns the coefficient of a monomial, given as a
+        tuple of exponents, or as a dict from names to degrees.
+        """
+        if isinstance(monomial, dict):
+            monomial = tuple(monomial.get(v, 0) for v in self.variables)
+        elif isinstance(monomial, int):
+            monomial = (monomial, )
+        return RF.from_ratio(self.terms.get(tuple(monomial), 0), self.denom)
+
+    def sorted_terms(self) -> [((int, ), int), ]:
+        """
+        Returns the (monomial, numerator) pairs, largest first
+        in self.order. They are sorted by packed int keys once,
+        and the sorted list is kept.
+        """
+        if self._sorted is None:
+            if not self.terms:
+                return []
+            width = order_width(
+                max((max(m) for m in self.terms if m), default=0))
+            self._sorted = sorted(
+                self.terms.items(), reverse=True,
+                key=lambda t: pack_monomial(t[0], self.order, width))
+        return self._sorted
+
+    def leading_term(self) -> ((int, ), RF):
+        """ Returns the largest (monomial, coefficient) pair. """
+        m, c = self.sorted_terms()[0]
+        return m, RF.from_ratio(c, self.denom)
+
+    def __iter__(self):
+        """ Yields (monomial, RationalFrac coefficient) pairs. """
+        for m, c in self.sorted_terms():
+            yield m, RF.from_ratio(c, self.denom)
+
+    def degree(self, var: str = None) -> int:
+        """
+        Returns the total degree, or the degree in one variable.
+        The zero polynomial has degree -1.
+        """
+        if not self.terms:
+            return -1
+        if var is None:
+            return max(map(sum, self.terms))
+        k = self.variables.index(var)
+        return max(m[k] for m in self.terms)
+
+    def is_constant(self) -> bool:
+        return all(not any(m) for m in self.terms)
+
+    def __str__(self):
+        if not self.terms:
+            return '0'
+        s = ''
+        for m, c in self.sorted_terms():
+            coeff = Fraction(c, self.denom)
+            s += ' - ' if coeff < 0 else ' + '
+            coeff = abs(coeff)
+            names = '*'.join(v if e == 1 else f'{v}^{e}'
+                             for v, e in zip(self.variables, m) if e)
+            if not names:
+                s += str(coeff)
+            elif coeff == 1:
+                s += names
+            else:
+                s += f'{coeff}*{names}'
+        return ('-' + s[3:]) if s.startswith(' - ') else s[3:]
+
+    def __repr__(self):
+        return f'Polynomial({self}, variables={self.variables})'
+
+    """
+    Arithmetic:
+    """
+    def _align(self, other) -> (dict, dict, (str, )):
+        """
+        Private. Returns the terms of self and of other
+        over the union of both of their variables.
+        """
+        if self.variables == other.variables:
+            return self.terms, other.terms, self.variables
+        names = self.variables + tuple(
+            v for v in other.variables if v not in self.variables)
+        pad = (0, ) * (len(names) - len(self.variables))
+        lhs = {m + pad: c for m, c in self.terms.items()}
+        index = [other.variables.index(v) if v in other.variables else None
+                 for v in names]
+        rhs = {tuple(0 if k is None else m[k] for k in index): c
+               for m, c in other.terms.items()}
+        return lhs, rhs, names
+
+    def _operand(self, other):
+        """ Private. Returns other as a Polynomial, or None. """
+        if isinstance(other, Polynomial):
+            return other
+        if isinstance(other, (RF, Number)):
+            return Polynomial(other, self.variables, self.order)
+        return None
+
+    def __add__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        lhs, rhs, names = self._align(other)
+        g = gcd(self.denom, other.denom)
+        s, o = other.denom // g, self.denom // g
+        terms = {m: c * s for m, c in lhs.items()}
+        for m, c in rhs.items():
+            terms[m] = terms.get(m, 0) + c * o
+        return Polynomial._make(terms, self.denom * s, names, self.order)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __neg__(self):
+        return Polynomial._make({m: -c for m, c in self.terms.items()},
+                                self.denom, self.variables, self.order)
+
+    def __sub__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return self.__add__(other.__neg__())
+
+    def __rsub__(self, other):
+        return self.__neg__().__add__(other)
+
+    def __mul__(self, other):
+        if isinstance(other, (RF, Number)):
+            numer, denom = _ratio(other)
+            return Polynomial._make(
+                {m: c * numer for m, c in self.terms.items()},
+                self.denom * denom, self.variables, self.order)
+        elif isinstance(other, Polynomial):
+            lhs, rhs, names = self._align(other)
+            return Polynomial._make(mul_terms(lhs, rhs, self.order),
+                                    self.denom * other.denom, names,
+                                    self.order)
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        """ Division by a nonzero scalar. """
+        if isinstance(other, (RF, Number)):
+            numer, denom = _ratio(other)
+            if numer == 0:
+                raise ZeroDivisionError('polynomial division by zero.')
+            return Polynomial._make(
+                {m: c * denom for m, c in self.terms.items()},
+                self.denom * numer, self.variables, self.order)
+        else:
+            return NotImplemented
+
+    def __pow__(self, exp: int, modulo=None):
+        """ Returns this polynomial to a nonnegative int power. """
+        if not isinstance(exp, int) or exp < 0:
+            return NotImplemented
+        result = Polynomial(1, self.variables, self.order)
+        base = self
+        while exp:
+            if exp & 1:
+                result = result * base
+            exp >>= 1
+            if exp:
+                base = base * base
+        return result
+
+    def __eq__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        lhs, rhs, _ = self._align(other)
+        return self.denom == other.denom and lhs == rhs
+
+    def eval(self, *values, **named) -> RF:
+        """
+        Returns the value of the polynomial at a point, given either
+        positionally in the order of variables, or by name.
+        """
+        if named:
+            values = [named[v] for v in self.variables]
+        point = [Fraction(*_ratio(x)) for x in values]
+        total = Fraction(0)
+        for m, c in self.terms.items():
+            term = Fraction(c)
+            for x, e in zip(point, m):
+                if e:
+                    term *= x ** e
+            total += term
+        total /= self.denom
+        return RF.from_ratio(total.numerator, total.denominator)
+
+    __call__ = eval
+
+
+def polynomial_tests():
+    print('\n==========================================')
+    print('polynomial.py @ polynomial_tests: ////////\n')
+    x, y = Polynomial.var('x', 'x y'), Polynomial.var('y', 'x y')
+    p = x * x + RF(1, 2) * x * y - 3
+    print('p =', p)
+    print('p + y =', p + y)
+    print('p * (x - y) =', p * (x - y))
+    print('(x + y + 1)^3 =', (x + y + 1) ** 3)
+    print('p(2, 1) =', p(2, 1), 'and expected = 2')
+    print('constant in no variables:', Polynomial(3, ()),
+          'and expected = 3')
+    q = Polynomial([Monomial(2, x=1, z=2), Monomial(RF(-1, 3), y=1)], 'x y')
+    print('q =', q, 'with variables', q.variables)
+    r = Polynomial({(1, 0, 1): 1, (0, 2, 0): 1, (2, 0, 0): 1, (1, 0, 0): 1},
+                   'x y z')
+    for order in ORDERS:
+        print(f'{order}:', r.with_order(order))
+    print('expected = x^2 + x*z + x + y^2; x^2 + x*z + y^2 + x;'
+          ' x^2 + y^2 + x*z + x')
+    print('Monomial order:', Monomial(1, x=1, z=1) < Monomial(1, y=2),
+          'and expected = False')
+    big = (x + y + 1) ** 10
+    print('johnson == kronecker:',
+          johnson_mul(big.terms, big.terms) ==
+          kronecker_mul(big.terms, big.terms))
+    print('\npolynomial.py @ end of polynomial_tests //')
+    print('==========================================\n')
 
 
-# just testing syntax:
-monomial_vars = {'x': 2, 'y': 1, 'z': 0}
-for entry in monomial_vars.items():
-    print(entry)
+if __name__ == '__main__':
+    polynomial_tests()
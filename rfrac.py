@@ -1,4 +1,5 @@
 from functools import reduce
+from math import gcd
 from operator import mul
 
 
@@ -21,6 +22,8 @@ class RationalFrac:
     Consists of two lists of integer-valued prime factors-
     one for the numerator, and one for the denominator.
     Each operation preserves that the fraction is simplified.
+    Operations never modify an operand or its factor lists, so
+    instances and their lists can be shared by reference.
     -- numer:   [int, ] = []      empty if numerator is 1.
     -- denom:   [int, ] = []      empty if denominator is 1.
     -- neg:     bool = False      True if net sign is negative.
@@ -126,13 +129,80 @@ class RationalFrac:
                 break
             while num % prime == 0:
                 factors.append(prime)
-                num = int(round(num / prime))
+                num //= prime
         if num != 1:
-            # TODO: make it find larger primes to avoid this problem.
-            raise ArithmeticError(
-                f'num is {num}. did not finish prime factorization.')
+            # Split whatever is left with Pollard's rho. A cofactor
+            # that resists splitting is kept whole (see simplify).
+            factors.extend(RationalFrac.__split(num))
+            factors.sort()
         return factors
 
+    @staticmethod
+    def is_prime(num: int) -> bool:
+        """
+        Miller-Rabin test. Deterministic for num < 3.3e24,
+        and a strong probable-prime test for larger num.
+        """
+        if num < 2:
+            return False
+        bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+        for base in bases:
+            if num % base == 0:
+                return num == base
+        d, s = num - 1, 0
+        while d % 2 == 0:
+            d //= 2
+            s += 1
+        for base in bases:
+            x = pow(base, d, num)
+            if x == 1 or x == num - 1:
+                continue
+            for _ in range(s - 1):
+                x = x * x % num
+                if x == num - 1:
+                    break
+            else:
+                return False
+        return True
+
+    @staticmethod
+    def __split(num: int, budget: int = 1 << 12) -> [int, ]:
+        """
+        Private helper for factorize(). Splits num, which has no
+        small prime factors, using Brent's variant of Pollard's rho.
+        Gives up on a cofactor after budget iterations.
+        """
+        if RationalFrac.is_prime(num):
+            return [num, ]
+        for c in range(1, 6):
+            y, r, q, g = 2, 1, 1, 1
+            x = ys = y
+            while g == 1 and r <= budget:
+                x = y
+                for _ in range(r):
+                    y = (y * y + c) % num
+                k = 0
+                while k < r and g == 1:
+                    ys = y
+                    for _ in range(min(128, r - k)):
+                        y = (y * y + c) % num
+                        q = q * abs(x - y) % num
+                    g = gcd(q, num)
+                    k += 128
+                r *= 2
+            if g == num:
+                # Backtrack one step at a time:
+                g = 1
+                while g == 1:
+                    ys = (ys * ys + c) % num
+                    g = gcd(abs(x - ys), num)
+            if 1 < g < num:
+                return (RationalFrac.__split(g, budget) +
+                        RationalFrac.__split(num // g, budget))
+            elif g == 1:
+                break  # Out of budget. Retrying won't do better.
+        return [num, ]
+
     @staticmethod
     def rf_prod(prime_factors: [int, ]):
         """
@@ -155,15 +225,32 @@ class RationalFrac:
             self.denom = []
             self.neg = False
             return
-        # Eliminate common factors:
-        for factor in set(self.numer):
+        # Eliminate common factors. The lists may be shared
+        # with other instances, so build new ones:
+        numer = list(self.numer)
+        denom = list(self.denom)
+        for factor in set(numer):
             # number of shared occurrences:
-            count = min(self.denom.count(factor),
-                        self.numer.count(factor))
+            count = min(denom.count(factor),
+                        numer.count(factor))
             # Remove each shared occurrence:
             for i in range(count):
-                self.numer.remove(factor)
-                self.denom.remove(factor)
+                numer.remove(factor)
+                denom.remove(factor)
+
+        # Factors that factorize() could not split may still share
+        # a divisor with a factor on the other side:
+        if numer and denom and max(numer) > 541 and max(denom) > 541:
+            n, d = RationalFrac.rf_prod(numer), RationalFrac.rf_prod(denom)
+            g = gcd(n, d)
+            if g != 1:
+                numer = RationalFrac.factorize(n // g)
+                denom = RationalFrac.factorize(d // g)
+        # Keep a canonical order so that __eq__ can compare lists:
+        numer.sort()
+        denom.sort()
+        self.numer = numer
+        self.denom = denom
 
     def numer_prod(self) -> int:
         return RationalFrac.rf_prod(self.numer)
@@ -171,6 +258,35 @@ class RationalFrac:
     def denom_prod(self) -> int:
         return RationalFrac.rf_prod(self.denom)
 
+    def as_ratio(self) -> (int, int):
+        """
+        Returns the signed numerator and the
+        positive denominator of this fraction.
+        """
+        numer = self.numer_prod()
+        return -numer if self.neg else numer, self.denom_prod()
+
+    @staticmethod
+    def from_ratio(numer: int, denom: int = 1):
+        """
+        Builds a RationalFrac from a pair of integers.
+        Cheaper than RationalFrac(numer, denom) for large
+        values, as the pair is reduced before factorizing.
+        """
+        if denom == 0:
+            raise ZeroDivisionError(
+                'should not initialize with a denominator of zero.')
+        frac = RationalFrac(0, empty=True)
+        if numer == 0:
+            frac.numer = [0, ]
+            return frac
+        g = gcd(numer, denom)
+        numer, denom = numer // g, denom // g
+        frac.neg = (numer < 0) != (denom < 0)
+        frac.numer = RationalFrac.factorize(abs(numer))
+        frac.denom = RationalFrac.factorize(abs(denom))
+        return frac
+
     """
     Public-use, representation/observer methods:
     """
@@ -305,17 +421,11 @@ class RationalFrac:
             return NotImplemented
 
     def __imul__(self, other):
-        """ Multiplies self by other(a constant) in-place. """
-        if isinstance(other, (int, float, str)):
-            other = RationalFrac(other)
-        if isinstance(other, RationalFrac):
-            self.numer.extend(other.numer)
-            self.denom.extend(other.denom)
-            self.neg = not(self.neg == other.neg)
-            self.simplify()
-            return self
-        else:
-            return NotImplemented
+        """
+        Same as __mul__. Instances may be shared between copies
+        of a Vector or Matrix, so this does not modify self.
+        """
+        return self.__mul__(other)
 
     def __rmul__(self, other):
         """ Returns the product of this and a constant. """
@@ -343,17 +453,11 @@ class RationalFrac:
         return RationalFrac(other).__imul__(self.reciprocal())
 
     def __itruediv__(self, other):
-        """ Divides self by other in place. """
-        if isinstance(other, (int, float, str)):
-            other = RationalFrac(other)
-        if isinstance(other, RationalFrac):
-            self.numer.extend(other.denom)
-            self.denom.extend(other.numer)
-            self.neg = not(self.neg == other.neg)
-            self.simplify()
-            return self
-        else:
-            return NotImplemented
+        """
+        Same as __truediv__. Instances may be shared between copies
+        of a Vector or Matrix, so this does not modify self.
+        """
+        return self.__truediv__(other)
 
     """
     Modulus and powers:
@@ -406,12 +510,20 @@ class RationalFrac:
     def __eq__(self, other):
         """
         Returns True if the fractions are equal in value.
-        Assumes the rep invariant that both are fully simplified.
+        Both are simplified, so equal factor lists mean equal values.
+        The converse only holds if every factor is prime: factorize()
+        may keep a composite that it could not split, and then the
+        products are compared instead.
         """
         if isinstance(other, RationalFrac):
-            return (self.numer == other.numer and
-                    self.denom == other.denom and
-                    self.neg == other.neg)
+            if self.neg != other.neg:
+                return False
+            if self.numer == other.numer and self.denom == other.denom:
+                return True
+            if all(f <= 541 for f in self.numer + self.denom +
+                   other.numer + other.denom):
+                return False  # Small factors are always split.
+            return self.as_ratio() == other.as_ratio()
         elif isinstance(other, (int, float, str)):
             return self.__eq__(RationalFrac(other))
         else:
@@ -449,6 +561,10 @@ def rational_frac_tests():
     f3 = RationalFrac('-7/29')
     print(f3)
     print(RationalFrac(25, 1000))
+    # p * q is too large for factorize() to split:
+    p, q = 10 ** 9 + 7, 998244353
+    print('p * q == RF(p) * RF(q):', RationalFrac.from_ratio(p * q) ==
+          RationalFrac(p) * RationalFrac(q), 'and expected = True')
     print('\nrfrac.py @ end of rational_frac_tests ////')
     print('==========================================\n')
 
@@ -0,0 +1,506 @@
+"""
+Sparse Vector and Matrix storage.
+
+DOKMatrix (dict of keys) is cheap to build and edit one entry at a
+time. CSRMatrix (compressed sparse rows) is compact and fast to
+traverse, and is what arithmetic runs on. SparseVector is a dict of
+keys. Only nonzero entries are stored, so memory and the cost of every
+operation scale with the number of nonzeros.
+
+Entries are RationalFrac objects at the interface. Internally, kernels
+convert them once to fractions.Fraction, whose arithmetic on python
+ints is much cheaper than on prime factor lists.
+"""
+from fractions import Fraction
+from numbers import Number
+
+import matrix
+import rfrac
+import vector
+
+RF = rfrac.RationalFrac
+
+
+def _to_fraction(value) -> Fraction:
+    value = value if isinstance(value, RF) else RF(value)
+    return Fraction(*value.as_ratio())
+
+
+def _to_rf(value: Fraction) -> RF:
+    return RF.from_ratio(value.numerator, value.denominator)
+
+
+class SparseVector(dict):
+    """
+    A vector of RationalFrac entries that only stores its nonzero
+    entries, as a dict from index to value.
+    -- size:    int     The length of the (dense) vector.
+    """
+    size: int
+
+    def __init__(self, size: int, entries: dict = None):
+        super().__init__()
+        self.size = size
+        for i, value in (entries or {}).items():
+            self[i] = value
+
+    @staticmethod
+    def from_dense(vec):
+        """ Returns a SparseVector with the nonzero entries of vec. """
+        return SparseVector(len(vec), {
+            i: value for i, value in enumerate(vec) if value != 0})
+
+    def to_dense(self):
+        """ Returns this as a Vector. """
+        vec = vector.Vector([0] * self.size)
+        for i, value in self.items():
+            vec[i] = value
+        return vec
+
+    def nnz(self) -> int:
+        return len(self.keys())
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        return super().get(key, RF(0))
+
+    def __setitem__(self, key, value):
+        """ Performs conversions, and drops entries that are zero. """
+        if not 0 <= key < self.size:
+            raise IndexError(f'index {key} out of range.')
+        value = value if isinstance(value, RF) else RF(value)
+        if value == 0:
+            self.pop(key, None)
+        else:
+            super().__setitem__(key, value)
+
+    def __str__(self):
+        return str(self.to_dense())
+
+    def __add__(self, other):
+        if isinstance(other, SparseVector):
+            if self.size != other.size:
+                raise matrix.MatrixSizeError(
+                    'cannot add vectors of unequal lengths.')
+            total = SparseVector(self.size, self)
+            for i, value in other.items():
+                total[i] = dict.get(total, i, RF(0)) + value
+            return total
+        else:
+            return NotImplemented
+
+    def __neg__(self):
+        return SparseVector(self.size, {i: -v for i, v in self.items()})
+
+    def __sub__(self, other):
+        if isinstance(other, SparseVector):
+            return self.__add__(other.__neg__())
+        else:
+            return NotImplemented
+
+    def __mul__(self, other):
+        """ Scalar multiplication. """
+        if isinstance(other, (RF, Number)):
+            return SparseVector(self.size, {
+                i: value * other for i, value in self.items()})
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def dot(self, other) -> RF:
+        """ Returns the dot product, visiting only shared nonzeros. """
+        if len(other) != self.size:
+            raise matrix.MatrixSizeError('vector lengths incompatible.')
+        if isinstance(other, SparseVector) and other.nnz() < self.nnz():
+            return other.dot(self)
+        total = sum((_to_fraction(value) * _to_fraction(other[i])
+                     for i, value in self.items()), Fraction(0))
+        return _to_rf(total)
+
+    def __eq__(self, other):
+        if isinstance(other, SparseVector):
+            return self.size == other.size and dict.__eq__(self, other)
+        return NotImplemented
+
+
+class DOKMatrix(dict):
+    """
+    A sparse matrix stored as a dict from (row, col) to the value of
+    each nonzero entry. Best for building a matrix entry by entry.
+    """
+    nrows: int
+    ncols: int
+
+    def __init__(self, nrows: int, ncols: int, entries: dict = None):
+        super().__init__()
+        self.nrows = nrows
+        self.ncols = ncols
+        for key, value in (entries or {}).items():
+            self[key] = value
+
+    @staticmethod
+    def identity(n: int):
+        """ Returns an n x n identity matrix. """
+        return DOKMatrix(n, n, {(i, i): RF(1) for i in range(n)})
+
+    @staticmethod
+    def zeros(nrows: int, ncols: int = None):
+        """ Returns a matrix of all zeros. Stores nothing. """
+        return DOKMatrix(nrows, nrows if ncols is None else ncols)
+
+    @staticmethod
+    def from_dense(mtx):
+        """ Returns a DOKMatrix with the nonzero entries of mtx. """
+        return DOKMatrix(mtx.nrows, mtx.ncols, {
+            (r, c): value for r, row in enumerate(mtx.rows())
+            for c, value in enumerate(row) if value != 0})
+
+    def to_dense(self):
+        return self.tocsr().to_dense()
+
+    def tocsr(self):
+        """ Returns this as a CSRMatrix. """
+        rows = [{} for _ in range(self.nrows)]
+        for (r, c), value in self.items():
+            rows[r][c] = value
+        return CSRMatrix._from_row_dicts(self.nrows, self.ncols, rows)
+
+    def nnz(self) -> int:
+        return len(self)
+
+    def __getitem__(self, key):
+        return super().get(key, RF(0))
+
+    def __setitem__(self, key, value):
+        """ Performs conversions, and drops entries that are zero. """
+        r, c = key
+        if not (0 <= r < self.nrows and 0 <= c < self.ncols):
+            raise IndexError(f'index {key} out of range.')
+        value = value if isinstance(value, RF) else RF(value)
+        if value == 0:
+            self.pop(key, None)
+        else:
+            super().__setitem__(key, value)
+
+    def __str__(self):
+        return str(self.to_dense())
+
+    def transpose(self):
+        return DOKMatrix(self.ncols, self.nrows, {
+            (c, r): value for (r, c), value in self.items()})
+
+    def __add__(self, other):
+        if isinstance(other, (DOKMatrix, CSRMatrix)):
+            return (self.tocsr() + other).todok()
+        else:
+            return NotImplemented
+
+    def __matmul__(self, other):
+        if isinstance(other, DOKMatrix):
+            return (self.tocsr() @ other.tocsr()).todok()
+        return self.tocsr().__matmul__(other)
+
+    def rref(self):
+        return self.tocsr().rref().todok()
+
+    def det(self) -> RF:
+        return self.tocsr().det()
+
+
+class CSRMatrix:
+    """
+    A sparse matrix in compressed sparse row form.
+    The nonzeros of row r are data[indptr[r]: indptr[r + 1]],
+    in the columns indices[indptr[r]: indptr[r + 1]] (ascending).
+    """
+    nrows: int
+    ncols: int
+
+    def __init__(self, nrows: int, ncols: int,
+                 indptr: [int, ], indices: [int, ], data: [RF, ]):
+        """
+        Requires that the three lists are consistent.
+        They are stored by reference.
+        """
+        self.nrows = nrows
+        self.ncols = ncols
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @staticmethod
+    def _from_row_dicts(nrows: int, ncols: int, rows: [dict, ]):
+        """ Private. Packs one dict from column to value per row. """
+        indptr, indices, data = [0], [], []
+        for row in rows:
+            for c in sorted(row):
+                indices.append(c)
+                data.append(row[c])
+            indptr.append(len(indices))
+        return CSRMatrix(nrows, ncols, indptr, indices, data)
+
+    def _row_dicts(self, convert=None) -> [dict, ]:
+        """ Private. Unpacks one dict from column to value per row. """
+        convert = convert or (lambda x: x)
+        return [{self.indices[k]: convert(self.data[k])
+                 for k in range(self.indptr[r], self.indptr[r + 1])}
+                for r in range(self.nrows)]
+
+    @staticmethod
+    def from_dense(mtx):
+        """ Returns a CSRMatrix with the nonzero entries of mtx. """
+        return CSRMatrix._from_row_dicts(mtx.nrows, mtx.ncols, [
+            {c: value for c, value in enumerate(row) if value != 0}
+            for row in mtx.rows()])
+
+    def to_dense(self):
+        """ Returns this as a Matrix. """
+        dense = matrix.Matrix([[0] * self.ncols for _ in range(self.nrows)])
+        for r, row in enumerate(self._row_dicts()):
+            for c, value in row.items():
+                dense[r][c] = value
+        return dense
+
+    def todok(self):
+        """ Returns this as a DOKMatrix. """
+        dok = DOKMatrix(self.nrows, self.ncols)
+        for r, row in enumerate(self._row_dicts()):
+            for c, value in row.items():
+                dict.__setitem__(dok, (r, c), value)
+        return dok
+
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key):
+        r, c = key
+        for k in range(self.indptr[r], self.indptr[r + 1]):
+            if self.indices[k] == c:
+                return self.data[k]
+        return RF(0)
+
+    def __str__(self):
+        return str(self.to_dense())
+
+    def __eq__(self, other):
+        if isinstance(other, (CSRMatrix, DOKMatrix)):
+            other = other.tocsr() if isinstance(other, DOKMatrix) else other
+            return (self.nrows == other.nrows and
+                    self.ncols == other.ncols and
+                    self.indptr == other.indptr and
+                    self.indices == other.indices and
+                    self.data == other.data)
+        return NotImplemented
+
+    def transpose(self):
+        """ Returns the transpose in O(nnz) by counting sort. """
+        counts = [0] * (self.ncols + 1)
+        for c in self.indices:
+            counts[c + 1] += 1
+        for c in range(self.ncols):
+            counts[c + 1] += counts[c]
+        indptr = counts.copy()
+        indices = [0] * self.nnz()
+        data = [None] * self.nnz()
+        for r in range(self.nrows):
+            for k in range(self.indptr[r], self.indptr[r + 1]):
+                dest = counts[self.indices[k]]
+                indices[dest] = r
+                data[dest] = self.data[k]
+                counts[self.indices[k]] += 1
+        return CSRMatrix(self.ncols, self.nrows, indptr, indices, data)
+
+    def __add__(self, other):
+        """ Adds row by row, merging the nonzeros of both operands. """
+        if isinstance(other, DOKMatrix):
+            other = other.tocsr()
+        if not isinstance(other, CSRMatrix):
+            return NotImplemented
+        if not (self.nrows == other.nrows and self.ncols == other.ncols):
+            raise matrix.MatrixSizeError('dimensions not equal')
+        rows = self._row_dicts(_to_fraction)
+        for r, row in enumerate(other._row_dicts(_to_fraction)):
+            for c, value in row.items():
+                rows[r][c] = rows[r].get(c, 0) + value
+        return CSRMatrix._from_row_dicts(self.nrows, self.ncols, [
+            {c: _to_rf(v) for c, v in row.items() if v} for row in rows])
+
+    def __mul__(self, other):
+        """ Scalar multiplication. """
+        if isinstance(other, (RF, Number)):
+            if other == 0:
+                return CSRMatrix(self.nrows, self.ncols,
+                                 [0] * (self.nrows + 1), [], [])
+            data = [value * other for value in self.data]
+            return CSRMatrix(self.nrows, self.ncols, self.indptr.copy(),
+                             self.indices.copy(), data)
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __matmul__(self, other):
+        """
+        Sparse matrix product by Gustavson's algorithm: each row
+        of the result accumulates scaled rows of other, so work
+        is proportional to the number of nonzero products.
+        Also accepts a DOKMatrix, a SparseVector or a Vector.
+        """
+        if isinstance(other, DOKMatrix):
+            other = other.tocsr()
+        if isinstance(other, CSRMatrix):
+            if self.ncols != other.nrows:
+                raise matrix.MatrixSizeError('op1 #cols != op2 #rows')
+            lhs = self._row_dicts(_to_fraction)
+            rhs = other._row_dicts(_to_fraction)
+            rows = []
+            for row in lhs:
+                acc = {}
+                for k, a in row.items():
+                    for c, b in rhs[k].items():
+                        acc[c] = acc.get(c, 0) + a * b
+                rows.append({c: _to_rf(v) for c, v in acc.items() if v})
+            return CSRMatrix._from_row_dicts(self.nrows, other.ncols, rows)
+
+        elif isinstance(other, (SparseVector, vector.Vector)):
+            if self.ncols != len(other):
+                raise matrix.MatrixSizeError('op1 #cols != op2 length')
+            if isinstance(other, SparseVector):
+                vec = {i: _to_fraction(v) for i, v in other.items()}
+            else:
+                vec = {i: _to_fraction(v) for i, v in enumerate(other)
+                       if v != 0}
+            prod = {}
+            for r, row in enumerate(self._row_dicts()):
+                total = sum((_to_fraction(a) * vec[c]
+                             for c, a in row.items() if c in vec),
+                            Fraction(0))
+                if total:
+                    prod[r] = _to_rf(total)
+            if isinstance(other, SparseVector):
+                return SparseVector(self.nrows, prod)
+            return SparseVector(self.nrows, prod).to_dense()
+        else:
+            return NotImplemented
+
+    def rref(self):
+        """
+        Returns the reduced row echelon form as a CSRMatrix.
+        For each pivot column, the pivot is taken from the
+        candidate row with the fewest nonzeros (the Markowitz
+        row count), which limits fill-in of the other rows.
+        """
+        rows = self._row_dicts(_to_fraction)
+        done = []
+        pending = list(range(self.nrows))
+        for c in range(self.ncols):
+            candidates = [r for r in pending if c in rows[r]]
+            if not candidates:
+                continue
+            pivot = min(candidates, key=lambda r: len(rows[r]))
+            pending.remove(pivot)
+            scale = rows[pivot][c]
+            pivot_row = {k: v / scale for k, v in rows[pivot].items()}
+            rows[pivot] = pivot_row
+
+            # Only rows with a nonzero in column c need updating:
+            for r in range(self.nrows):
+                factor = rows[r].get(c) if r != pivot else None
+                if factor:
+                    row = rows[r]
+                    for k, v in pivot_row.items():
+                        value = row.get(k, 0) - factor * v
+                        if value:
+                            row[k] = value
+                        else:
+                            row.pop(k, None)
+            done.append(pivot)
+            if not pending:
+                break
+
+        # Pivot rows in order of their pivot columns, then zero rows:
+        ordered = [rows[r] for r in done] + [rows[r] for r in pending]
+        return CSRMatrix._from_row_dicts(self.nrows, self.ncols, [
+            {k: _to_rf(v) for k, v in row.items()} for row in ordered])
+
+    def det(self) -> RF:
+        """
+        Returns the determinant by sparse elimination. Each pivot
+        minimizes the Markowitz cost (r - 1) * (c - 1), where r and c
+        count the nonzeros in its row and column, to limit fill-in.
+        """
+        if self.nrows != self.ncols:
+            raise matrix.MatrixSizeError(
+                'cannot take determinant: matrix not square.')
+        rows = dict(enumerate(self._row_dicts(_to_fraction)))
+        cols = {}
+        for r, row in rows.items():
+            for c in row:
+                cols.setdefault(c, set()).add(r)
+        row_order = list(range(self.nrows))
+        col_order = list(range(self.ncols))
+        det = Fraction(1)
+        while rows:
+            if len(cols) < len(rows):
+                return RF(0)  # A column is entirely zero.
+            candidates = [((len(row) - 1) * (len(cols[c]) - 1), r, c)
+                          for r, row in rows.items() for c in row]
+            if not candidates:
+                return RF(0)  # Every remaining row is zero.
+            _, r, c = min(candidates)
+
+            # Sign of moving the pivot to the top-left corner:
+            i, j = row_order.index(r), col_order.index(c)
+            if (i + j) % 2:
+                det = -det
+            row_order.pop(i)
+            col_order.pop(j)
+
+            pivot_row = rows.pop(r)
+            pivot = pivot_row.pop(c)
+            det *= pivot
+            for k in pivot_row:
+                cols[k].discard(r)
+            for other in cols.pop(c) - {r}:
+                row = rows[other]
+                factor = row.pop(c) / pivot
+                for k, v in pivot_row.items():
+                    value = row.get(k, 0) - factor * v
+                    if value:
+                        row[k] = value
+                        cols[k].add(other)
+                    else:
+                        row.pop(k, None)
+                        cols[k].discard(other)
+            for k in [k for k, rs in cols.items() if not rs]:
+                del cols[k]
+        return _to_rf(det)
+
+    def tocsr(self):
+        return self
+
+
+def sparse_tests():
+    print('\n==========================================')
+    print('sparse.py @ sparse_tests: ////////////////\n')
+    dok = DOKMatrix.identity(4)
+    dok[0, 3] = 2
+    dok[3, 0] = RF(1, 2)
+    csr = dok.tocsr()
+    print(csr, '\nnnz =', csr.nnz(), 'of', csr.nrows * csr.ncols)
+    print('det: actual =', csr.det(), 'and expected = 0')
+    print('rref =\n', csr.rref())
+    print('csr @ csr^T =\n', csr @ csr.transpose())
+    print('dense round trip:',
+          CSRMatrix.from_dense(csr.to_dense()) == csr)
+    print('\nsparse.py @ end of sparse_tests //////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    sparse_tests()
@@ -0,0 +1,316 @@
+"""
+Spatial indexes over Vector positions.
+
+SpatialHash buckets points into a uniform grid of cubic cells kept in a
+dict, so inserting, moving and removing a point is O(1), and a radius
+query only visits the cells that the query ball overlaps. KDTree is
+built once over a fixed set of points, for repeated queries.
+
+Every comparison is an exact comparison of squared distances. Points
+are converted once to tuples of fractions.Fraction (see sparse.py),
+and no square root is ever taken.
+"""
+import heapq
+from fractions import Fraction
+from itertools import product
+from math import floor
+
+import matrix
+import rfrac
+
+RF = rfrac.RationalFrac
+
+
+def _to_fraction(value) -> Fraction:
+    if isinstance(value, (int, float, Fraction)):
+        return Fraction(value)
+    value = value if isinstance(value, RF) else RF(value)
+    return Fraction(*value.as_ratio())
+
+
+def _point(pos) -> (Fraction, ):
+    """ Returns a position (Vector, list, ...) as a tuple of Fractions. """
+    return tuple(_to_fraction(x) for x in pos)
+
+
+def _dist_sq(a, b) -> Fraction:
+    return sum((x - y) ** 2 for x, y in zip(a, b))
+
+
+def _to_rf(value: Fraction) -> RF:
+    return RF.from_ratio(value.numerator, value.denominator)
+
+
+class SpatialHash:
+    """
+    A uniform grid of cubic cells over points of any dimension.
+    Points are stored under keys given by the caller.
+    -- cell:    Fraction                The side length of a cell.
+    -- cells:   {(int, ): {key, }}      The keys in each nonempty cell.
+    -- points:  {key: (Fraction, )}
+    """
+
+    def __init__(self, cell_size):
+        """
+        Queries are fastest when cell_size is about the
+        radius that will usually be queried with.
+        """
+        self.cell = _to_fraction(cell_size)
+        if self.cell <= 0:
+            raise ValueError('cell_size must be positive.')
+        self.cells = {}
+        self.points = {}
+
+    def _cell_of(self, point) -> (int, ):
+        return tuple(floor(x / self.cell) for x in point)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, key):
+        return key in self.points
+
+    def position(self, key) -> [RF, ]:
+        return [_to_rf(x) for x in self.points[key]]
+
+    """
+    Updates:
+    """
+    def insert(self, key, pos):
+        """ Adds a point, or moves it if key is already present. """
+        if key in self.points:
+            self.move(key, pos)
+            return
+        point = _point(pos)
+        if self.points and len(point) != len(next(iter(self.points.values()))):
+            raise matrix.MatrixSizeError('vector lengths incompatible.')
+        self.points[key] = point
+        self.cells.setdefault(self._cell_of(point), set()).add(key)
+
+    def remove(self, key):
+        """ Removes a point. Raises KeyError if key is absent. """
+        point = self.points.pop(key)
+        cell = self._cell_of(point)
+        keys = self.cells[cell]
+        keys.discard(key)
+        if not keys:
+            del self.cells[cell]
+
+    def move(self, key, pos):
+        """ Moves a point. Only changes buckets if it changes cells. """
+        point = _point(pos)
+        old, new = self._cell_of(self.points[key]), self._cell_of(point)
+        self.points[key] = point
+        if old != new:
+            keys = self.cells[old]
+            keys.discard(key)
+            if not keys:
+                del self.cells[old]
+            self.cells.setdefault(new, set()).add(key)
+
+    """
+    Queries:
+    """
+    def within(self, center, radius) -> list:
+        """
+        Returns the keys of the points at distance at most
+        radius from center, nearest first.
+        """
+        center, radius = _point(center), _to_fraction(radius)
+        r_sq = radius * radius
+        low = self._cell_of([x - radius for x in center])
+        high = self._cell_of([x + radius for x in center])
+        found = []
+        for cell in product(*(range(lo, hi + 1)
+                              for lo, hi in zip(low, high))):
+            for key in self.cells.get(cell, ()):
+                d_sq = _dist_sq(self.points[key], center)
+                if d_sq <= r_sq:
+                    found.append((d_sq, key))
+        found.sort(key=lambda pair: pair[0])
+        return [key for _, key in found]
+
+    def nearest(self, center, k: int = 1) -> list:
+        """
+        Returns the keys of the k points nearest to center, nearest
+        first. Searches rings of cells outward from the center's cell,
+        until no unvisited cell can hold anything nearer. Once a ring
+        has more cells than there are nonempty cells, the nonempty
+        cells that are left are scanned instead.
+        """
+        if k <= 0:
+            return []
+        center = _point(center)
+        origin = self._cell_of(center)
+        best = []   # max-heap of (-d_sq, tie, key) of the k nearest
+        seen, ring, tie = 0, 0, 0
+        while seen < len(self.points):
+            if ring and ((2 * ring + 1) ** len(origin) -
+                         (2 * ring - 1) ** len(origin)) > len(self.cells):
+                cells = [cell for cell in self.cells if max(
+                    abs(c - o) for c, o in zip(cell, origin)) >= ring]
+            else:
+                cells = self._ring(origin, ring)
+            for cell in cells:
+                for key in self.cells.get(cell, ()):
+                    seen += 1
+                    tie += 1
+                    d_sq = _dist_sq(self.points[key], center)
+                    if len(best) < k:
+                        heapq.heappush(best, (-d_sq, tie, key))
+                    elif d_sq < -best[0][0]:
+                        heapq.heapreplace(best, (-d_sq, tie, key))
+            # Points in later rings are at least ring cells away:
+            reach = ring * self.cell
+            if len(best) == k and -best[0][0] <= reach * reach:
+                break
+            ring += 1
+        return [key for _, _, key in sorted(best, key=lambda e: (-e[0], e[1]))]
+
+    @staticmethod
+    def _ring(origin, ring: int):
+        """
+        Private. Yields the cells at Chebyshev distance ring, face by
+        face: on face i, coordinate i is -ring or ring, the ones before
+        it are strictly inside (their faces came first), and the ones
+        after it take any value in [-ring, ring].
+        """
+        if not ring:
+            yield tuple(origin)
+            return
+        dim = len(origin)
+        inner, outer = range(1 - ring, ring), range(-ring, ring + 1)
+        for i in range(dim):
+            for side in (-ring, ring):
+                for offset in product(*([inner] * i + [(side, )] +
+                                        [outer] * (dim - i - 1))):
+                    yield tuple(c + o for c, o in zip(origin, offset))
+
+    def pairs(self, distance) -> list:
+        """
+        Returns every pair of keys (a, b) of points at distance at most
+        distance from each other, such as every pair of overlapping
+        discs of radius distance / 2.
+        """
+        distance = _to_fraction(distance)
+        d_sq = distance * distance
+        reach = int(distance // self.cell) + 1
+        dim = len(next(iter(self.points.values()), ()))
+        offsets = list(product(range(-reach, reach + 1), repeat=dim))
+        found = []
+        for cell, keys in self.cells.items():
+            for offset in offsets:
+                other = tuple(c + o for c, o in zip(cell, offset))
+                # Visit each pair of cells once:
+                if other < cell or other not in self.cells:
+                    continue
+                keys, others = list(keys), list(self.cells[other])
+                for i, a in enumerate(keys):
+                    pa = self.points[a]
+                    for b in others[i + 1:] if other == cell else others:
+                        if _dist_sq(pa, self.points[b]) <= d_sq:
+                            found.append((a, b))
+        return found
+
+
+class KDTree:
+    """
+    A k-d tree over a fixed set of points, split at the median
+    of each axis in turn. Nodes are tuples of
+    (point, key, axis, left subtree, right subtree), or None.
+    -- root:    tuple
+    """
+
+    def __init__(self, points):
+        """ points is a dict from keys to positions, or a list of pairs. """
+        items = points.items() if isinstance(points, dict) else points
+        self.root = KDTree._build(
+            [(_point(pos), key) for key, pos in items], 0)
+
+    @staticmethod
+    def _build(items, depth):
+        if not items:
+            return None
+        axis = depth % len(items[0][0])
+        items.sort(key=lambda item: item[0][axis])
+        mid = len(items) // 2
+        point, key = items[mid]
+        return (point, key, axis,
+                KDTree._build(items[:mid], depth + 1),
+                KDTree._build(items[mid + 1:], depth + 1))
+
+    def within(self, center, radius) -> list:
+        """
+        Returns the keys of the points at distance at most
+        radius from center, nearest first.
+        """
+        center, radius = _point(center), _to_fraction(radius)
+        r_sq = radius * radius
+        found, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, key, axis, left, right = node
+            d_sq = _dist_sq(point, center)
+            if d_sq <= r_sq:
+                found.append((d_sq, key))
+            diff = center[axis] - point[axis]
+            stack.append(left if diff <= 0 else right)
+            if diff * diff <= r_sq:
+                stack.append(right if diff <= 0 else left)
+        found.sort(key=lambda pair: pair[0])
+        return [key for _, key in found]
+
+    def nearest(self, center, k: int = 1) -> list:
+        """ Returns the keys of the k points nearest to center. """
+        if k <= 0:
+            return []
+        center = _point(center)
+        best = []   # max-heap of (-d_sq, tie, key) of the k nearest
+        tie = 0
+
+        def visit(node):
+            nonlocal tie
+            if node is None:
+                return
+            point, key, axis, left, right = node
+            d_sq = _dist_sq(point, center)
+            tie += 1
+            if len(best) < k:
+                heapq.heappush(best, (-d_sq, tie, key))
+            elif d_sq < -best[0][0]:
+                heapq.heapreplace(best, (-d_sq, tie, key))
+            diff = center[axis] - point[axis]
+            near, far = (left, right) if diff <= 0 else (right, left)
+            visit(near)
+            if len(best) < k or diff * diff < -best[0][0]:
+                visit(far)
+
+        visit(self.root)
+        return [key for _, _, key in sorted(best, key=lambda e: (-e[0], e[1]))]
+
+
+def spatial_tests():
+    print('\n==========================================')
+    print('spatial.py @ spatial_tests: //////////////\n')
+    players = {'a': [0, 0], 'b': [1, RF(1, 2)],
+               'c': [5, 5], 'd': [RF(3, 2), 0]}
+    grid = SpatialHash(2)
+    for key, pos in players.items():
+        grid.insert(key, pos)
+    print('within 3/2 of origin:', grid.within([0, 0], RF(3, 2)),
+          'and expected = [a, b, d]')
+    print('pairs closer than 1:', grid.pairs(1), 'and expected = [(b, d)]')
+    grid.move('c', [0, RF(1, 2)])
+    print('nearest 2 to origin:', grid.nearest([0, 0], 2),
+          'and expected = [a, c]')
+    tree = KDTree(players)
+    print('k-d tree nearest 2 to [5, 4]:', tree.nearest([5, 4], 2),
+          'and expected = [c, d]')
+    print('\nspatial.py @ end of spatial_tests ////////')
+    print('==========================================\n')
+
+
+if __name__ == '__main__':
+    spatial_tests()
@@ -1,11 +1,88 @@
-from math import ceil, pi, cos, sin, sqrt
+from fractions import Fraction
+from functools import lru_cache
+from math import ceil, pi, cos, sin, tan
+from operator import mul
 
+import backend
+import lazy
 import matrix
+import mfrac
+import modular
+import polynomial
 import rfrac
 
 
 RF = rfrac.RationalFrac
 
+# Number of distinct (angle, size, axis) rotation matrices kept:
+ROT_CACHE_SIZE = 256
+# Default bound on the tan-half-angle denominator of exact rotations.
+# The angle error is then at most about 1 / ROT_MAX_DENOM:
+ROT_MAX_DENOM = 1 << 10
+
+
+def exact_cos_sin(theta: float, max_denom: int = ROT_MAX_DENOM) -> (RF, RF):
+    """
+    Returns a rational point (c, s) on the unit circle near
+    (cos(theta), sin(theta)), so that c*c + s*s == 1 exactly.
+
+    theta is split into quarter turns, which are exact, and a rest
+    r in [-pi/4, pi/4]. With t = p/q the fraction nearest tan(r/2)
+    whose denominator is at most max_denom, the point is
+        ((q^2 - p^2) / (q^2 + p^2), 2pq / (q^2 + p^2)),
+    so every entry has a denominator of at most 2 * max_denom ** 2.
+    """
+    quarters = round(theta / (pi / 2))
+    t = Fraction(tan((theta - quarters * pi / 2) / 2))
+    t = t.limit_denominator(max_denom)
+    p, q = t.numerator, t.denominator
+    c = RF.from_ratio(q * q - p * p, q * q + p * p)
+    s = RF.from_ratio(2 * p * q, q * q + p * p)
+    for _ in range(quarters % 4):
+        c, s = -s, c
+    return c, s
+
+
+def _rot_rows(c, s, size: int, axis: str) -> [list, ]:
+    """ Private. Returns the rows of a rotation with cosine c and sine s. """
+    if size == 2 and axis == '':
+        return [[c, -s],
+                [s, c]]
+    elif size == 3 and axis == 'x':
+        return [[1, 0, 0],
+                [0, c, -s],
+                [0, s, c]]
+    elif size == 3 and axis == 'y':
+        return [[c, 0, s],
+                [0, 1, 0],
+                [-s, 0, c]]
+    elif size == 3 and axis == 'z':
+        return [[c, -s, 0],
+                [s, c, 0],
+                [0, 0, 1]]
+    raise KeyError((size, axis))
+
+
+@lru_cache(maxsize=ROT_CACHE_SIZE)
+def _rot_matrix(theta: float, size: int, axis: str, max_denom: int = None):
+    """
+    Private. Builds the one rotation matrix asked for, exact
+    if max_denom is given (see exact_cos_sin). The result
+    is shared by the cache: do not modify it.
+    """
+    if max_denom is None:
+        c, s = cos(theta), sin(theta)
+    else:
+        c, s = exact_cos_sin(theta, max_denom)
+    return matrix.Matrix(_rot_rows(c, s, size, axis))
+
+
+def _max_denom(exact) -> int:
+    """ Private. Maps the exact argument of rotations to max_denom. """
+    if exact is False or exact is None:
+        return None
+    return ROT_MAX_DENOM if exact is True else int(exact)
+
 
 class Vector(list):
     """
@@ -15,36 +92,67 @@ class Vector(list):
     #  refactor to use it instead of RationalFrac
     #  Also refactor corresponding parts of Matrix class.
 
+    # Number of Matrix objects other than one that hold this
+    # Vector as a row. See Matrix.__getitem__ (copy on write):
+    _shares: int = 0
+    # The Matrix that last handed this Vector out as a row for
+    # writing. Writes drop its cached eval() results:
+    _owner = None
+
     def __init__(self, v: list):
         """
-        Requires that all elements of v
-        are can initialize RationalFrac objects.
+        Requires that all elements of v can initialize
+        RationalFrac objects, or are polynomial.Polynomial
+        objects (see Matrix.eval).
 
-        IMPORTANT: Does not initialize with copies
-        of RationalFrac instances where provided.
-        External changes will be reflected in
-        the corresponding entries of THIS matrix.
+        Does not initialize with copies of RationalFrac
+        instances where provided. That is safe, since
+        RationalFrac operations never modify an operand.
         """
-        vec = [n if isinstance(n, RF)
+        if isinstance(v, Vector):
+            super().__init__(v)
+            return
+        vec = [n if isinstance(n, (RF, polynomial.Polynomial))
                else RF(n) for n in v]
         super().__init__(vec)
 
+    def copy(self):
+        """ Returns a copy. Entries are shared, as they are immutable. """
+        return Vector(self)
+
+    def as_float(self):
+        """
+        Returns a float64 copy with the same API (see backend.py).
+        Use its exact() method to convert back.
+        """
+        return backend.FloatVector(self)
+
+    def lazy(self):
+        """ Returns this vector as a lazy.Expr (see Matrix.lazy). """
+        return lazy.Expr.leaf(self)
+
     def __setitem__(self, key, value):
         """ Performs type-checking and appropriate conversions. """
-        if isinstance(value, RF):
+        if self._owner is not None:
+            self._owner._evaluator = None
+        if isinstance(value, (RF, polynomial.Polynomial)):
             super().__setitem__(key, value)
         elif isinstance(value, (int, float, str)):
             super().__setitem__(key, RF(value))
         else:
             raise TypeError(
                 f'{type(value)} invalid.\n'
-                'can only set int, float, or \n'
-                'RationalFrac type objects in Vector.')
+                'can only set int, float, RationalFrac \n'
+                'or Polynomial type objects in Vector.')
 
     def append(self, obj):
+        if self._owner is not None:
+            self._owner._evaluator = None
         super(Vector, self).append(RF(obj))
 
     def extend(self, iterable):
+        if self._owner is not None:
+            self._owner._evaluator = None
         super(Vector, self).extend([RF(obj) for obj in iterable])
 
     def __add__(self, other):
@@ -88,60 +196,110 @@ class Vector(list):
         else:
             return NotImplemented
 
-    def norm(self):
-        """ Returns the 'length' of the vector. """
-        # Equivalent to sqrt(sum(self.dot(self))):
-        return sqrt(sum(map(lambda x: x ** 2, self)))
+    def norm_squared(self) -> RF:
+        """ Returns the squared 'length' of the vector. See dot(). """
+        (a,), (scale,) = modular.clear_denominators([self])
+        return RF.from_ratio(sum(map(mul, a, a)), scale * scale)
+
+    def norm(self) -> mfrac.MonoFrac:
+        """
+        Returns the exact 'length' of the vector, such as 2*3^(1/2).
+        Compare norm_squared() values to avoid the square root.
+        """
+        return mfrac.MonoFrac(self.norm_squared()) ** RF(1, 2)
 
     @staticmethod
-    def rot_matrix(theta: float, size: int, axis: str):
-        """ Returns a rotation matrix """
-        # TODO: This sucks. When monomials and functions are implemented,
-        #  support them in matrices and call something
-        #  like: " rm[size][axis].eval({'o': o}) "
-        rm = {
-            2: {
-                '': matrix.Matrix([[cos(theta), -sin(theta)],
-                                   [sin(theta), cos(theta)]])
-            },
-            3: {
-                'x': matrix.Matrix([[1, 0, 0],
-                                    [0, cos(theta), -sin(theta)],
-                                    [0, sin(theta), cos(theta)]]),
-                'y': matrix.Matrix([[cos(theta), 0, sin(theta)],
-                                    [0, 1, 0],
-                                    [-sin(theta), 0, cos(theta)]]),
-                'z': matrix.Matrix([[cos(theta), -sin(theta), 0],
-                                    [sin(theta), cos(theta), 0],
-                                    [0, 0, 1]])
-            }
-        }  # Rotation matrices based on size
-        return rm[size][axis]
-
-    def rot(self, o, axis=''):
+    def rot_matrix(theta: float, size: int, axis: str, exact=False):
         """
-        Returns a rotated view of a vector in space.
-        The rotation is counterclockwise by theta,
-        about the specified axis when relevant.
+        Returns a rotation matrix. Matrices are cached by
+        (theta, size, axis), and each call returns a copy.
+
+        exact may be True, or a bound on the denominators to use
+        instead of ROT_MAX_DENOM. The matrix then has small exact
+        entries and is exactly orthogonal, so products of such
+        rotations stay exact rotations with no drift. The angle
+        itself is approximated; see exact_cos_sin().
+        """
+        return _rot_matrix(theta, size, axis, _max_denom(exact)).copy()
+
+    @staticmethod
+    def symbolic_rot_matrix(size: int, axis: str = '',
+                            cos_name: str = 'c', sin_name: str = 's'):
         """
+        Returns a rotation matrix whose entries are polynomials in
+        two variables standing for the cosine and the sine of the
+        angle. Products of such matrices are compositions of
+        rotations that can be formed once and evaluated for every
+        new angle with Matrix.eval, for example:
+            m.eval({'c': cos(o), 's': sin(o)})
+        or exactly, at a point given by exact_cos_sin(o).
+        """
+        names = (cos_name, sin_name)
+        c = polynomial.Polynomial.var(cos_name, names)
+        s = polynomial.Polynomial.var(sin_name, names)
+        return matrix.Matrix(_rot_rows(c, s, size, axis))
+
+    @staticmethod
+    def _norm_angle(o) -> float:
+        """ Private. Returns o in the range [0, 2pi). """
         if o < 0:
             o = ceil(-o / 2 / pi) * 2 * pi + o
-        o %= 2 * pi
-        return Vector.rot_matrix(0, len(self), axis) @ self
+        return o % (2 * pi)
+
+    def rot(self, o, axis='', exact=False):
+        """
+        Returns a rotated view of a vector in space.
+        The rotation is counterclockwise by o,
+        about the specified axis when relevant.
+        See rot_matrix() for exact.
+        """
+        o = Vector._norm_angle(o)
+        return _rot_matrix(o, len(self), axis, _max_denom(exact)) @ self
+
+    @staticmethod
+    def rot_all(vectors, o, axis='', exact=False):
+        """
+        Rotates every vector in vectors (a list of equal length
+        vectors or lists, or a Matrix with one vector per row)
+        with a single matrix product, as in rot(). Returns a list
+        of Vectors, or a Matrix if vectors was a Matrix.
+        """
+        points = vectors if isinstance(vectors, (
+            matrix.Matrix, matrix.MatrixView)) else matrix.Matrix(vectors)
+        if not points.nrows:
+            return points.copy() if points is vectors else []
+        o = Vector._norm_angle(o)
+        rot = _rot_matrix(o, points.ncols, axis, _max_denom(exact))
+        rotated = points @ rot.T
+        return rotated if points is vectors else list(rotated.rows())
 
     def transform(self):
         """Return a [1 x len(self)] matrix"""
         return matrix.Matrix(self)
 
-    def dot(self, other):
+    def dot(self, other) -> RF:
         """
         If the vectors are of equal vector length,
         Returns the dot product of this and other.
+
+        Both are scaled to integers over their common denominators,
+        so the products are summed as python ints in one pass and
+        only the result is reduced.
         """
-        if (isinstance(other, Vector) and
+        if (isinstance(other, (Vector, list, tuple)) and
                 len(self) == len(other)):
-            prod = [self[i] * other[i] for i in range(len(self))]
-            return Vector(prod)
+            if not isinstance(other, Vector):
+                other = Vector(other)
+            (a, b), (sa, sb) = modular.clear_denominators([self, other])
+            return RF.from_ratio(sum(map(mul, a, b)), sa * sb)
+        else:
+            raise matrix.MatrixSizeError('vector lengths incompatible.')
+
+    def hadamard(self, other):
+        """ Returns the entry-wise product of this and other. """
+        if (isinstance(other, (Vector, list, tuple)) and
+                len(self) == len(other)):
+            return Vector([a * b for a, b in zip(self, Vector(other))])
         else:
             raise matrix.MatrixSizeError('vector lengths incompatible.')
 
@@ -152,34 +310,88 @@ class Vector(list):
         """
         return Vector([-num for num in self])
 
-    def __matmul__(self, *others):
-        """ Vector cross product. """
-        # TODO: reconsider *others:
-        #  not suited for parsing user expressions.
-        if len(others) != len(self) - 2:
-            raise matrix.MatrixSizeError(
-                'not enough lists/vectors to perform cross-product.')
-        elif any(map(lambda v: len(v) != len(self), others)):
+    def __matmul__(self, other):
+        """
+        Vector cross product. other is one vector when this
+        has length 3, or a list of len(self) - 2 vectors.
+        See cross().
+        """
+        if isinstance(other, Vector) or (
+                isinstance(other, (list, tuple)) and other and
+                not isinstance(other[0], (list, tuple))):
+            others = [other]
+        elif isinstance(other, (list, tuple)):
+            others = list(other)
+        else:
+            return NotImplemented
+        return Vector.cross([self] + others)
+
+    @staticmethod
+    def cross(vectors):
+        """
+        Returns the generalized cross product of n - 1 vectors of
+        length n: the vector whose j-th entry is (-1)^j times the
+        determinant of the vectors with column j deleted.
+
+        Lengths 2 and 3 use the closed forms. Otherwise, all of the
+        cofactors come from one fraction-free Gauss-Jordan
+        elimination, in O(n^3) integer operations.
+        """
+        vectors = [v if isinstance(v, Vector) else Vector(v)
+                   for v in vectors]
+        n = len(vectors) + 1
+        if any(map(lambda v: len(v) != n, vectors)):
             raise matrix.MatrixSizeError(
-                'the other lists/vectors are not all of equal length.')
-
-        # Inputs verified as valid. setup matrix:
-        mtx = [[1 if i % 2 == 0 else -1
-                for i in range(len(self))],
-               self]
-        for other in others:
-            mtx.append(other)
-        mtx = matrix.Matrix(mtx)
-
-        # Calculate the cross product:
-        cross = []
-        rows = list(range(1, mtx.nrows))
-        cols = list(range(len(self)))
-        for c in cols:
-            _cols = cols.copy()
-            _cols.remove(c)
-            cross.append(mtx[0][c] * mtx.recursive_det(rows, _cols))
-        return Vector(cross)
+                'need n - 1 lists/vectors of length n for cross-product.')
+        if n == 2:
+            (a, b), = vectors
+            return Vector([b, -a])
+        elif n == 3:
+            (a0, a1, a2), (b0, b1, b2) = vectors
+            return Vector([a1 * b2 - a2 * b1,
+                           a2 * b0 - a0 * b2,
+                           a0 * b1 - a1 * b0])
+
+        rows, scales = modular.clear_denominators(vectors)
+        # Fraction-free (Bareiss) Gauss-Jordan elimination. Afterwards
+        # each pivot column holds d on its row and 0 elsewhere, where
+        # sign * d is the determinant of the pivot columns:
+        prev, sign, pivots = 1, 1, []
+        for c in range(n):
+            r = len(pivots)
+            if r == len(rows):
+                break
+            k = next((i for i in range(r, len(rows)) if rows[i][c]), None)
+            if k is None:
+                continue
+            if k != r:
+                rows[r], rows[k] = rows[k], rows[r]
+                sign = -sign
+            p, pivot_row = rows[r][c], rows[r]
+            for i, row in enumerate(rows):
+                if i != r:
+                    factor = row[c]
+                    rows[i] = [(p * x - factor * y) // prev
+                               for x, y in zip(row, pivot_row)]
+            prev = p
+            pivots.append(c)
+        if len(pivots) < len(rows):
+            return Vector([0] * n)
+
+        # The cross product spans the null space of the rows. That is
+        # the multiple of (x_f = 1, x_p = -rows[i][f] / d), for the free
+        # column f and the pivot column p of each row i, whose x_f is
+        # its own cofactor (-1)^f * sign * d:
+        f = next(c for c in range(n) if c not in pivots)
+        sign = -sign if f % 2 else sign
+        denom = 1
+        for scale in scales:
+            denom *= scale
+        cross = [0] * n
+        cross[f] = sign * prev
+        for row, p in zip(rows, pivots):
+            cross[p] = -sign * row[f]
+        return Vector([RF.from_ratio(x, denom) for x in cross])
 
     def __mul__(self, other):
         """ Scalar multiplication. """
@@ -221,16 +433,37 @@ def vector_tests():
     vec1 = Vector([0, 0.5, 2])
     print(vec1)
     print(vec1 @ vec1)
+    print('cross test:', Vector([1, 0, 0, 0]) @ [[0, 1, 0, 0], [0, 0, 1, 0]],
+          'and expected = [0, 0, 0, -1]')
     print([0, 1, RF(5, 7)] + vec1)
 
     vec1 -= [1, 1, 1]
     print('in place subtraction test:', vec1)
     print('neg test:', -vec1)
+    print('dot test:', vec1.dot([2, RF(1, 3), 6]), 'and expected = 23/6')
+    print('norm test:', Vector([1, 1, RF(1, 2)]).norm(),
+          'and expected = 3/2')
+    print('norm test:', Vector([2, 2, 2]).norm(), 'and expected = 2*3^(1/2)')
     vec1 *= 2.5
     print('in place multiplication test:', vec1)
+    print('rot test:', Vector([1, 0]).rot(pi / 3))
+    print('rot_all test:', *Vector.rot_all([[1, 0], [0, 2]], pi / 3))
+    print('exact rot test:', Vector([1, 0]).rot(pi / 3, exact=True),
+          Vector([1, 0]).rot(pi / 2, exact=True))
+    roll = Vector.symbolic_rot_matrix(3, 'x', 'c1', 's1') @ \
+        Vector.symbolic_rot_matrix(3, 'z', 'c2', 's2')
+    c1, s1 = exact_cos_sin(0.3)
+    c2, s2 = exact_cos_sin(1.1)
+    print('symbolic rot test:',
+          roll.eval(c1=c1, s1=s1, c2=c2, s2=s2) ==
+          Vector.rot_matrix(0.3, 3, 'x', True) @
+          Vector.rot_matrix(1.1, 3, 'z', True), 'and expected = True')
     print('\nvector.py @ end of vector_tests //////////\n'
           '==========================================\n')
 
 
 if __name__ == '__main__':
-    vector_tests()
+    # Run from the imported module, so that isinstance
+    # checks in matrix.py see the same Vector class:
+    import vector
+    vector.vector_tests()